@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Cold start per service: time to import its app module and time from process
+launch to the first 200 from GET /health.
+
+Each measurement is a fresh interpreter (`python -c` for the import, uvicorn
+for the first response), so nothing is shared between runs. Redis points at a
+closed local port: startup hooks that reach for it fail fast, and /health
+answers "degraded" rather than waiting on a connection.
+
+Usage:
+  python3 benchmarks/cold_start.py
+  python3 benchmarks/cold_start.py --only fusion-engine,track-api --runs 5
+
+Output:
+  One JSON document on stdout: per service, median import and first-response
+  seconds, plus which of the heavier optional imports were already loaded once
+  the app module had been imported.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from _harness import ROOT, SERVICES
+
+# Imports that cost tens of ms each; listed if the app module pulled them in
+HEAVY_MODULES = ["jwt", "redis", "httpx", "yaml", "prometheus_client"]
+
+IMPORT_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {package}.main
+dt = time.perf_counter() - t
+print(dt, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def package_of(service: str) -> str:
+    return "src" if (SERVICES / service / "src").is_dir() else "app"
+
+
+def service_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(ROOT / "libs" / "sentinel-common"), env.get("PYTHONPATH", "")])
+    env.setdefault("REDIS_HOST", "127.0.0.1")
+    env.setdefault("REDIS_PORT", str(free_port()))
+    env.setdefault("JWT_SECRET", "changeme")
+    # Keep the planner's track refresh from dialling out during the measurement
+    env.setdefault("TRACK_CACHE_BACKGROUND", "false")
+    return env
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(service: str, env: dict) -> tuple[float, list[str]]:
+    pkg = package_of(service)
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(package=pkg, heavy=HEAVY_MODULES)],
+        cwd=SERVICES / service,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip().splitlines()[-1]
+    seconds, _, loaded = out.partition(" ")
+    return float(seconds), [m for m in loaded.split(",") if m]
+
+
+def measure_first_response(service: str, env: dict, timeout_s: float) -> float:
+    port = free_port()
+    cmd = [sys.executable, "-m", "uvicorn", f"{package_of(service)}.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=SERVICES / service, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(timeout=0.5) as client:
+            while time.perf_counter() - start < timeout_s:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"{service} exited with {proc.returncode} before answering /health")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+        raise RuntimeError(f"{service} did not answer /health within {timeout_s}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--only", default="", help="comma-separated service names (default: all)")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the first /health")
+    args = p.parse_args()
+
+    services = sorted(d.name for d in SERVICES.iterdir() if (d / package_of(d.name) / "main.py").is_file())
+    if args.only:
+        services = [s for s in services if s in set(args.only.split(","))]
+
+    env = service_env()
+    results = {"runs": args.runs, "python": sys.version.split()[0], "services": {}}
+    for svc in services:
+        imports, loaded = [], []
+        for _ in range(args.runs):
+            seconds, loaded = measure_import(svc, env)
+            imports.append(seconds)
+        first = [measure_first_response(svc, env, args.timeout) for _ in range(args.runs)]
+        results["services"][svc] = {
+            "import_s": round(statistics.median(imports), 4),
+            "first_response_s": round(statistics.median(first), 4),
+            "heavy_modules_at_import": loaded,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
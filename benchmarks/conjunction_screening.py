@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+conjunction-screener: screening cost by catalogue size, recall against a brute
+force search, and the service path from track writes to GET /conjunctions.
+
+  screen   a sensor-sim catalogue (LEO/MEO/GEO/HEO mix) of --objects: the
+           first screen over the whole window, then steady-state cycles with
+           --updates changed tracks each and the window advancing --interval
+  recall   --recall-objects at --recall-distance-km against every pair's
+           distance sampled each second; the screener must find every pair
+           the brute force does, after the first screen and after each of
+           --recall-cycles incremental cycles that move objects onto
+           collision courses and re-observe others
+  service  conjunction-screener's loop on fakeredis (catalogue rescan, change
+           replay, publish) and track-api GET /conjunctions, screening at
+           --recall-distance-km so there is plenty to publish
+
+Usage:
+  python3 benchmarks/conjunction_screening.py
+  python3 benchmarks/conjunction_screening.py --objects 100000 --updates 2000
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import json
+import time
+
+import fakeredis
+import numpy as np
+from fastapi.testclient import TestClient
+
+from _harness import auth_headers, bind_redis, load_service
+from sentinel_common.keys import changes_key
+
+orbits = load_service("sensor-sim", "orbits")
+screening = load_service("conjunction-screener", "screening")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, round(time.perf_counter() - start, 4)
+
+
+def catalogue_states(cat, t: float) -> np.ndarray:
+    r, v = cat.propagate(t)
+    return np.hstack([r, v])
+
+
+def bench_screen(args) -> dict:
+    cat = orbits.Catalogue(args.objects, seed=args.seed)
+    t0 = cat.epoch
+    screener = screening.Screener(args.distance_km, args.window_s, args.step_s)
+    screener.load(cat.object_ids, catalogue_states(cat, t0), np.full(cat.size, t0))
+    _, full_s = timed(lambda: screener.screen(t0))
+    out = {
+        "full_s": full_s,
+        "samples": len(screener.samples),
+        "candidate_pairs": screener.last_candidates,
+        "conjunctions": len(screener.encounters),
+    }
+
+    # Fusion-style updates: the same orbits re-observed with some noise
+    rng = np.random.default_rng(args.seed)
+    cycles = []
+    now = t0
+    for _ in range(args.cycles):
+        now += args.interval
+        changed = rng.choice(cat.size, args.updates, replace=False)
+        states = catalogue_states(cat, now)[changed] + rng.normal(0, 0.05, (args.updates, 6)) * [1, 1, 1, 1e-3, 1e-3, 1e-3]
+        for i, sv in zip(changed.tolist(), states):
+            screener.update(cat.object_ids[i], sv, now)
+        _, cycle_s = timed(lambda: screener.screen(now))
+        cycles.append(cycle_s)
+    out["cycle_s"] = {"median": round(float(np.median(cycles)), 4), "max": max(cycles)}
+    out["conjunctions_after"] = len(screener.encounters)
+    out["index_mb"] = round(sum(s.sorted_keys.nbytes + s.order.nbytes for s in screener.samples) / 2**20, 1)
+    return out
+
+
+def brute_force_pairs(screener, start: float, window: float, distance_km: float) -> set:
+    """Every pair's distance sampled each second over the screener's states; only pairs clearly inside the threshold."""
+    pos = np.stack([screener.orbits.at(None, t)[0] for t in start + np.arange(0.0, window + 1)])
+    expected = set()
+    for i in range(len(screener) - 1):
+        closest = np.linalg.norm(pos[:, i + 1 :] - pos[:, i : i + 1], axis=2).min(axis=0)
+        expected.update((i, i + 1 + j) for j in np.flatnonzero(closest <= 0.99 * distance_km).tolist())
+    return expected
+
+
+def bench_recall(args) -> dict:
+    cat = orbits.Catalogue(args.recall_objects, seed=args.seed)
+    t0 = cat.epoch
+    window = 1200.0
+    screener = screening.Screener(args.recall_distance_km, window, args.step_s)
+    screener.load(cat.object_ids, catalogue_states(cat, t0), np.full(cat.size, t0))
+    screener.screen(t0)
+
+    # All pairs, every second, on the catalogue's own propagator
+    pos = np.stack([cat.propagate(t)[0] for t in t0 + np.arange(0.0, window + 1)])
+    expected = set()
+    for i in range(cat.size - 1):
+        closest = np.linalg.norm(pos[:, i + 1 :] - pos[:, i : i + 1], axis=2).min(axis=0)
+        expected.update((i, i + 1 + j) for j in np.flatnonzero(closest <= 0.99 * args.recall_distance_km).tolist())
+    found = set(screener.encounters)
+    out = {
+        "objects": cat.size,
+        "distance_km": args.recall_distance_km,
+        "window_s": window,
+        "brute_force_pairs": len(expected),
+        "found_pairs": len(found),
+        "missed": len(expected - found),
+    }
+
+    # Incremental cycles. Each one puts some objects on a collision course with another,
+    # then re-observes the other side of the previous cycle's courses on an unchanged
+    # orbit, along with some random objects: the re-screened rows must be found at
+    # their new cells in later cycles, not the ones they were first indexed at.
+    rng = np.random.default_rng(args.seed)
+    cycles = []
+    now, targets = t0, np.array([], dtype=int)
+    for _ in range(args.recall_cycles):
+        now += args.interval
+        r, v = cat.propagate(now)
+        for i in np.unique(np.concatenate([targets, rng.choice(cat.size, 20, replace=False)])).tolist():
+            screener.update(cat.object_ids[i], np.hstack([r[i], v[i]]), now)
+        pairs = rng.choice(cat.size, (10, 2), replace=False)
+        for x, y in pairs.tolist():
+            # Head-on, half the threshold apart, some time inside the window
+            meet = now + rng.uniform(60.0, window - 60.0)
+            rx, vx = cat.propagate(meet)
+            offset = rx[x] / np.linalg.norm(rx[x]) * 0.5 * args.recall_distance_km
+            screener.update(cat.object_ids[y], np.hstack([rx[x] + offset, -vx[x]]), meet)
+        targets = pairs[:, 0]
+        screener.screen(now)
+
+        expected = brute_force_pairs(screener, now, window - args.interval, args.recall_distance_km)
+        found = set(screener.encounters)
+        cycles.append({"brute_force_pairs": len(expected), "found_pairs": len(found), "missed": len(expected - found)})
+    out["incremental"] = cycles
+    return out
+
+
+def bench_service(args) -> dict:
+    conj = load_service("conjunction-screener")
+    track_api = load_service("track-api")
+    server = fakeredis.FakeServer()
+    bind_redis(conj, server)
+    bind_redis(track_api, server)
+    conj.SCREEN_DISTANCE_KM = args.recall_distance_km
+
+    # Tracks as fusion-engine writes them, current to the last whole second
+    now = float(int(time.time()))
+    cat = orbits.Catalogue(args.service_objects, seed=args.seed, epoch=now)
+
+    def write_tracks(idx, t: float, feed: bool) -> None:
+        states = catalogue_states(cat, t)
+        pipe = conj.r.pipeline(transaction=False)
+        for i in idx:
+            oid = cat.object_ids[i]
+            track = {
+                "object_id": oid,
+                "last_update": conj.iso(t),
+                "state": dict(zip(screening.STATE_FIELDS, states[i].tolist())),
+                "confidence": 0.9,
+            }
+            pipe.hset(conj.track_key(oid), mapping={"json": json.dumps(track), "confidence": 0.9})
+            pipe.sadd(conj.idx_key(), oid)
+            if feed:
+                pipe.xadd(changes_key(), {"object_id": oid, "confidence": 0.9, "last_update": track["last_update"], "regime": "LEO"})
+        pipe.execute()
+
+    write_tracks(range(cat.size), now, feed=False)
+    feed = conj.change_feed()
+    screener, rescan_s = timed(lambda: conj.resync(feed))
+    _, first_s = timed(lambda: screener.screen(now))
+    published, publish_s = timed(lambda: conj.publish(screener, None, now))
+
+    rng = np.random.default_rng(args.seed)
+    write_tracks(rng.choice(cat.size, min(args.updates, cat.size), replace=False).tolist(), now + args.interval, feed=True)
+    applied, apply_s = timed(lambda: conj.apply_changes(screener, feed))
+    _, cycle_s = timed(lambda: screener.screen(now + args.interval))
+    published, republish_s = timed(lambda: conj.publish(screener, published, now + args.interval))
+
+    with TestClient(track_api.app) as client:
+        resp = client.get("/conjunctions", params={"limit": 1000}, headers=auth_headers())
+        body = resp.json()
+        _, get_s = timed(lambda: client.get("/conjunctions", params={"limit": 1000}, headers=auth_headers()))
+    return {
+        "objects": cat.size,
+        "rescan_s": rescan_s,
+        "first_screen_s": first_s,
+        "publish_s": publish_s,
+        "changes_applied": applied,
+        "apply_changes_s": apply_s,
+        "cycle_s": cycle_s,
+        "republish_s": republish_s,
+        "published": len(published),
+        "get_status": resp.status_code,
+        "get_count": body.get("count"),
+        "get_ms": round(1000 * get_s, 2),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--objects", type=int, default=50000)
+    p.add_argument("--distance-km", type=float, default=5.0)
+    p.add_argument("--window-s", type=float, default=3600.0)
+    p.add_argument("--step-s", type=float, default=20.0)
+    p.add_argument("--updates", type=int, default=500, help="tracks changed per cycle")
+    p.add_argument("--interval", type=float, default=10.0, help="seconds between cycles")
+    p.add_argument("--cycles", type=int, default=5)
+    p.add_argument("--recall-objects", type=int, default=800)
+    p.add_argument("--recall-distance-km", type=float, default=100.0)
+    p.add_argument("--recall-cycles", type=int, default=3)
+    p.add_argument("--service-objects", type=int, default=5000)
+    p.add_argument("--seed", type=int, default=3)
+    args = p.parse_args()
+
+    results = {"distance_km": args.distance_km, "window_s": args.window_s, "step_s": args.step_s}
+    results["screen"] = bench_screen(args)
+    results["recall"] = bench_recall(args)
+    results["service"] = bench_service(args)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
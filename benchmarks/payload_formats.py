@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Bytes on the wire and CPU per event for each body format (json, msgpack) and
+compression (identity, gzip, zstd), using sentinel_common.codec.
+
+  codec     one observation: client encode, and the server-side decode +
+            ObservationEvent validation each hop does (observation_body)
+  pipeline  sensor -> gateway -> validation -> fusion in-process over ASGI
+            (as in replay.py), with the sensor and both forward hops using the
+            format (INGEST_/FORWARD_FORMAT, _ENCODING); request and response
+            bytes summed over the three hops, process CPU per event
+  list      a GET /tracks body of --list-limit tracks, as negotiated by Accept
+            and Accept-Encoding (RESPONSE_ENCODINGS set to offer both)
+
+CPU is process time, so the pipeline figure includes fakeredis and the
+in-process transports: compare formats against each other, not against a
+deployment.
+
+Usage:
+  python3 benchmarks/payload_formats.py
+  python3 benchmarks/payload_formats.py --events 20000 --list-limit 500
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import fakeredis
+import httpx
+
+from _harness import auth_headers, bind_redis, load_service
+from replay import in_process_pipeline
+from sentinel_common import codec
+from sentinel_common.models import ObservationEvent
+from track_api_passthrough import seed_tracks
+
+FORMATS = ["json", "msgpack"]
+ENCODINGS = ["identity", "gzip", "zstd"]
+
+
+def make_events(n: int, seed: int) -> list[dict]:
+    events = load_service("sensor-sim", "events")
+    rng = random.Random(seed)
+    sensors = [("radar-1", "radar"), ("optical-1", "optical"), ("space-1", "space")]
+    return [events.make_event(*sensors[i % 3], rng, 1000, i) for i in range(n)]
+
+
+def cpu_us(fn, n: int, repeats: int = 3) -> float:
+    """Best of `repeats` runs of `fn` (n operations), per operation."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return round(1e6 * best / n, 2)
+
+
+def decode_observation(body: bytes, headers: dict) -> ObservationEvent:
+    # observation_body without the Request
+    raw = codec.decompress(body, headers.get("Content-Encoding"))
+    mt = codec.media_type(headers.get("Content-Type"))
+    if mt == codec.JSON:
+        return ObservationEvent.model_validate_json(raw)
+    return ObservationEvent.model_validate(codec.loads(raw, mt))
+
+
+def bench_codec(evts: list[dict]) -> dict:
+    out = {}
+    for fmt in FORMATS:
+        for enc in ENCODINGS:
+            encoded = [codec.encode_body(e, fmt, enc) for e in evts]
+            out[f"{fmt}+{enc}"] = {
+                "bytes": round(sum(len(b) for b, _ in encoded) / len(evts), 1),
+                "encode_us": cpu_us(lambda: [codec.encode_body(e, fmt, enc) for e in evts], len(evts)),
+                "decode_validate_us": cpu_us(lambda: [decode_observation(b, h) for b, h in encoded], len(evts)),
+            }
+    return out
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Counts request and (still encoded) response body bytes through `inner`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, counts: dict):
+        self.inner = inner
+        self.counts = counts
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        resp = await self.inner.handle_async_request(request)
+        raw = b"".join([chunk async for chunk in resp.aiter_raw()])
+        self.counts["request_bytes"] += len(request.content)
+        self.counts["response_bytes"] += len(raw)
+        return httpx.Response(resp.status_code, headers=resp.headers, content=raw, request=request)
+
+
+async def run_pipeline(evts: list[dict], fmt: str, enc: str, concurrency: int) -> dict:
+    entry, url, fusion = in_process_pipeline(fakeredis.FakeServer())
+    gateway = load_service("ingestion-gateway")
+    validation = load_service("validation-service")
+    counts = {"request_bytes": 0, "response_bytes": 0}
+    for mod in (gateway, validation):
+        mod.FORWARD_FORMAT, mod.FORWARD_ENCODING = fmt, enc
+        mod.client._transport = CountingTransport(mod.client._transport, counts)
+    entry._transport = CountingTransport(entry._transport, counts)
+    codec.RESPONSE_ENCODINGS = (enc,) if enc != "identity" else ()
+
+    headers = auth_headers()
+    accept = {"Accept": codec.FORMATS[fmt]} if fmt != "json" else {}
+    if enc != "identity":
+        accept["Accept-Encoding"] = enc
+    queue = list(reversed(evts))
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        while queue:
+            body, h = codec.encode_body(queue.pop(), fmt, enc)
+            resp = await entry.post(url, content=body, headers={**headers, **h, **accept})
+            if resp.status_code != 200:
+                errors += 1
+
+    start = time.process_time()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    cpu = time.process_time() - start
+    await entry.aclose()
+    return {
+        "errors": errors,
+        "request_bytes": round(counts["request_bytes"] / len(evts), 1),
+        "response_bytes": round(counts["response_bytes"] / len(evts), 1),
+        "cpu_us": round(1e6 * cpu / len(evts), 1),
+    }
+
+
+def bench_list(limit: int) -> dict:
+    track_api = load_service("track-api")
+    bind_redis(track_api, fakeredis.FakeServer())
+    seed_tracks(track_api, limit)
+    fragments = track_api.fetch_raw_tracks([f"obj-{i:06d}" for i in range(limit)])
+    raw = track_api.splice_list(fragments, limit)
+    codec.RESPONSE_ENCODINGS = ("zstd", "gzip")
+    out = {}
+    n = 200
+    for fmt in FORMATS:
+        for enc in ENCODINGS:
+            resp = codec.encode_response(None, codec.FORMATS[fmt], enc, raw)
+            body = resp.body
+            mt = resp.media_type
+
+            def decode():
+                for _ in range(n):
+                    codec.loads(codec.decompress(body, resp.headers.get("content-encoding")), mt)
+
+            out[f"{fmt}+{enc}"] = {
+                "bytes": len(body),
+                "encode_us": cpu_us(lambda: [codec.encode_response(None, codec.FORMATS[fmt], enc, raw) for _ in range(n)], n),
+                "client_decode_us": cpu_us(decode, n),
+            }
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=5000, help="observations per format for the codec measurement")
+    p.add_argument("--pipeline-events", type=int, default=2000, help="observations per format through the pipeline")
+    p.add_argument("--concurrency", type=int, default=20, help="pipeline: concurrent senders")
+    p.add_argument("--list-limit", type=int, default=150)
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    missing = [name for name in ("msgpack", "zstd") if not codec.available(name)]
+    if missing:
+        raise SystemExit(f"needs {', '.join(missing)}: pip install msgpack zstandard")
+
+    evts = make_events(max(args.events, args.pipeline_events), args.seed)
+    results = {"events": args.events, "pipeline_events": args.pipeline_events, "list_limit": args.list_limit}
+    results["codec"] = bench_codec(evts[: args.events])
+    results["pipeline"] = {
+        f"{fmt}+{enc}": asyncio.run(run_pipeline(evts[: args.pipeline_events], fmt, enc, args.concurrency))
+        for fmt in FORMATS
+        for enc in ENCODINGS
+    }
+    results["list"] = bench_list(args.list_limit)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
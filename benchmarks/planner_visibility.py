@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Sensor visibility cache in mission-planning-agent.
+
+Times the (track x sensor) geometry lookup with an empty cache (every track
+propagated), a warm cache (no track changed) and after a fraction of the tracks
+received new state vectors, using the sensor sites from config/policy.yaml.
+
+Usage:
+  python3 benchmarks/planner_visibility.py
+  python3 benchmarks/planner_visibility.py --tracks 1000 10000 --changed 0.05 --horizon-min 30 90
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from _harness import ROOT, load_service
+
+
+MU_EARTH = 398600.4418
+
+
+def make_tracks(models, n: int, rng: np.random.Generator, updated_at: str, prefix: str = "obj") -> list:
+    """Random circular orbits between LEO and GEO, as Cartesian state vectors."""
+    radius = rng.choice([6878.0, 7378.0, 26560.0, 42164.0], size=n) + rng.uniform(-50, 50, size=n)
+    inc = rng.uniform(0, math.pi, size=n)
+    raan = rng.uniform(0, 2 * math.pi, size=n)
+    u = rng.uniform(0, 2 * math.pi, size=n)
+    speed = np.sqrt(MU_EARTH / radius)
+    out = []
+    for i in range(n):
+        ci, si, cr, sr, cu, su = math.cos(inc[i]), math.sin(inc[i]), math.cos(raan[i]), math.sin(raan[i]), math.cos(u[i]), math.sin(u[i])
+        r = radius[i] * np.array([cr * cu - sr * su * ci, sr * cu + cr * su * ci, su * si])
+        v = speed[i] * np.array([-cr * su - sr * cu * ci, -sr * su + cr * cu * ci, cu * si])
+        out.append(
+            models.Track(
+                object_id=f"{prefix}-{i:06d}",
+                state={"x_km": r[0], "y_km": r[1], "z_km": r[2], "vx_kms": v[0], "vy_kms": v[1], "vz_kms": v[2]},
+                confidence=0.9,
+                updated_at=updated_at,
+            )
+        )
+    return out
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return out, round(1000 * (time.perf_counter() - start), 3)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tracks", type=int, nargs="+", default=[1000, 5000])
+    p.add_argument("--horizon-min", type=int, nargs="+", default=[30, 90])
+    p.add_argument("--changed", type=float, default=0.05, help="fraction of tracks updated between plans")
+    p.add_argument("--seed", type=int, default=5)
+    args = p.parse_args()
+
+    policy = load_service("mission-planning-agent", "policy", package="src")
+    models = load_service("mission-planning-agent", "models", package="src")
+    visibility = load_service("mission-planning-agent", "visibility", package="src")
+    pol = policy.load_policy(str(ROOT / "config" / "policy.yaml"))
+    sensors = pol.sensors
+
+    rng = np.random.default_rng(args.seed)
+    now = time.time()
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - 120))
+    later = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - 10))
+
+    results = []
+    for n in args.tracks:
+        tracks = make_tracks(models, n, rng, stamp)
+        n_changed = int(n * args.changed)
+        updated = make_tracks(models, n_changed, rng, later) if n_changed else []
+        # Same object ids, new state vectors
+        for old, new in zip(tracks, updated):
+            new.object_id = old.object_id
+        mixed = updated + tracks[n_changed:]
+
+        for horizon in args.horizon_min:
+            engine = visibility.VisibilityEngine()
+            (geometry, access), cold_ms = timed(lambda: engine.lookup(tracks, sensors, now, horizon * 60))
+            _, warm_ms = timed(lambda: engine.lookup(tracks, sensors, now, horizon * 60))
+            before = engine.recomputed
+            _, incr_ms = timed(lambda: engine.lookup(mixed, sensors, now, horizon * 60))
+            results.append(
+                {
+                    "tracks": n,
+                    "sensors": len(sensors),
+                    "horizon_min": horizon,
+                    "cold_ms": cold_ms,
+                    "warm_ms": warm_ms,
+                    "incremental_ms": incr_ms,
+                    "recomputed_incremental": engine.recomputed - before,
+                    "pairs_with_access_pct": round(100 * float(access.mean()), 2),
+                    "mean_geometry": round(float(geometry.mean()), 4),
+                }
+            )
+
+    print(json.dumps({"step_s": visibility.VIS_STEP_SECONDS, "window_s": visibility.VIS_PRECOMPUTE_SECONDS, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
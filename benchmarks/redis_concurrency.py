@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Requests/s and latency for fusion-engine POST /fuse and track-api GET
+/tracks/{id}, GET /tracks under many concurrent clients: threadpool handlers on
+the sync Redis client (REDIS_ASYNC=false) vs async handlers on redis.asyncio.
+
+Each mode runs in its own interpreter (REDIS_ASYNC is read at import). Clients
+are closed-loop: each sends its next request when the previous one returns.
+fakeredis answers instantly, so every command or pipeline sent waits --rtt-ms
+first, standing in for the network hop to Redis; that wait is where a threaded
+handler holds one of Starlette's 40 threadpool slots.
+
+Usage:
+  python3 benchmarks/redis_concurrency.py
+  python3 benchmarks/redis_concurrency.py --only fuse --concurrency 100,1000 --rtt-ms 2 --duration 5
+
+Output:
+  One JSON document on stdout: per endpoint and concurrency, each mode's rps,
+  p50/p95 ms and errors, plus the async/threaded rps ratio.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import fakeredis
+import httpx
+
+from _harness import auth_headers, bind_redis, load_service
+
+ENDPOINTS = ["fuse", "track_get", "track_list"]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def drive(client: httpx.AsyncClient, request, concurrency: int, duration_s: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    end = time.perf_counter() + duration_s
+
+    async def worker(wid: int) -> None:
+        nonlocal errors
+        rng = random.Random(wid)
+        while time.perf_counter() < end:
+            t = time.perf_counter()
+            try:
+                resp = await request(client, rng)
+                if resp.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 2),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 2),
+    }
+
+
+async def child(args) -> dict:
+    headers = auth_headers()
+    rtt_s = args.rtt_ms / 1000.0
+    out: dict = {}
+
+    if "fuse" in args.only:
+        fusion = load_service("fusion-engine")
+        bind_redis(fusion, fakeredis.FakeServer(), rtt_s)
+        events = load_service("sensor-sim", "events")
+        rng = random.Random(args.seed)
+        sensors = [("radar-1", "radar"), ("optical-1", "optical"), ("space-1", "space")]
+        # Enough objects that two clients rarely fuse the same one (a WATCH conflict costs a retry)
+        evts = [events.make_event(*sensors[i % 3], rng, args.objects, i) for i in range(2000)]
+
+        async def fuse(client, rng):
+            return await client.post("/fuse", json=evts[rng.randrange(len(evts))], headers=headers)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fusion.app), base_url="http://fusion-engine") as client:
+            out["fuse"] = {c: await drive(client, fuse, c, args.duration) for c in args.concurrency}
+
+    if {"track_get", "track_list"} & set(args.only):
+        from track_api_passthrough import seed_tracks
+
+        track_api = load_service("track-api")
+        bind_redis(track_api, fakeredis.FakeServer(), rtt_s)
+        seed_tracks(track_api, args.objects)
+
+        async def get(client, rng):
+            return await client.get(f"/tracks/obj-{rng.randrange(args.objects):06d}", headers=headers)
+
+        async def list_(client, rng):
+            return await client.get(f"/tracks?limit={args.list_limit}", headers=headers)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=track_api.app), base_url="http://track-api") as client:
+            for name, request in (("track_get", get), ("track_list", list_)):
+                if name in args.only:
+                    out[name] = {c: await drive(client, request, c, args.duration) for c in args.concurrency}
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--only", default=",".join(ENDPOINTS), help=f"comma-separated subset of {','.join(ENDPOINTS)}")
+    p.add_argument("--concurrency", default="100,250,500,1000", help="comma-separated client counts")
+    p.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    p.add_argument("--rtt-ms", type=float, default=1.0, help="simulated Redis round trip")
+    p.add_argument("--objects", type=int, default=5000, help="tracks seeded in track-api / objects fused")
+    p.add_argument("--list-limit", type=int, default=150)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--child", choices=["threaded", "async"], help=argparse.SUPPRESS)
+    args = p.parse_args()
+    args.only = [e for e in args.only.split(",") if e]
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args))))
+        return
+
+    modes = {}
+    for mode in ("threaded", "async"):
+        env = dict(os.environ, REDIS_ASYNC="true" if mode == "async" else "false")
+        proc = subprocess.run([sys.executable, __file__, "--child", mode, *sys.argv[1:]], env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.exit(proc.stderr)
+        modes[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    results = {"rtt_ms": args.rtt_ms, "duration_s": args.duration, "objects": args.objects}
+    for endpoint in args.only:
+        results[endpoint] = {}
+        for c in args.concurrency:
+            threaded, async_ = modes["threaded"][endpoint][str(c)], modes["async"][endpoint][str(c)]
+            results[endpoint][c] = {
+                "threaded": threaded,
+                "async": async_,
+                "rps_ratio": round(async_["rps"] / threaded["rps"], 2) if threaded["rps"] else None,
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
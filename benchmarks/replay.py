@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Replay an ingestion-gateway capture (CAPTURE_DIR) into POST /observations.
+
+By default the gateway, validation-service and fusion-engine run in-process,
+chained over ASGI transports, with fusion writing to fakeredis, so a replay is
+a repeatable end-to-end regression test without a cluster. --url sends to a
+live gateway instead.
+
+Events keep their captured spacing divided by --speed (1 = real time, 10 = ten
+times faster); --speed 0 sends as fast as --concurrency workers allow. Latency
+is measured from each event's scheduled send time, so a pipeline that falls
+behind shows up as latency rather than as a slower replay.
+
+Usage:
+  python3 benchmarks/replay.py /captures/gw-0 --speed 10
+  python3 benchmarks/replay.py /captures/gw-0 --speed 0 --concurrency 1     # deterministic state_digest
+  python3 benchmarks/replay.py /tmp/cap --synthesize 20000 --rate 2000      # write a synthetic capture first
+  python3 benchmarks/replay.py /captures/gw-0 --url http://localhost:8001/observations --speed 1
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+
+import fakeredis
+import httpx
+
+from _harness import auth_headers, bind_redis, load_service
+from sentinel_common.tracing import parse_server_timing
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def synthesize(directory: str, n: int, rate: float, seed: int) -> None:
+    capture = load_service("ingestion-gateway", "capture")
+    events = load_service("sensor-sim", "events")
+    writer = capture.CaptureWriter(directory, "replay-synth")
+    rng = random.Random(seed)
+    sensors = [(f"radar-{i}", "radar") for i in range(1, 4)] + [("optical-1", "optical"), ("space-1", "space")]
+    t = 1_767_225_600.0  # 2026-01-01T00:00:00Z
+    writer.start()
+    for seq in range(n):
+        sensor_id, sensor_type = sensors[seq % len(sensors)]
+        writer.offer(events.make_event(sensor_id, sensor_type, rng, 1000, seq), t)
+        t += rng.expovariate(rate)
+    writer.stop()
+
+
+def in_process_pipeline(server: fakeredis.FakeServer):
+    gateway = load_service("ingestion-gateway")
+    validation = load_service("validation-service")
+    fusion = load_service("fusion-engine")
+    bind_redis(fusion, server)
+    gateway.capture = None
+    validation.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fusion.app))
+    gateway.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=validation.app))
+    entry = httpx.AsyncClient(transport=httpx.ASGITransport(app=gateway.app), base_url="http://ingestion-gateway")
+    return entry, "/observations", fusion
+
+
+def state_summary(fusion, server: fakeredis.FakeServer) -> dict:
+    r = fakeredis.FakeRedis(server=server)
+    ids = sorted(r.smembers(fusion.idx_key()))
+    h = hashlib.sha256()
+    for oid in ids:
+        h.update(oid + b"\0" + (r.hget(fusion.track_key(oid.decode()), "json") or b"") + b"\n")
+    return {"tracks": len(ids), "state_digest": h.hexdigest()}
+
+
+async def replay(records: list[tuple[float, dict]], client: httpx.AsyncClient, url: str, headers: dict, speed: float, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    stages: dict[str, list[float]] = {}
+
+    async def send(evt: dict, scheduled: float) -> None:
+        try:
+            resp = await client.post(url, json=evt, headers=headers)
+            statuses[str(resp.status_code)] += 1
+            if resp.status_code == 200:
+                # The gateway reports every hop's exclusive time (app/tracing.py)
+                for name, dur in parse_server_timing(resp.headers.get("server-timing", "")).items():
+                    stages.setdefault(name, []).append(dur)
+        except Exception as e:
+            statuses[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - scheduled)
+
+    start = time.perf_counter()
+    if speed > 0:
+        t0 = records[0][0]
+        sem = asyncio.Semaphore(concurrency)
+
+        async def paced(evt: dict, scheduled: float) -> None:
+            async with sem:
+                await send(evt, scheduled)
+
+        tasks = []
+        for t, evt in records:
+            scheduled = start + (t - t0) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(paced(evt, scheduled)))
+        await asyncio.gather(*tasks)
+    else:
+        it = iter(records)
+
+        async def worker() -> None:
+            for _, evt in it:
+                await send(evt, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    span = records[-1][0] - records[0][0]
+    return {
+        "events": len(records),
+        "capture_span_s": round(span, 3),
+        "speed": speed,
+        "elapsed_s": round(elapsed, 3),
+        "achieved_rps": round(len(records) / elapsed, 1),
+        "ok": ok,
+        "status": dict(statuses),
+        "latency_ms": {
+            "p50": round(1000 * percentile(latencies, 0.50), 3),
+            "p90": round(1000 * percentile(latencies, 0.90), 3),
+            "p99": round(1000 * percentile(latencies, 0.99), 3),
+            "max": round(1000 * (latencies[-1] if latencies else 0.0), 3),
+        },
+        "stage_ms": {
+            name: {"p50": round(1000 * percentile(sorted(v), 0.50), 3), "p95": round(1000 * percentile(sorted(v), 0.95), 3)}
+            for name, v in stages.items()
+        },
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("capture_dir")
+    p.add_argument("--speed", type=float, default=1.0, help="time compression factor; 0 = as fast as possible")
+    p.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    p.add_argument("--start", type=float, default=None, help="only events that arrived at or after this unix time")
+    p.add_argument("--end", type=float, default=None, help="only events that arrived at or before this unix time")
+    p.add_argument("--limit", type=int, default=None, help="stop after this many events")
+    p.add_argument("--url", default=None, help="live gateway URL; default runs the pipeline in-process on fakeredis")
+    p.add_argument("--synthesize", type=int, default=0, help="first write this many synthetic events to capture_dir")
+    p.add_argument("--rate", type=float, default=1000.0, help="--synthesize: mean arrival rate (events/s)")
+    p.add_argument("--seed", type=int, default=7)
+    args = p.parse_args()
+
+    if args.synthesize:
+        synthesize(args.capture_dir, args.synthesize, args.rate, args.seed)
+
+    capture = load_service("ingestion-gateway", "capture")
+    records = []
+    for rec in capture.read_capture(args.capture_dir, args.start, args.end):
+        records.append(rec)
+        if args.limit and len(records) >= args.limit:
+            break
+    if not records:
+        raise SystemExit("no events in capture range")
+
+    async def run() -> dict:
+        if args.url:
+            async with httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+                result = await replay(records, client, args.url, auth_headers("replay"), args.speed, args.concurrency)
+            return {"target": args.url, **result}
+        server = fakeredis.FakeServer()
+        client, url, fusion = in_process_pipeline(server)
+        async with client:
+            result = await replay(records, client, url, auth_headers("replay"), args.speed, args.concurrency)
+        return {"target": "in-process", **result, **state_summary(fusion, server)}
+
+    print(json.dumps(asyncio.run(run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
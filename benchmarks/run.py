@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the service hot paths, for release-to-release regression checks.
+
+Everything runs in-process against fakeredis, so a run needs no cluster:
+
+  fusion      fuse() on new and existing tracks; the /fuse handler, threaded and async
+  validation  sanity_check() on clean and out-of-bounds observations
+  track_api   GET /tracks and GET /tracks/{id} at 1k/10k/100k stored tracks
+  optimizer   compute_tasking() with 1k/10k/100k objects in the revisit scheduler
+  planner     build_plan() latency versus snapshot size (cold and warm visibility cache)
+  pipeline    gateway -> validation -> fusion at a nominal rate and at 3x (NFR-003)
+
+Results are one JSON document. Every metric is flat-keyed
+(`track_api.list.10000`) with a value, a unit and which direction is better, so
+two runs can be compared mechanically.
+
+Usage:
+  python3 benchmarks/run.py --out results.json
+  python3 benchmarks/run.py --quick --only fusion validation
+  python3 benchmarks/run.py --compare baseline.json                       # run, then compare
+  python3 benchmarks/run.py --current results.json --compare baseline.json  # compare two saved runs
+
+Output:
+  One JSON document on stdout ({"meta", "results"} plus "comparison" with
+  --compare). With --compare the exit status is 1 if any metric regressed by
+  more than --threshold.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import fakeredis
+import yaml
+
+import replay
+from _harness import ROOT, auth_headers, bind_redis, load_service, measure_rps
+
+SCHEMA_VERSION = 1
+
+
+def metric(value: float, unit: str, better: str = "higher", **extra) -> dict:
+    return {"value": value, "unit": unit, "better": better, **extra}
+
+
+def rps_metric(m: dict) -> dict:
+    return metric(m["rps"], "ops/s", mean_ms=m["mean_ms"], n=m["requests"])
+
+
+def latency_metric(fn, repeat: int) -> dict:
+    """Median and best of `repeat` calls, in ms; the median is the compared value."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(1000 * (time.perf_counter() - start))
+    samples.sort()
+    return metric(round(samples[len(samples) // 2], 3), "ms", "lower", min_ms=round(samples[0], 3), n=repeat)
+
+
+def make_events(n: int, n_objects: int, seed: int) -> list:
+    events = load_service("sensor-sim", "events")
+    rng = random.Random(seed)
+    sensors = [("radar-1", "radar"), ("optical-1", "optical"), ("space-1", "space")]
+    return [events.make_event(*sensors[i % len(sensors)], rng, n_objects, i) for i in range(n)]
+
+
+def bench_fusion(args) -> dict:
+    from fastapi.responses import Response
+
+    fusion = load_service("fusion-engine")
+    bind_redis(fusion, fakeredis.FakeServer())
+    evts = [fusion.ObservationEvent(**e) for e in make_events(1000, 200, args.seed)]
+    prev = fusion.fuse(None, evts[0])
+
+    i = itertools.count()
+    out = {
+        "fusion.fuse.new": rps_metric(measure_rps(lambda: fusion.fuse(None, evts[next(i) % len(evts)]), args.duration)),
+        "fusion.fuse.update": rps_metric(measure_rps(lambda: fusion.fuse(prev, evts[next(i) % len(evts)]), args.duration)),
+    }
+    # Handler without HTTP: WATCH/MULTI transaction, stats and change feed writes
+    out["fusion.fuse_observation"] = rps_metric(
+        measure_rps(lambda: fusion.fuse_observation(evts[next(i) % len(evts)], Response(), None, None, None), args.duration)
+    )
+    loop = asyncio.new_event_loop()
+    try:
+        out["fusion.fuse_observation_async"] = rps_metric(
+            measure_rps(
+                lambda: loop.run_until_complete(fusion.fuse_observation_async(evts[next(i) % len(evts)], Response(), None, None, None)),
+                args.duration,
+            )
+        )
+    finally:
+        loop.close()
+    return out
+
+
+def bench_validation(args) -> dict:
+    validation = load_service("validation-service")
+    evts = [validation.ObservationEvent(**e) for e in make_events(1000, 200, args.seed)]
+    bad = []
+    for e in evts[:100]:
+        b = e.model_copy(deep=True)
+        b.measurement["x_km"] = 90000.0
+        bad.append(b)
+
+    i = itertools.count()
+    return {
+        "validation.sanity_check.clean": rps_metric(measure_rps(lambda: validation.sanity_check(evts[next(i) % len(evts)]), args.duration)),
+        "validation.sanity_check.flagged": rps_metric(measure_rps(lambda: validation.sanity_check(bad[next(i) % len(bad)]), args.duration)),
+    }
+
+
+def bench_track_api(args) -> dict:
+    from fastapi.testclient import TestClient
+    from track_api_passthrough import seed_tracks
+
+    mod = load_service("track-api")
+    headers = auth_headers()
+    out = {}
+    # One event loop for the whole run: the async Redis clients' connections belong to it
+    with TestClient(mod.app) as client:
+        for n in args.track_api_sizes:
+            bind_redis(mod, fakeredis.FakeServer())
+            seed_tracks(mod, n)
+            list_url = f"/tracks?limit={args.list_limit}"
+            get_url = f"/tracks/obj-{n // 2:06d}"
+            out[f"track_api.list.{n}"] = rps_metric(measure_rps(lambda: client.get(list_url, headers=headers).raise_for_status(), args.duration))
+            out[f"track_api.get.{n}"] = rps_metric(measure_rps(lambda: client.get(get_url, headers=headers).raise_for_status(), args.duration))
+    return out
+
+
+def bench_optimizer(args) -> dict:
+    optimizer = load_service("mission-optimizer")
+    scheduler_mod = load_service("mission-optimizer", "scheduler")
+    with open(ROOT / "config" / "policy.yaml") as f:
+        sensors = scheduler_mod.sensors_from_policy(yaml.safe_load(f) or {}) or optimizer.DEFAULT_SENSORS
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    out = {}
+    for n in args.optimizer_sizes:
+        scheduler = scheduler_mod.RevisitScheduler(
+            sensors, optimizer.SLOT_SECONDS, optimizer.HORIZON_SLOTS, optimizer.REVISIT_MIN_SECONDS, optimizer.REVISIT_MAX_SECONDS
+        )
+        regimes = {g: 0 for g in optimizer.REGIMES}
+        low = 0
+        for k in range(n):
+            conf = rng.uniform(0.5, 0.99)
+            regime = rng.choice(optimizer.REGIMES)
+            regimes[regime] += 1
+            low += conf < optimizer.LOW_CONF_THRESHOLD
+            scheduler.update(f"obj-{k:06d}", conf, now - rng.uniform(0, 3600), regime)
+        stats = {"tracks_total": n, "low_conf": low, "regimes": regimes}
+        out[f"optimizer.compute_tasking.{n}"] = latency_metric(lambda: optimizer.compute_tasking(stats, scheduler), args.repeat)
+    return out
+
+
+def bench_planner(args) -> dict:
+    os.environ.setdefault("POLICY_PATH", str(ROOT / "config" / "policy.yaml"))
+    planner = load_service("mission-planning-agent", "planner", package="src")
+    models = load_service("mission-planning-agent", "models", package="src")
+    track_api = load_service("mission-planning-agent", "tools.track_api", package="src")
+    visibility = load_service("mission-planning-agent", "visibility", package="src")
+    from planner_visibility import make_tracks
+
+    import numpy as np
+
+    rng = np.random.default_rng(args.seed)
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 120))
+    req = models.MissionRequest(mission_id="bench", time_horizon_min=30, max_tasks=10)
+    cache = track_api.snapshot_cache
+    cache.ttl_s = float("inf")
+    out = {}
+    for n in args.planner_sizes:
+        # Planning only: the snapshot is injected rather than fetched from track-api
+        cache._snapshot = track_api.TrackSnapshot(tracks=make_tracks(models, n, rng, stamp), fetched_at=time.time())
+        planner.visibility = visibility.VisibilityEngine()
+        out[f"planner.build_plan.cold.{n}"] = latency_metric(lambda: planner.build_plan(req), 1)
+        out[f"planner.build_plan.warm.{n}"] = latency_metric(lambda: planner.build_plan(req), args.repeat)
+    return out
+
+
+def bench_pipeline(args) -> dict:
+    capture = load_service("ingestion-gateway", "capture")
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        n = int(args.pipeline_rate * args.pipeline_seconds)
+        replay.synthesize(tmp, n, args.pipeline_rate, args.seed)
+        records = list(capture.read_capture(tmp))
+
+        async def run(speed: float) -> dict:
+            client, url, _ = replay.in_process_pipeline(fakeredis.FakeServer())
+            async with client:
+                return await replay.replay(records, client, url, auth_headers("bench"), speed, 64)
+
+        for label, speed in (("1x", 1.0), ("3x", 3.0)):
+            res = asyncio.run(run(speed))
+            offered = len(records) / (res["capture_span_s"] / speed) if res["capture_span_s"] else 0.0
+            extra = dict(
+                offered_rps=round(offered, 1),
+                ok=res["ok"],
+                events=res["events"],
+                # Keeping up: everything accepted, no backlog building past the capture's own length
+                kept_up=res["ok"] == res["events"] and res["elapsed_s"] <= 1.1 * res["capture_span_s"] / speed + 1.0,
+            )
+            out[f"pipeline.throughput.{label}"] = metric(res["achieved_rps"], "events/s", **extra)
+            out[f"pipeline.latency_p99.{label}"] = metric(res["latency_ms"]["p99"], "ms", "lower", p50_ms=res["latency_ms"]["p50"])
+        res = asyncio.run(run(0))
+        out["pipeline.throughput.max"] = metric(res["achieved_rps"], "events/s", ok=res["ok"], events=res["events"])
+    return out
+
+
+SUITES = {
+    "fusion": bench_fusion,
+    "validation": bench_validation,
+    "track_api": bench_track_api,
+    "optimizer": bench_optimizer,
+    "planner": bench_planner,
+    "pipeline": bench_pipeline,
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "-C", str(ROOT), "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> dict:
+    """Relative change per metric present in both runs; regressions are moves in the worse direction beyond `threshold`."""
+    rows = {}
+    regressions, improvements = [], []
+    for key, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if cur.get("better", "higher") == "higher" else change
+        status = "regression" if worse > threshold else "improvement" if worse < -threshold else "ok"
+        rows[key] = {"baseline": base["value"], "current": cur["value"], "unit": cur["unit"], "change_pct": round(100 * change, 1), "status": status}
+        if status == "regression":
+            regressions.append(key)
+        elif status == "improvement":
+            improvements.append(key)
+    return {
+        "baseline_commit": baseline.get("meta", {}).get("git_commit", ""),
+        "threshold_pct": round(100 * threshold, 1),
+        "regressions": regressions,
+        "improvements": improvements,
+        "missing": sorted(set(baseline["results"]) - set(current["results"])),
+        "metrics": rows,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--only", nargs="+", choices=sorted(SUITES), default=None, help="suites to run (default: all)")
+    p.add_argument("--quick", action="store_true", help="smaller sizes and shorter measurements, for CI smoke runs")
+    p.add_argument("--duration", type=float, default=None, help="seconds per throughput measurement")
+    p.add_argument("--repeat", type=int, default=None, help="calls per latency measurement")
+    p.add_argument("--list-limit", type=int, default=150, help="track_api: limit passed to GET /tracks (planner default is 150)")
+    p.add_argument("--pipeline-rate", type=float, default=100.0, help="pipeline: nominal (1x) observation rate, events/s")
+    p.add_argument("--seed", type=int, default=3)
+    p.add_argument("--out", default=None, help="also write the results document here (use as a later --compare baseline)")
+    p.add_argument("--compare", default=None, help="baseline results document")
+    p.add_argument("--current", default=None, help="with --compare: compare this saved document instead of running")
+    p.add_argument("--threshold", type=float, default=0.15, help="relative change that counts as a regression")
+    args = p.parse_args()
+
+    args.duration = args.duration or (0.5 if args.quick else 2.0)
+    args.repeat = args.repeat or (5 if args.quick else 20)
+    args.track_api_sizes = [1000, 10000] if args.quick else [1000, 10000, 100000]
+    args.optimizer_sizes = [1000, 10000] if args.quick else [1000, 10000, 100000]
+    args.planner_sizes = [150, 1000] if args.quick else [150, 1000, 5000]
+    args.pipeline_seconds = 3.0 if args.quick else 10.0
+
+    if args.current:
+        with open(args.current) as f:
+            doc = json.load(f)
+    else:
+        results = {}
+        timings = {}
+        for name in args.only or SUITES:
+            start = time.perf_counter()
+            results.update(SUITES[name](args))
+            timings[name] = round(time.perf_counter() - start, 1)
+        doc = {
+            "meta": {
+                "schema": SCHEMA_VERSION,
+                "git_commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "quick": args.quick,
+                "suite_seconds": timings,
+            },
+            "results": results,
+        }
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(doc, f, indent=2)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            doc["comparison"] = compare(doc, json.load(f), args.threshold)
+        status = 1 if doc["comparison"]["regressions"] else 0
+    print(json.dumps(doc, indent=2))
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
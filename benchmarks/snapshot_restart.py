@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Warm restart from the track snapshot (TRACK_SNAPSHOT_PATH) vs rebuilding from Redis.
+
+  write      mission-optimizer's snapshot write (catalogue scan + file)
+  optimizer  revisit scheduler bootstrap: full catalogue rescan and JSON decode
+             vs snapshot load + replay of the track:changes written since
+  track_api  opening the snapshot and looking tracks up in it
+  fusion     refilling an empty Redis from the snapshot, with the optimizer
+             leader trying to seed track:stats throughout; tracks_total must
+             equal the size of track:index afterwards
+
+Usage:
+  python3 benchmarks/snapshot_restart.py
+  python3 benchmarks/snapshot_restart.py --tracks 200000 --changes 5000 --rtt-ms 0.5
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import fakeredis
+
+from _harness import bind_redis, load_service
+from sentinel_common.keys import changes_key
+from track_api_passthrough import seed_tracks
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, round(time.perf_counter() - start, 4)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tracks", type=int, default=50000)
+    p.add_argument("--changes", type=int, default=2000, help="track:changes entries written after the snapshot")
+    p.add_argument("--lookups", type=int, default=10000)
+    p.add_argument("--rtt-ms", type=float, default=0.0, help="simulated Redis round trip")
+    args = p.parse_args()
+    rtt_s = args.rtt_ms / 1000.0
+
+    track_api = load_service("track-api")
+    optimizer = load_service("mission-optimizer")
+    fusion = load_service("fusion-engine")
+    server = fakeredis.FakeServer()
+    bind_redis(track_api, server, rtt_s)
+    bind_redis(optimizer, server, rtt_s)
+    seed_tracks(track_api, args.tracks)
+
+    path = os.path.join(tempfile.mkdtemp(), "tracks.snap")
+    optimizer.SNAPSHOT_PATH = path
+    fusion.SNAPSHOT_PATH = path
+    n, write_s = timed(optimizer.write_track_snapshot)
+    results = {"tracks": args.tracks, "rtt_ms": args.rtt_ms, "snapshot_bytes": os.path.getsize(path)}
+    results["write"] = {"records": n, "seconds": write_s}
+
+    # Fusion writes landing after the snapshot, which a warm start must replay
+    rng = random.Random(7)
+    pipe = optimizer.r.pipeline(transaction=False)
+    for oid in {f"obj-{rng.randrange(args.tracks):06d}" for _ in range(args.changes)}:
+        t = json.loads(optimizer.r.hget(optimizer.track_key(oid), "json"))
+        t.update(confidence=0.9, last_update="2026-01-01T00:10:00Z")
+        pipe.hset(optimizer.track_key(oid), mapping={"json": json.dumps(t), "confidence": 0.9})
+        pipe.xadd(changes_key(), {"object_id": oid, "confidence": 0.9, "last_update": t["last_update"], "regime": optimizer.orbit_regime(t["state"])})
+    pipe.execute()
+
+    def scheduler():
+        return optimizer.RevisitScheduler(
+            optimizer.load_sensors(), optimizer.SLOT_SECONDS, optimizer.HORIZON_SLOTS, optimizer.REVISIT_MIN_SECONDS, optimizer.REVISIT_MAX_SECONDS
+        )
+
+    def cold():
+        sched, feed = scheduler(), optimizer.change_feed()
+        optimizer.resync(sched, feed)
+        optimizer.apply_changes(sched, feed)
+        return sched
+
+    def warm():
+        sched = scheduler()
+        feed = optimizer.warm_start(sched)
+        replayed = optimizer.apply_changes(sched, feed)
+        return sched, replayed
+
+    cold_sched, cold_s = timed(cold)
+    (warm_sched, replayed), warm_s = timed(warm)
+    results["optimizer"] = {
+        "rescan_s": cold_s,
+        "warm_start_s": warm_s,
+        "replayed_changes": replayed,
+        "speedup": round(cold_s / warm_s, 1) if warm_s else None,
+        "same_schedule": cold_sched._entries.keys() == warm_sched._entries.keys()
+        and all(cold_sched._entries[k][0] == warm_sched._entries[k][0] for k in cold_sched._entries),
+    }
+
+    snap, open_s = timed(lambda: track_api.TrackSnapshot.open(path))
+    ids = [f"obj-{rng.randrange(args.tracks):06d}" for _ in range(args.lookups)]
+    _, lookup_s = timed(lambda: [snap.raw_json(snap.find(oid)) for oid in ids])
+    results["track_api"] = {"open_ms": round(1000 * open_s, 3), "lookup_us": round(1e6 * lookup_s / args.lookups, 2)}
+    snap.close()
+
+    # An empty Redis, as after a restart: the optimizer leader's cycle finds track:stats
+    # unseeded and keeps trying to seed it once the first tracks are back
+    server = fakeredis.FakeServer()
+    bind_redis(fusion, server, rtt_s)
+    bind_redis(optimizer, server, rtt_s)
+    out = {}
+    restore = threading.Thread(target=lambda: out.update(zip(("restored", "restore_s"), timed(fusion.restore_from_snapshot))))
+    restore.start()
+    while restore.is_alive() and not fusion.r.scard(fusion.idx_key()):
+        time.sleep(0.001)
+    seed_attempts = 0
+    while restore.is_alive() and not fusion.r.hexists(fusion.stats_key(), "seeded"):
+        optimizer.rebuild_stats()
+        seed_attempts += 1
+        time.sleep(0.01)
+    restore.join()
+    restored, restore_s = out["restored"], out["restore_s"]
+    tracks_total = int(fusion.r.hget(fusion.stats_key(), "tracks_total") or 0)
+    results["fusion"] = {
+        "restored": restored,
+        "restore_s": restore_s,
+        "tracks_per_s": round(restored / restore_s, 1) if restore_s else None,
+        "seed_attempts": seed_attempts,
+        "stats_tracks_total": tracks_total,
+        "index_size": fusion.r.scard(fusion.idx_key()),
+        "stats_match_index": tracks_total == fusion.r.scard(fusion.idx_key()),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
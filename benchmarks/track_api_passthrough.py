@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Requests/s for track-api list and get, decode/re-encode vs raw passthrough.
+
+Usage:
+  python3 benchmarks/track_api_passthrough.py
+  python3 benchmarks/track_api_passthrough.py --tracks 10000 --limit 500 --duration 5
+
+Output:
+  One JSON document on stdout.
+"""
+
+import argparse
+import json
+import random
+
+import fakeredis
+import orjson
+from fastapi.testclient import TestClient
+
+from _harness import auth_headers, bind_redis, load_service, measure_rps
+from sentinel_common.keys import idx_bucket_key, shard_bucket
+
+
+def seed_tracks(mod, n: int) -> None:
+    rng = random.Random(7)
+    pipe = mod.r_raw.pipeline(transaction=False)
+    for i in range(n):
+        oid = f"obj-{i:06d}"
+        t = {
+            "track_id": f"trk-{oid}",
+            "object_id": oid,
+            "last_update": "2026-01-01T00:00:00Z",
+            "state": {k: rng.uniform(-20000, 20000) for k in ["x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms"]},
+            "confidence": round(rng.uniform(0.6, 0.99), 3),
+            "sources": [{"sensor_id": "radar-1", "timestamp": "2026-01-01T00:00:00Z"}] * 10,
+            "flags": ["OK"],
+        }
+        pipe.hset(mod.track_key(oid), mapping={"json": orjson.dumps(t), "confidence": t["confidence"]})
+        pipe.sadd(mod.idx_key(), oid)
+        pipe.sadd(idx_bucket_key(shard_bucket(oid)), oid)
+    pipe.execute()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--tracks", type=int, default=2000)
+    p.add_argument("--limit", type=int, default=150, help="limit passed to GET /tracks (planner default is 150)")
+    p.add_argument("--duration", type=float, default=2.0, help="seconds per measurement")
+    args = p.parse_args()
+
+    mod = load_service("track-api")
+    bind_redis(mod, fakeredis.FakeServer())
+    seed_tracks(mod, args.tracks)
+
+    headers = auth_headers()
+    list_url = f"/tracks?limit={args.limit}"
+    get_url = f"/tracks/{'obj-%06d' % (args.tracks // 2)}"
+
+    results = {"tracks": args.tracks, "limit": args.limit}
+    # One event loop for the whole run: the async Redis clients' connections belong to it
+    with TestClient(mod.app) as client:
+        for label, passthrough in (("decode_reencode", False), ("passthrough", True)):
+            mod.PASSTHROUGH = passthrough
+            results[label] = {
+                "list": measure_rps(lambda: client.get(list_url, headers=headers).raise_for_status(), args.duration),
+                "get": measure_rps(lambda: client.get(get_url, headers=headers).raise_for_status(), args.duration),
+            }
+
+    for op in ("list", "get"):
+        results[f"{op}_speedup"] = round(results["passthrough"][op]["rps"] / results["decode_reencode"][op]["rps"], 2)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Code every Sentinel SDA service used to carry its own copy of.
+
+  auth        verify_bearer, issue_token (service JWTs)
+  keys        Redis key layout of the track catalogue and conjunction alerts
+  changes     ChangeFeed, incremental reader of track:changes
+  models      ObservationEvent
+  codec       MessagePack / gzip / zstd bodies, negotiated per request
+  redis_pool  pooled, lazily connected Redis clients
+  service     /health body and /metrics route
+  tracing     traceparent and Server-Timing helpers for the ingest trace
+  regimes     orbit_regime, the LEO/MEO/GEO/HEO classification of a track state
+  snapshot    mmap-readable snapshot of the track catalogue
+  profiling   /debug profiling endpoints
+
+`import sentinel_common` is free: the names below resolve to their submodule
+on first access, and the submodules import PyJWT, redis and prometheus_client
+only when a function needs them, so a service pays for what it uses and only
+when it first uses it.
+"""
+import importlib
+
+_EXPORTS = {
+    "verify_bearer": "auth",
+    "issue_token": "auth",
+    "track_key": "keys",
+    "idx_key": "keys",
+    "idx_bucket_key": "keys",
+    "shard_bucket": "keys",
+    "stats_key": "keys",
+    "changes_key": "keys",
+    "restore_lock_key": "keys",
+    "conjunctions_key": "keys",
+    "conjunction_tca_key": "keys",
+    "conjunction_meta_key": "keys",
+    "ChangeFeed": "changes",
+    "ObservationEvent": "models",
+    "orbit_regime": "regimes",
+    "encode_body": "codec",
+    "encode_response": "codec",
+    "observation_body": "codec",
+    "redis_client": "redis_pool",
+    "async_redis_client": "redis_pool",
+    "redis_unavailable": "redis_pool",
+    "health_body": "service",
+    "redis_ping": "service",
+    "add_metrics_route": "service",
+    "debug_router": "profiling",
+    "TrackSnapshot": "snapshot",
+    "SnapshotEntry": "snapshot",
+    "write_snapshot": "snapshot",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
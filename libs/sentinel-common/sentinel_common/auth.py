@@ -0,0 +1,37 @@
+"""
+Service-to-service JWTs (HS256, shared secret from secret-jwt).
+
+PyJWT is imported on the first verify or issue rather than at service import,
+so /health answers (and the pod turns Ready) before it is loaded.
+"""
+import os
+import time
+from typing import Optional
+
+from fastapi import HTTPException
+
+JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
+JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
+
+
+def verify_bearer(auth: Optional[str]) -> dict:
+    if not auth or not auth.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    token = auth.split(" ", 1)[1].strip()
+
+    import jwt
+
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
+        if payload.get("svc") is None:
+            raise HTTPException(status_code=401, detail="Invalid token payload")
+        return payload
+    except jwt.PyJWTError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+
+
+def issue_token(svc: str) -> str:
+    import jwt
+
+    payload = {"svc": svc, "iss": JWT_ISSUER, "iat": int(time.time())}
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
@@ -0,0 +1,53 @@
+"""Incremental reader of fusion-engine's track:changes stream (mission-optimizer, conjunction-screener)."""
+from typing import Iterator
+
+from .keys import changes_key
+
+
+class ChangeFeed:
+    """
+    `position` counts entries ever added up to `last_id`, which detects when the
+    stream's MAXLEN trimming has dropped entries this reader never saw.
+    """
+
+    def __init__(self, r, batch: int = 1000):
+        self.r = r
+        self.batch = batch
+        self.last_id = "0-0"
+        self.position = 0
+
+    def mark(self) -> None:
+        """Start reading from the stream's current tail."""
+        import redis
+
+        try:
+            info = self.r.xinfo_stream(changes_key())
+            self.last_id = info.get("last-generated-id") or "0-0"
+            self.position = int(info.get("entries-added", 0))
+        except redis.ResponseError:
+            self.last_id, self.position = "0-0", 0
+
+    def has_gap(self) -> bool:
+        import redis
+
+        try:
+            info = self.r.xinfo_stream(changes_key())
+        except redis.ResponseError:
+            return False
+        if "entries-added" not in info:
+            return False  # pre-7.0 Redis: no way to tell, rely on periodic resync
+        if int(info["entries-added"]) < self.position:
+            return True  # the stream was recreated (Redis lost its data), so last_id means nothing
+        trimmed = int(info["entries-added"]) - int(info.get("length", 0))
+        return trimmed > self.position
+
+    def read(self) -> Iterator[dict]:
+        while True:
+            resp = self.r.xread({changes_key(): self.last_id}, count=self.batch)
+            entries = resp[0][1] if resp else []
+            for entry_id, fields in entries:
+                self.last_id = entry_id
+                self.position += 1
+                yield fields
+            if len(entries) < self.batch:
+                return
@@ -0,0 +1,272 @@
+"""
+Body formats and compression for the ingest chain and track-api.
+
+Formats are picked by Content-Type on requests and Accept on responses:
+
+  json     application/json (the default; anything unrecognised is JSON)
+  msgpack  application/msgpack (application/x-msgpack is accepted too)
+
+Compression is picked by Content-Encoding on requests and Accept-Encoding on
+responses: gzip or zstd. Response compression is off unless RESPONSE_ENCODINGS
+lists the encodings to offer (httpx asks for gzip and zstd on every request,
+and compressing for a client on the same network only costs CPU), and only
+applies from COMPRESS_MIN_BYTES up: a single observation or track is too small
+for the frame overhead to pay.
+
+Request bodies over MAX_BODY_BYTES, compressed or once decompressed, are 413.
+observation_body checks the bearer token before it reads the body, so an
+unauthenticated client cannot make a service inflate one.
+
+msgpack and zstandard are imported on first use. A build without one answers
+415 for bodies that need it and never offers it in a response.
+"""
+import json
+import os
+import threading
+import zlib
+from typing import Any, Mapping, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import ValidationError
+
+from .auth import verify_bearer
+from .models import ObservationEvent
+
+# An observation is well under 1 KB; this only stops a body (or what it inflates to) from exhausting memory
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(1024 * 1024)))
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Response encodings in order of preference, e.g. "zstd,gzip"; empty means responses are never compressed
+RESPONSE_ENCODINGS = tuple(e.strip() for e in os.getenv("RESPONSE_ENCODINGS", "").split(",") if e.strip() in ("gzip", "zstd"))
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+FORMATS = {"json": JSON, "msgpack": MSGPACK}
+ENCODINGS = ("identity", "gzip", "zstd")
+
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+# zstd contexts are costly to set up next to a few hundred bytes of body, and not thread-safe
+_local = threading.local()
+
+
+class CodecError(ValueError):
+    """Raised for a body format or encoding this build cannot read or write (HTTP 415)."""
+
+
+class BodyTooLarge(ValueError):
+    """Raised for a body over MAX_BODY_BYTES, before or after decompression (HTTP 413)."""
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise CodecError("MessagePack is not available in this build")
+    return msgpack
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise CodecError("zstd is not available in this build")
+    return zstandard
+
+
+def _zstd_contexts():
+    if not hasattr(_local, "zstd"):
+        zstandard = _zstd()
+        _local.zstd = (zstandard.ZstdCompressor(level=3), zstandard.ZstdDecompressor())
+    return _local.zstd
+
+
+def _json():
+    """orjson where the service has it (fusion-engine, track-api), else the stdlib."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def available(name: str) -> bool:
+    try:
+        if name == "msgpack":
+            _msgpack()
+        elif name == "zstd":
+            _zstd()
+    except CodecError:
+        return False
+    return True
+
+
+def media_type(content_type: Optional[str]) -> str:
+    mt = (content_type or "").split(";", 1)[0].strip().lower()
+    return MSGPACK if mt in _MSGPACK_TYPES else JSON
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        c = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return c.compress(body) + c.flush()
+    if encoding == "zstd":
+        return _zstd_contexts()[0].compress(body)
+    return body
+
+
+def _zstd_decompress(body: bytes, limit: int) -> bytes:
+    # Streamed, so a frame header claiming a huge content size allocates nothing up front
+    out, size = [], 0
+    for chunk in _zstd_contexts()[1].read_to_iter(body):
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge(f"body exceeds {limit} bytes")
+        out.append(chunk)
+    return b"".join(out)
+
+
+def decompress(body: bytes, encoding: Optional[str], limit: int = MAX_BODY_BYTES) -> bytes:
+    """`body` undone from `encoding`. BodyTooLarge as soon as the output passes `limit` bytes."""
+    encoding = (encoding or "identity").strip().lower()
+    if len(body) > limit:
+        raise BodyTooLarge(f"body exceeds {limit} bytes")
+    if encoding == "identity":
+        return body
+    try:
+        if encoding == "gzip":
+            # wbits 47: gzip or zlib, from the header; output stops at limit + 1 bytes
+            out = zlib.decompressobj(47).decompress(body, limit + 1)
+            if len(out) > limit:
+                raise BodyTooLarge(f"body exceeds {limit} bytes")
+            return out
+        if encoding == "zstd":
+            return _zstd_decompress(body, limit)
+    except (CodecError, BodyTooLarge):
+        raise
+    except Exception as e:
+        raise ValueError(f"body is not valid {encoding}: {e}")
+    raise CodecError(f"unsupported Content-Encoding {encoding!r}")
+
+
+def dumps(obj: Any, mt: str = JSON) -> bytes:
+    if mt == MSGPACK:
+        return _msgpack().packb(obj)
+    orjson = _json()
+    return orjson.dumps(obj) if orjson else json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(body: bytes, mt: str = JSON) -> Any:
+    if mt == MSGPACK:
+        return _msgpack().unpackb(body)
+    orjson = _json()
+    return orjson.loads(body) if orjson else json.loads(body)
+
+
+def encode_body(obj: Any, fmt: str = "json", encoding: str = "identity") -> tuple[bytes, dict]:
+    """Request body and headers for posting `obj` as `fmt` ("json" | "msgpack"), compressed with `encoding`."""
+    mt = FORMATS[fmt]
+    headers = {"Content-Type": mt}
+    if fmt != "json":
+        headers["Accept"] = mt
+    body = compress(dumps(obj, mt), encoding)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return body, headers
+
+
+def _accepted(header: Optional[str]) -> list[str]:
+    """Tokens of an Accept or Accept-Encoding header with q > 0, highest q first."""
+    ranked = []
+    for i, part in enumerate((header or "").split(",")):
+        token, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if token and q > 0:
+            ranked.append((-q, i, token.lower()))
+    return [token for _, _, token in sorted(ranked)]
+
+
+def response_media_type(accept: Optional[str]) -> str:
+    """MessagePack if the client prefers it (and this build has it), otherwise JSON."""
+    for token in _accepted(accept):
+        if token in _MSGPACK_TYPES and available("msgpack"):
+            return MSGPACK
+        if token in (JSON, "application/*", "*/*"):
+            return JSON
+    return JSON
+
+
+def response_encoding(accept_encoding: Optional[str], size: int, offered: tuple[str, ...], min_bytes: int) -> str:
+    """The first of `offered` the client accepts, if the body is worth compressing."""
+    if size < min_bytes or not accept_encoding:
+        return "identity"
+    accepted = _accepted(accept_encoding)
+    for encoding in offered:
+        if (encoding in accepted or "*" in accepted) and available(encoding):
+            return encoding
+    return "identity"
+
+
+async def observation_body(request: Request) -> ObservationEvent:
+    """
+    FastAPI dependency: the request body as an ObservationEvent, in whichever format and
+    encoding it was sent. The bearer token is checked first; the body is not read without it.
+    """
+    verify_bearer(request.headers.get("authorization"))
+    try:
+        body = decompress(await request.body(), request.headers.get("content-encoding"))
+        mt = media_type(request.headers.get("content-type"))
+        if mt == JSON:
+            return ObservationEvent.model_validate_json(body)
+        return ObservationEvent.model_validate(loads(body, mt))
+    except CodecError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValidationError as e:
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def encode_response(
+    content: Any,
+    accept: Optional[str],
+    accept_encoding: Optional[str],
+    raw: Optional[bytes] = None,
+    raw_type: str = JSON,
+    headers: Optional[Mapping[str, str]] = None,
+):
+    """
+    `content` in the format and compression the client asked for. `raw`, if
+    given, is `content` already encoded as `raw_type` and is sent as-is to a
+    client that wants that format; `content` may then be None. With neither a
+    format nor an encoding to negotiate, `content` comes back as-is for FastAPI
+    to serialise.
+    """
+    mt = response_media_type(accept)
+    if raw is not None and mt == raw_type:
+        body = raw
+    elif raw is None and mt == JSON and not (accept_encoding and RESPONSE_ENCODINGS):
+        return content
+    else:
+        body = dumps(loads(raw, raw_type) if content is None else content, mt)
+    headers = {k: v for k, v in (headers or {}).items() if k.lower() != "content-length"}
+    encoding = response_encoding(accept_encoding, len(body), RESPONSE_ENCODINGS, COMPRESS_MIN_BYTES)
+    if encoding != "identity":
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept, Accept-Encoding"
+    return Response(body, media_type=mt, headers=headers)
+
+
+def relay_response(resp, accept: Optional[str], accept_encoding: Optional[str], headers: Optional[Mapping[str, str]] = None) -> Response:
+    """A downstream httpx response's body, re-encoded only if the client wants another format."""
+    # httpx has already undone the downstream Content-Encoding
+    return encode_response(None, accept, accept_encoding, resp.content, media_type(resp.headers.get("content-type")), headers)
@@ -0,0 +1,50 @@
+"""Redis layout of the track catalogue, written by fusion-engine and read by track-api, mission-optimizer and conjunction-screener."""
+import zlib
+
+# track:index split by CRC32 of the object id, so a hash shard (CRC32 mod n, n dividing
+# this) is a union of whole buckets rather than a filter over the whole index
+SHARD_BUCKETS = 64
+
+
+def track_key(object_id: str) -> str:
+    return f"track:{object_id}"
+
+
+def idx_key() -> str:
+    return "track:index"
+
+
+def shard_bucket(object_id: str) -> int:
+    return zlib.crc32(object_id.encode()) % SHARD_BUCKETS
+
+
+def idx_bucket_key(bucket: int) -> str:
+    return f"track:index:{bucket}"
+
+
+def stats_key() -> str:
+    return "track:stats"
+
+
+def changes_key() -> str:
+    return "track:changes"
+
+
+def restore_lock_key() -> str:
+    """Held by the fusion-engine replica refilling the catalogue from the track snapshot."""
+    return "track:restore:lock"
+
+
+# Close approaches found by conjunction-screener, served by track-api
+def conjunctions_key() -> str:
+    """Hash: "<object_a>|<object_b>" -> conjunction JSON."""
+    return "conjunction:alerts"
+
+
+def conjunction_tca_key() -> str:
+    """Sorted set of the same pair ids, scored by time of closest approach."""
+    return "conjunction:tca"
+
+
+def conjunction_meta_key() -> str:
+    return "conjunction:meta"
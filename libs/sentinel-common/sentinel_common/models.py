@@ -0,0 +1,21 @@
+"""
+Wire models shared along the ingest chain (observation.schema.json).
+
+Pydantic builds a model's validator when the class is defined, so defining
+ObservationEvent once here means each service process compiles it once,
+at import, and never on the request path.
+"""
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ObservationEvent(BaseModel):
+    event_id: str
+    sensor_id: str
+    sensor_type: str
+    timestamp: str
+    object_id: str
+    measurement: dict = Field(default_factory=dict)
+    quality: dict = Field(default_factory=dict)
+    integrity: Optional[dict] = None
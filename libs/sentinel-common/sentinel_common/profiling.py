@@ -0,0 +1,211 @@
+"""
+On-demand profiling endpoints, mounted under /debug behind the service's JWT check:
+
+  app.include_router(debug_router(verify_bearer))
+
+  GET  /debug/profile?seconds=10       sampling CPU profile of every thread, as
+                                       collapsed stacks (flamegraph.pl, speedscope, inferno)
+  POST /debug/memory/start?frames=25   start tracemalloc
+  GET  /debug/memory/snapshot          top allocation sites; becomes the baseline for /diff
+  GET  /debug/memory/diff              growth per allocation site since the last snapshot
+  POST /debug/memory/stop              stop tracemalloc and drop the snapshots
+  GET  /debug/runtime?seconds=1        event-loop lag, threadpool saturation, threads, GC
+
+Nothing runs until one of these is called: the sampler thread lives only for
+the duration of a profile, tracemalloc only between start and stop, and the
+loop-lag probe only for the duration of a /runtime request.
+"""
+import asyncio
+import gc
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+
+PROFILE_MAX_SECONDS = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "60"))
+
+# Leaf frames of threads parked on a lock, queue or selector; left out of CPU profiles by default
+IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+_profile_lock = threading.Lock()
+_memory_lock = threading.Lock()
+_baseline: Optional[tracemalloc.Snapshot] = None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval_s: float, include_idle: bool = False) -> Counter:
+    """Folded stacks ("thread;outer;...;leaf") -> sample count, from sys._current_frames every `interval_s`."""
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            leaf = (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name)
+            if not include_idle and leaf in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(tid, f"thread-{tid}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval_s)
+    return counts
+
+
+def _top_stats(stats, limit: int) -> list:
+    out = []
+    for s in stats[:limit]:
+        frame = s.traceback[0]
+        row = {"site": f"{frame.filename}:{frame.lineno}", "size_kb": round(s.size / 1024, 1), "count": s.count}
+        if hasattr(s, "size_diff"):
+            row.update(size_diff_kb=round(s.size_diff / 1024, 1), count_diff=s.count_diff)
+        out.append(row)
+    return out
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def debug_router(verify_bearer: Callable[[Optional[str]], dict]) -> APIRouter:
+    router = APIRouter(prefix="/debug")
+
+    @router.get("/profile")
+    async def cpu_profile(
+        seconds: float = 10.0,
+        interval_ms: float = 10.0,
+        include_idle: bool = False,
+        authorization: Optional[str] = Header(default=None),
+    ):
+        """Collapsed stacks, one `frames count` line each; feed to flamegraph.pl or open in speedscope."""
+        verify_bearer(authorization)
+        if not 0 < seconds <= PROFILE_MAX_SECONDS:
+            raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]")
+        if not _profile_lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        try:
+            # Own thread rather than the request threadpool, which is what is being profiled
+            counts = await asyncio.get_running_loop().run_in_executor(
+                None, sample_stacks, seconds, max(1.0, interval_ms) / 1000.0, include_idle
+            )
+        finally:
+            _profile_lock.release()
+        body = "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+        return PlainTextResponse(body, headers={"X-Profile-Samples": str(sum(counts.values()))})
+
+    @router.post("/memory/start")
+    def memory_start(frames: int = 25, authorization: Optional[str] = Header(default=None)):
+        verify_bearer(authorization)
+        with _memory_lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, min(frames, 100)))
+            return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+    @router.get("/memory/snapshot")
+    def memory_snapshot(limit: int = 30, authorization: Optional[str] = Header(default=None)):
+        global _baseline
+        verify_bearer(authorization)
+        with _memory_lock:
+            if not tracemalloc.is_tracing():
+                raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /debug/memory/start first")
+            snap = tracemalloc.take_snapshot()
+            _baseline = snap
+            current, peak = tracemalloc.get_traced_memory()
+            return {
+                "traced_kb": round(current / 1024, 1),
+                "peak_kb": round(peak / 1024, 1),
+                "top": _top_stats(snap.statistics("lineno"), limit),
+            }
+
+    @router.get("/memory/diff")
+    def memory_diff(limit: int = 30, authorization: Optional[str] = Header(default=None)):
+        """Growth since the previous snapshot or diff; this call's snapshot becomes the next baseline."""
+        global _baseline
+        verify_bearer(authorization)
+        with _memory_lock:
+            if not tracemalloc.is_tracing() or _baseline is None:
+                raise HTTPException(status_code=409, detail="No baseline; GET /debug/memory/snapshot first")
+            snap = tracemalloc.take_snapshot()
+            stats = snap.compare_to(_baseline, "lineno")
+            _baseline = snap
+            return {
+                "growth_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+                "top": _top_stats(stats, limit),
+            }
+
+    @router.post("/memory/stop")
+    def memory_stop(authorization: Optional[str] = Header(default=None)):
+        global _baseline
+        verify_bearer(authorization)
+        with _memory_lock:
+            tracemalloc.stop()
+            _baseline = None
+            return {"tracing": False}
+
+    @router.get("/runtime")
+    async def runtime(seconds: float = 1.0, authorization: Optional[str] = Header(default=None)):
+        """Loop lag is how late a 10 ms sleep wakes up; saturation is the share of probes with every worker thread busy."""
+        import anyio.to_thread
+
+        verify_bearer(authorization)
+        seconds = max(0.1, min(seconds, 30.0))
+        loop = asyncio.get_running_loop()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        tick = 0.01
+        lags, busy, waiting = [], [], []
+        end = loop.time() + seconds
+        while loop.time() < end:
+            t0 = loop.time()
+            await asyncio.sleep(tick)
+            lags.append(max(0.0, loop.time() - t0 - tick))
+            stats = limiter.statistics()
+            busy.append(stats.borrowed_tokens)
+            waiting.append(stats.tasks_waiting)
+        lags.sort()
+        total = limiter.total_tokens
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            "window_s": seconds,
+            "loop_lag_ms": {
+                "p50": round(1000 * _percentile(lags, 0.50), 3),
+                "p99": round(1000 * _percentile(lags, 0.99), 3),
+                "max": round(1000 * (lags[-1] if lags else 0.0), 3),
+            },
+            "threadpool": {
+                "size": total,
+                "busy_max": max(busy, default=0),
+                "busy_mean": round(sum(busy) / len(busy), 2) if busy else 0.0,
+                "waiting_max": max(waiting, default=0),
+                "saturated_pct": round(100.0 * sum(1 for b in busy if b >= total) / len(busy), 1) if busy else 0.0,
+            },
+            "threads": sorted(t.name for t in threading.enumerate()),
+            "gc": {"counts": gc.get_count(), "collections": [s["collections"] for s in gc.get_stats()]},
+            "cpu_s": {"user": usage.ru_utime, "system": usage.ru_stime},
+            "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "tracemalloc": tracemalloc.is_tracing(),
+        }
+
+    return router
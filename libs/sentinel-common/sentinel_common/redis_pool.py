@@ -0,0 +1,139 @@
+"""
+Redis clients for the services, one connection pool per process and decode mode.
+
+`redis_client()` returns a stand-in that imports redis-py and builds the client
+on first use, so a module can keep its `r = redis_client()` global without
+paying for the import before the first request that touches Redis. Every
+client with the same decode mode draws from the same pool.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+REDIS_HOST = os.getenv("REDIS_HOST", "redis")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+# Unset: redis-py's default (no cap)
+REDIS_MAX_CONNECTIONS: Optional[int] = int(os.environ["REDIS_MAX_CONNECTIONS"]) if os.getenv("REDIS_MAX_CONNECTIONS") else None
+# Async clients have no threadpool bounding how many requests are in flight, so their
+# pool is capped and a command waits up to REDIS_POOL_TIMEOUT_SECONDS for a free
+# connection instead of opening one per concurrent request
+REDIS_ASYNC_MAX_CONNECTIONS = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", "64"))
+REDIS_POOL_TIMEOUT_SECONDS = float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", "5"))
+
+_pools: Dict[Tuple[bool, bool], Any] = {}
+_lock = threading.RLock()
+
+
+def _pool(is_async: bool, decode_responses: bool):
+    key = (is_async, decode_responses)
+    with _lock:
+        if key not in _pools:
+            kwargs = dict(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=decode_responses)
+            if is_async:
+                _pools[key] = fair_blocking_pool_class()(
+                    max_connections=REDIS_ASYNC_MAX_CONNECTIONS, timeout=REDIS_POOL_TIMEOUT_SECONDS, **kwargs
+                )
+            else:
+                from redis import ConnectionPool
+
+                _pools[key] = ConnectionPool(max_connections=REDIS_MAX_CONNECTIONS, **kwargs)
+        return _pools[key]
+
+
+_fair_pool_class = None
+
+
+def fair_blocking_pool_class():
+    """
+    redis.asyncio connection pool that waits for a free connection, serving waiters in arrival order.
+
+    redis-py's BlockingConnectionPool wakes a waiter on release, but a request arriving
+    in between takes the connection and the woken waiter queues again at the back;
+    with hundreds of requests in flight that starves a few of them for seconds. A
+    semaphore in front of the pool (FIFO since Python 3.11) keeps the wait fair.
+    """
+    global _fair_pool_class
+    if _fair_pool_class is None:
+        from redis.asyncio import ConnectionPool
+        from redis.exceptions import ConnectionError
+
+        class FairBlockingConnectionPool(ConnectionPool):
+            def __init__(self, max_connections: int = 50, timeout: Optional[float] = 20, **kwargs):
+                super().__init__(max_connections=max_connections, **kwargs)
+                self.timeout = timeout
+                self._slots = asyncio.Semaphore(max_connections)
+
+            async def get_connection(self, command_name, *keys, **options):
+                try:
+                    async with asyncio.timeout(self.timeout):
+                        await self._slots.acquire()
+                except TimeoutError as err:
+                    raise ConnectionError("No connection available.") from err
+                try:
+                    connection = self.get_available_connection()
+                except BaseException:
+                    self._slots.release()
+                    raise
+                try:
+                    await self.ensure_connection(connection)
+                except BaseException:
+                    # release() gives the slot back too
+                    await self.release(connection)
+                    raise
+                return connection
+
+            async def release(self, connection):
+                await super().release(connection)
+                self._slots.release()
+
+        _fair_pool_class = FairBlockingConnectionPool
+    return _fair_pool_class
+
+
+class LazyRedis:
+    """Proxy for a Redis client that is created on first attribute access."""
+
+    __slots__ = ("_factory", "_client")
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._client = None
+
+    def resolve(self):
+        if self._client is None:
+            with _lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+
+def redis_unavailable(exc: BaseException) -> bool:
+    """True for redis-py connection and timeout errors (Redis down or failing over), not command errors."""
+    if not type(exc).__module__.startswith("redis"):
+        return False
+    from redis.exceptions import ConnectionError, TimeoutError
+
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+def redis_client(decode_responses: bool = True) -> LazyRedis:
+    def make():
+        import redis
+
+        return redis.Redis(connection_pool=_pool(False, decode_responses))
+
+    return LazyRedis(make)
+
+
+def async_redis_client(decode_responses: bool = True) -> LazyRedis:
+    def make():
+        import redis.asyncio as aioredis
+
+        return aioredis.Redis(connection_pool=_pool(True, decode_responses))
+
+    return LazyRedis(make)
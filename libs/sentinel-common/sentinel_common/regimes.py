@@ -0,0 +1,26 @@
+"""Orbit regime of a track state: what track:stats counts and the revisit scheduler matches sensors on."""
+import math
+from typing import Any
+
+EARTH_RADIUS_KM = 6378.137
+REGIMES = ("LEO", "MEO", "GEO", "HEO")
+
+
+def _km(x: Any) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def orbit_regime(state: dict) -> str:
+    """By altitude of the state's position; a missing or null coordinate counts as 0."""
+    r_km = math.sqrt(sum(_km(state.get(k)) ** 2 for k in ("x_km", "y_km", "z_km")))
+    alt = r_km - EARTH_RADIUS_KM
+    if alt < 2000:
+        return "LEO"
+    if alt < 35286:
+        return "MEO"
+    if alt <= 36286:
+        return "GEO"
+    return "HEO"
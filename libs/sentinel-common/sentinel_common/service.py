@@ -0,0 +1,34 @@
+"""/health and /metrics pieces every service exposes."""
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+
+def health_body(service: str, redis_ok: Optional[bool] = None, **extra) -> dict:
+    """Standard /health payload; "degraded" when a Redis check was made and failed."""
+    body = {"status": "degraded" if redis_ok is False else "ok", "service": service}
+    if redis_ok is not None:
+        body["redis"] = redis_ok
+    body["ts"] = int(time.time())
+    body.update(extra)
+    return body
+
+
+def redis_ping(r) -> bool:
+    try:
+        r.ping()
+        return True
+    except Exception:
+        return False
+
+
+def add_metrics_route(app: FastAPI) -> None:
+    """GET /metrics in the Prometheus text format, from the default registry."""
+
+    @app.get("/metrics")
+    def metrics():
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
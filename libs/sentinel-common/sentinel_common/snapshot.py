@@ -0,0 +1,190 @@
+"""
+Compact on-disk snapshot of the track catalogue, read through mmap.
+
+Layout (little-endian):
+
+  header   magic, version, record count, creation time, and the track:changes
+           position (last entry id, entries ever added) the snapshot is current to
+  records  one fixed-width record per track, sorted by object_id, so a lookup is
+           a binary search over the mapped file:
+             object_id (NUL-padded), x/y/z/vx/vy/vz, confidence, last_update
+             (unix seconds), regime, offset and length of the track JSON
+  blobs    the stored track JSON, byte for byte as fusion-engine wrote it
+
+Opening maps the file and reads the header, so it costs the same for any
+catalogue size; pages are read as records are touched. A reader brings itself
+up to date by replaying track:changes after the recorded position.
+
+The mission-optimizer leader writes it (TRACK_SNAPSHOT_PATH) to a temporary
+file and renames it into place, so readers never see a partial snapshot and
+a reader's existing mapping stays valid across the swap.
+"""
+import bisect
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from .regimes import REGIMES
+
+SNAPSHOT_PATH = os.getenv("TRACK_SNAPSHOT_PATH", "")
+
+MAGIC = b"SDATRK\x00\x01"
+VERSION = 1
+OBJECT_ID_BYTES = 48
+STATE_FIELDS = ("x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms")
+
+_HEADER = struct.Struct("<8sIIQdQ32sQ")  # magic, version, record size, count, created_at, entries_added, last_id, blob offset
+_RECORD = struct.Struct(f"<{OBJECT_ID_BYTES}s8dB3xIQ")  # 128 bytes
+
+
+class SnapshotRecord(NamedTuple):
+    object_id: str
+    state: Tuple[float, float, float, float, float, float]
+    confidence: float
+    last_update_ts: float
+    regime: str
+
+
+class SnapshotEntry(NamedTuple):
+    """One track as handed to write_snapshot."""
+
+    object_id: str
+    raw_json: bytes
+    state: dict
+    confidence: float
+    last_update_ts: float
+    regime: str
+
+
+def _key(object_id: str) -> bytes:
+    return object_id.encode().ljust(OBJECT_ID_BYTES, b"\0")
+
+
+def _record(values: tuple) -> SnapshotRecord:
+    oid, x, y, z, vx, vy, vz, conf, ts, regime = values[:10]
+    return SnapshotRecord(oid.rstrip(b"\0").decode(), (x, y, z, vx, vy, vz), conf, ts, REGIMES[regime])
+
+
+class _Keys:
+    """Sequence view of the sorted object_id column, for bisect."""
+
+    def __init__(self, snap: "TrackSnapshot"):
+        self._snap = snap
+
+    def __len__(self) -> int:
+        return self._snap.count
+
+    def __getitem__(self, i: int) -> bytes:
+        off = self._snap._records_offset + i * _RECORD.size
+        return self._snap._mm[off : off + OBJECT_ID_BYTES]
+
+
+class TrackSnapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, record_size, count, created_at, entries_added, last_id, blob_offset = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION or record_size != _RECORD.size:
+                raise ValueError(f"{path}: not a version {VERSION} track snapshot")
+        except Exception:
+            self._mm.close()
+            raise
+        self.path = path
+        self.count = count
+        self.created_at = created_at
+        self.stream_last_id = last_id.rstrip(b"\0").decode() or "0-0"
+        self.stream_entries_added = entries_added
+        self._records_offset = _HEADER.size
+        self._blob_offset = blob_offset
+        self._keys = _Keys(self)
+
+    @classmethod
+    def open(cls, path: str = SNAPSHOT_PATH) -> Optional["TrackSnapshot"]:
+        """The snapshot at `path`, or None if there is none (or it is unreadable)."""
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def age_s(self) -> float:
+        return max(0.0, time.time() - self.created_at)
+
+    def find(self, object_id: str) -> Optional[int]:
+        key = _key(object_id)
+        i = bisect.bisect_left(self._keys, key)
+        return i if i < self.count and self._keys[i] == key else None
+
+    def record(self, i: int) -> SnapshotRecord:
+        return _record(_RECORD.unpack_from(self._mm, self._records_offset + i * _RECORD.size))
+
+    def raw_json(self, i: int) -> bytes:
+        *_, length, offset = _RECORD.unpack_from(self._mm, self._records_offset + i * _RECORD.size)
+        start = self._blob_offset + offset
+        return self._mm[start : start + length]
+
+    def __iter__(self) -> Iterator[SnapshotRecord]:
+        end = self._records_offset + self.count * _RECORD.size
+        for values in _RECORD.iter_unpack(self._mm[self._records_offset : end]):
+            yield _record(values)
+
+    def iter_raw(self) -> Iterator[Tuple[SnapshotRecord, bytes]]:
+        """(record, stored track JSON) per track, in object_id order."""
+        end = self._records_offset + self.count * _RECORD.size
+        for values in _RECORD.iter_unpack(self._mm[self._records_offset : end]):
+            start = self._blob_offset + values[-1]
+            yield _record(values), self._mm[start : start + values[-2]]
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def write_snapshot(path: str, entries: Iterable[SnapshotEntry], stream_last_id: str = "0-0", stream_entries_added: int = 0) -> int:
+    """
+    Write `entries` as a snapshot current to the given track:changes position; returns the record count.
+    Object ids longer than the fixed width are left out (they stay Redis-only).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    records = []
+    blob_len = 0
+    with tempfile.TemporaryFile(dir=directory) as blobs:
+        for e in entries:
+            key = e.object_id.encode()
+            if len(key) > OBJECT_ID_BYTES:
+                continue
+            state = tuple(float(e.state.get(k) or 0.0) for k in STATE_FIELDS)
+            regime = REGIMES.index(e.regime) if e.regime in REGIMES else 0
+            records.append((key, *state, float(e.confidence), float(e.last_update_ts), regime, len(e.raw_json), blob_len))
+            blobs.write(e.raw_json)
+            blob_len += len(e.raw_json)
+        records.sort(key=lambda rec: rec[0])
+
+        blob_offset = _HEADER.size + len(records) * _RECORD.size
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".track-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(_HEADER.pack(MAGIC, VERSION, _RECORD.size, len(records), time.time(), stream_entries_added, stream_last_id.encode(), blob_offset))
+                for rec in records:
+                    out.write(_RECORD.pack(*rec))
+                blobs.seek(0)
+                shutil.copyfileobj(blobs, out, 1 << 20)
+                out.flush()
+                os.fsync(out.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    return len(records)
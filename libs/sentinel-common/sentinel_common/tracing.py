@@ -0,0 +1,45 @@
+"""
+W3C traceparent and Server-Timing helpers for the ingest trace
+(ingestion-gateway -> validation-service -> fusion-engine; see the gateway's app/tracing.py).
+"""
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def trace_context(traceparent: Optional[str]) -> Tuple[str, str]:
+    """(trace_id, span_id) for this hop: continues an incoming traceparent or starts a new trace."""
+    m = TRACEPARENT_RE.match((traceparent or "").strip().lower())
+    trace_id = m.group(1) if m else os.urandom(16).hex()
+    return trace_id, os.urandom(8).hex()
+
+
+def traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+def child_traceparent(incoming: Optional[str]) -> str:
+    """Continue the caller's trace (or start one) with a new span id for this hop."""
+    return traceparent(*trace_context(incoming))
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Server-Timing `name;dur=<ms>` entries as seconds."""
+    out: Dict[str, float] = {}
+    for entry in header.split(","):
+        parts = [p.strip() for p in entry.split(";")]
+        if not parts[0]:
+            continue
+        for p in parts[1:]:
+            if p.startswith("dur="):
+                try:
+                    out[parts[0]] = float(p[4:]) / 1000.0
+                except ValueError:
+                    pass
+    return out
+
+
+def server_timing(stages: Dict[str, float]) -> str:
+    return ", ".join(f"{k};dur={v * 1000:.3f}" for k, v in stages.items())
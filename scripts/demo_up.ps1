@@ -15,7 +15,7 @@ kubectl apply -k $KustomizeDir
 Write-Host "[2/5] Waiting for deployments to become available..."
 $deploys = @(
   "redis","ingestion-gateway","validation-service","fusion-engine",
-  "tasking-service","mission-optimizer","track-api",
+  "tasking-service","mission-optimizer","conjunction-screener","track-api",
   "sensor-sim-radar","sensor-sim-optical","sensor-sim-space"
 )
 
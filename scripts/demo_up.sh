@@ -21,6 +21,7 @@ kubectl -n "${NAMESPACE}" rollout status deploy/validation-service --timeout=180
 kubectl -n "${NAMESPACE}" rollout status deploy/fusion-engine --timeout=180s || true
 kubectl -n "${NAMESPACE}" rollout status deploy/tasking-service --timeout=180s || true
 kubectl -n "${NAMESPACE}" rollout status deploy/mission-optimizer --timeout=180s || true
+kubectl -n "${NAMESPACE}" rollout status deploy/conjunction-screener --timeout=180s || true
 kubectl -n "${NAMESPACE}" rollout status deploy/track-api --timeout=180s || true
 kubectl -n "${NAMESPACE}" rollout status deploy/sensor-sim-radar --timeout=180s || true
 kubectl -n "${NAMESPACE}" rollout status deploy/sensor-sim-optical --timeout=180s || true
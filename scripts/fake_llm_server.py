@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an OpenAI-compatible chat completions API.
+
+Replies to POST /v1/chat/completions with a deterministic summary of the prompt
+after a configurable delay, so the planner's background explanations can be
+exercised without network access or API keys.
+
+Usage:
+  python3 scripts/fake_llm_server.py --port 8089 --delay 2.0
+  # then run mission-planning-agent with:
+  #   LLM_ENABLED=true OPENAI_API_KEY=fake OPENAI_BASE_URL=http://localhost:8089/v1
+
+Output:
+  Logs one line per request to stderr.
+"""
+
+import argparse
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(delay: float, fail_every: int):
+    state = {"n": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+            state["n"] += 1
+            time.sleep(delay)
+            if fail_every and state["n"] % fail_every == 0:
+                self.send_error(503, "injected failure")
+                return
+
+            prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+            digest = hashlib.sha256(prompt.encode()).hexdigest()[:12]
+            text = f"[fake-llm {digest}] Plan prioritizes {prompt.count('object_id')} task(s) by policy score."
+            out = json.dumps(
+                {
+                    "id": f"chatcmpl-{digest}",
+                    "object": "chat.completion",
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                }
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--delay", type=float, default=2.0, help="seconds before each reply (simulated LLM latency)")
+    p.add_argument("--fail-every", type=int, default=0, help="answer every Nth request with 503 (0 = never)")
+    args = p.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.delay, args.fail_every))
+    print(f"fake LLM on http://{args.host}:{args.port}/v1 (delay {args.delay}s)", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a trace collector.
+
+Accepts the ingestion-gateway's trace batches on POST /v1/traces, appends them
+to an NDJSON file and serves a running summary on GET /summary: ingest-to-track
+p50/p95/p99 against the NFR-002 target and the p95 of every stage.
+
+Usage:
+  python3 scripts/trace_collector.py --port 4318 --out traces.ndjson
+  # then run ingestion-gateway with:
+  #   TRACE_EXPORT_URL=http://localhost:4318/v1/traces
+  curl -s http://localhost:4318/summary
+
+Output:
+  One trace per line in --out; one log line per batch on stderr.
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, math.ceil(q / 100.0 * len(values)) - 1))]
+
+
+def make_handler(out_path: str, target_s: float):
+    lock = threading.Lock()
+    totals = []
+    stages = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, body: dict):
+            data = json.dumps(body, indent=2).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+            traces = body.get("traces", [])
+            with lock:
+                with open(out_path, "a") as f:
+                    for t in traces:
+                        f.write(json.dumps({"service": body.get("service"), **t}) + "\n")
+                        if t.get("ok"):
+                            totals.append(t["total_s"])
+                            for k, v in (t.get("stages") or {}).items():
+                                stages.setdefault(k, []).append(v)
+            print(f"{len(traces)} trace(s) from {body.get('service')}", file=sys.stderr, flush=True)
+            self._reply(200, {"accepted": len(traces)})
+
+        def do_GET(self):
+            if self.path.rstrip("/") != "/summary":
+                self.send_error(404)
+                return
+            with lock:
+                p95 = percentile(totals, 95)
+                self._reply(
+                    200,
+                    {
+                        "traces": len(totals),
+                        "p50_s": percentile(totals, 50),
+                        "p95_s": p95,
+                        "p99_s": percentile(totals, 99),
+                        "target_s": target_s,
+                        "met": bool(totals) and p95 <= target_s,
+                        "stage_p95_s": {k: percentile(v, 95) for k, v in stages.items()},
+                    },
+                )
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=4318)
+    p.add_argument("--out", default="traces.ndjson")
+    p.add_argument("--target-s", type=float, default=2.0, help="NFR-002 p95 ingest-to-track target")
+    args = p.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.out, args.target_s))
+    print(f"trace collector on http://{args.host}:{args.port}/v1/traces -> {args.out}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import os
+import time
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+import numpy as np
+from fastapi import FastAPI
+from prometheus_client import Counter, Gauge
+
+from sentinel_common.auth import verify_bearer
+from sentinel_common.changes import ChangeFeed
+from sentinel_common.keys import conjunction_meta_key, conjunction_tca_key, conjunctions_key, idx_key, track_key
+from sentinel_common.profiling import debug_router
+from sentinel_common.redis_pool import redis_client
+from sentinel_common.service import add_metrics_route, health_body, redis_ping
+from sentinel_common.snapshot import SNAPSHOT_PATH, TrackSnapshot
+
+from .screening import STATE_FIELDS, Conjunction, Screener
+
+
+APP_NAME = os.getenv("SERVICE_NAME", "conjunction-screener")
+
+SCREEN_DISTANCE_KM = float(os.getenv("SCREEN_DISTANCE_KM", "5.0"))
+SCREEN_WINDOW_SECONDS = float(os.getenv("SCREEN_WINDOW_SECONDS", "3600"))
+# Sample spacing: smaller means smaller hash cells but more samples; 20 s is fastest at 50k objects
+SCREEN_STEP_SECONDS = float(os.getenv("SCREEN_STEP_SECONDS", "20"))
+SCREEN_INTERVAL = float(os.getenv("SCREEN_INTERVAL_SECONDS", "10"))
+SCAN_BATCH = int(os.getenv("SCAN_BATCH", "500"))
+CHANGE_BATCH = int(os.getenv("CHANGE_BATCH", "1000"))
+
+r = redis_client()
+
+screen_runs = Counter("sda_conjunction_screens_total", "Screening cycles", ["service", "kind"])
+screen_seconds = Gauge("sda_conjunction_screen_seconds", "Duration of the last screening cycle", ["service", "kind"])
+screen_changes = Counter("sda_conjunction_track_changes_total", "Track changes applied to the screener", ["service"])
+screen_resyncs = Counter("sda_conjunction_resyncs_total", "Full catalogue rescans of the screener", ["service"])
+screen_warm_starts = Counter("sda_conjunction_warm_starts_total", "Screener loads from the track snapshot", ["service"])
+screen_objects = Gauge("sda_conjunction_objects", "Objects in the screened catalogue", ["service"])
+screen_candidates = Gauge("sda_conjunction_candidate_pairs", "Pairs the spatial hash passed on in the last cycle", ["service"])
+screen_alerts = Gauge("sda_conjunction_alerts", "Conjunctions currently published", ["service"])
+
+
+def parse_ts(ts: str) -> float:
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return time.time()
+
+
+def iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def new_screener() -> Screener:
+    return Screener(SCREEN_DISTANCE_KM, SCREEN_WINDOW_SECONDS, SCREEN_STEP_SECONDS)
+
+
+def change_feed() -> ChangeFeed:
+    return ChangeFeed(r, CHANGE_BATCH)
+
+
+def fetch_tracks(object_ids: list[str]) -> Iterator[dict]:
+    pipe = r.pipeline(transaction=False)
+    for oid in object_ids:
+        pipe.hget(track_key(oid), "json")
+    for raw in pipe.execute():
+        if raw:
+            yield json.loads(raw)
+
+
+def load_tracks(screener: Screener, tracks: list[dict]) -> None:
+    tracks = [t for t in tracks if t.get("state")]
+    if not tracks:
+        return
+    states = np.array([[float(t["state"].get(k) or 0.0) for k in STATE_FIELDS] for t in tracks])
+    epochs = np.array([parse_ts(t.get("last_update", "")) for t in tracks])
+    screener.load([t["object_id"] for t in tracks], states, epochs)
+
+
+def resync(feed: ChangeFeed) -> Screener:
+    """A screener loaded from a full rescan. Marks the feed first so writes during the scan are replayed, not lost."""
+    feed.mark()
+    screener = new_screener()
+    cursor = 0
+    while True:
+        cursor, object_ids = r.sscan(idx_key(), cursor=cursor, count=SCAN_BATCH)
+        load_tracks(screener, list(fetch_tracks(object_ids)))
+        if cursor == 0:
+            break
+    screen_resyncs.labels(APP_NAME).inc()
+    return screener
+
+
+def warm_start() -> Optional[tuple[Screener, ChangeFeed]]:
+    """
+    A screener loaded from the track snapshot, with a feed that replays track:changes
+    from where the snapshot was taken. None if there is no snapshot, or the stream has
+    since been trimmed past its position.
+    """
+    snap = TrackSnapshot.open(SNAPSHOT_PATH)
+    if snap is None:
+        return None
+    try:
+        feed = change_feed()
+        feed.last_id, feed.position = snap.stream_last_id, snap.stream_entries_added
+        if feed.has_gap():
+            return None
+        records = list(snap)
+    finally:
+        snap.close()
+    screener = new_screener()
+    if records:
+        screener.load(
+            [rec.object_id for rec in records],
+            np.array([rec.state for rec in records], dtype=float),
+            np.array([rec.last_update_ts for rec in records]),
+        )
+    screen_warm_starts.labels(APP_NAME).inc()
+    return screener, feed
+
+
+def apply_changes(screener: Screener, feed: ChangeFeed) -> int:
+    """Re-read the tracks named on the change feed; the entries carry no state."""
+    object_ids = list(dict.fromkeys(c["object_id"] for c in feed.read()))
+    n = 0
+    for i in range(0, len(object_ids), SCAN_BATCH):
+        for t in fetch_tracks(object_ids[i : i + SCAN_BATCH]):
+            if t.get("state"):
+                n += screener.update(t["object_id"], t["state"], parse_ts(t.get("last_update", "")))
+    screen_changes.labels(APP_NAME).inc(len(object_ids))
+    return n
+
+
+def conjunction_body(c: Conjunction) -> dict:
+    return {
+        "conjunction_id": c.pair_id,
+        "object_a": c.object_a,
+        "object_b": c.object_b,
+        "tca": iso(c.tca),
+        "tca_unix": round(c.tca, 3),
+        "miss_km": round(c.miss_km, 3),
+        "relative_speed_kms": round(c.relative_speed_kms, 3),
+    }
+
+
+def publish(screener: Screener, published: Optional[dict], now: float) -> dict:
+    """
+    Write the screener's conjunctions for track-api in one MULTI, touching only pairs
+    that changed since `published` (what the last call returned). None replaces
+    whatever a previous screener process left behind.
+    """
+    current = {}
+    for c in screener.conjunctions():
+        body = conjunction_body(c)
+        current[c.pair_id] = (json.dumps(body), c.tca)
+    pipe = r.pipeline(transaction=True)
+    if published is None:
+        pipe.delete(conjunctions_key(), conjunction_tca_key())
+        published = {}
+    gone = [pair for pair in published if pair not in current]
+    changed = {pair: v for pair, v in current.items() if published.get(pair) != v}
+    if gone:
+        pipe.hdel(conjunctions_key(), *gone)
+        pipe.zrem(conjunction_tca_key(), *gone)
+    if changed:
+        pipe.hset(conjunctions_key(), mapping={pair: body for pair, (body, _) in changed.items()})
+        pipe.zadd(conjunction_tca_key(), {pair: tca for pair, (_, tca) in changed.items()})
+    pipe.hset(
+        conjunction_meta_key(),
+        mapping={
+            "screened_at": iso(now),
+            "window_end": iso(screener.window_end),
+            "objects": len(screener),
+            "alerts": len(current),
+            "distance_km": SCREEN_DISTANCE_KM,
+        },
+    )
+    pipe.execute()
+    screen_alerts.labels(APP_NAME).set(len(current))
+    return current
+
+
+def screen_loop(stop_event: threading.Event):
+    """
+    Bootstraps from the track snapshot (or a full rescan), then each cycle applies the
+    track:changes written since the last one, screens what changed plus the window's new
+    samples, and publishes the conjunctions that differ from the last cycle's.
+    """
+    screener: Optional[Screener] = None
+    feed: Optional[ChangeFeed] = None
+    published: Optional[dict] = None
+
+    while not stop_event.is_set():
+        start = time.time()
+        try:
+            if feed is None:
+                loaded = warm_start()
+                if loaded is not None:
+                    screener, feed = loaded
+            if feed is None or feed.has_gap():
+                feed = change_feed()
+                screener = resync(feed)
+            apply_changes(screener, feed)
+            screen_objects.labels(APP_NAME).set(len(screener))
+
+            t0 = time.perf_counter()
+            kind = screener.screen(time.time())
+            screen_seconds.labels(APP_NAME, kind).set(time.perf_counter() - t0)
+            screen_runs.labels(APP_NAME, kind).inc()
+            screen_candidates.labels(APP_NAME).set(screener.last_candidates)
+            published = publish(screener, published, time.time())
+            _status.update(objects=len(screener), alerts=len(published), screened_at=int(time.time()))
+        except Exception:
+            # Intentionally swallow errors to keep loop alive in demo environments
+            pass
+
+        stop_event.wait(max(0.0, SCREEN_INTERVAL - (time.time() - start)))
+
+
+app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
+_stop = threading.Event()
+_thread = threading.Thread(target=screen_loop, args=(_stop,), daemon=True)
+# Last cycle's figures, for /health
+_status = {"objects": 0, "alerts": 0, "screened_at": None}
+
+
+@app.on_event("startup")
+def startup():
+    if not _thread.is_alive():
+        _thread.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    _stop.set()
+
+
+@app.get("/health")
+def health():
+    return health_body(APP_NAME, redis_ping(r), **_status)
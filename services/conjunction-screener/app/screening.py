@@ -0,0 +1,434 @@
+"""
+Close-approach screening of the track catalogue over a look-ahead window.
+
+Each track's stored state (position and velocity at last_update) becomes
+two-body elements once, when the track changes. A full screen samples the
+window every `step_s` seconds; at each sample it propagates every object,
+hashes the positions into cubic cells and looks only at pairs in the same or
+adjacent cells. For each such pair it extrapolates the relative motion
+linearly over half a step either side of the sample:
+
+    miss_lin = min |dr + dv * tau|  for |tau| <= step_s / 2
+
+Over half a step two-body motion departs from a straight line by at most
+g * tau^2 / 2 per object (g: surface gravity), so a pair whose true closest
+approach in that interval is inside `distance_km` has miss_lin within
+distance_km + g * (step_s / 2)^2, and no object moves more than MAX_SPEED_KMS * step/2:
+cells that size lose no pair the refinement would keep. The few pairs left are
+refined together, Newton iterations on d/dt |r_a - r_b|^2 = 0 with the
+two-body states, into time and distance of closest approach.
+
+The window rolls: each cycle drops samples that have passed and screens the
+whole catalogue at the new ones past the old window end, keeping each
+sample's sorted cell keys. Objects updated since the last cycle ("dirty") are
+screened against those kept samples, ignoring the now stale entries for dirty
+objects, and against each other. A cycle's cost follows the interval and the
+update rate, not the window; only the first screen covers the whole window.
+"""
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+MU_EARTH = 398600.4418  # km^3/s^2
+EARTH_RADIUS_KM = 6378.137
+SURFACE_GRAVITY_KMS2 = MU_EARTH / EARTH_RADIUS_KM**2
+# Escape speed at the Earth's surface: no bound orbit is faster
+MAX_SPEED_KMS = 11.2
+STATE_FIELDS = ("x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms")
+
+_AXIS_BITS = 21
+_AXIS_MAX = (1 << _AXIS_BITS) - 2
+_AXIS_OFFSET = 1 << (_AXIS_BITS - 1)
+# Neighbour cells as key offsets; the first 13 are half the shell, so a join of
+# one index with itself visits each pair of cells once
+_SHELL = sorted(
+    ((dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) != (0, 0, 0)),
+    key=lambda d: (d <= (0, 0, 0), d),
+)
+_SHELL_OFFSETS = np.array([(dx << (2 * _AXIS_BITS)) + (dy << _AXIS_BITS) + dz for dx, dy, dz in _SHELL], dtype=np.int64)
+_HALF_SHELL = _SHELL_OFFSETS[:13]
+_FULL_SHELL = np.concatenate([[0], _SHELL_OFFSETS])
+
+
+class Conjunction(NamedTuple):
+    object_a: str
+    object_b: str
+    tca: float  # unix seconds
+    miss_km: float
+    relative_speed_kms: float
+
+    @property
+    def pair_id(self) -> str:
+        return f"{self.object_a}|{self.object_b}"
+
+
+def solve_kepler(M: np.ndarray, e: np.ndarray, iterations: int = 4) -> np.ndarray:
+    # Halley's method from Danby's starting guess: four iterations hold to 1e-8 rad up to e = 0.99
+    E = M + 0.85 * e * np.sign(np.sin(M))
+    for _ in range(iterations):
+        es, ec = e * np.sin(E), e * np.cos(E)
+        f, fp = E - es - M, 1.0 - ec
+        E = E - 2 * f * fp / (2 * fp * fp - f * es)
+    return E
+
+
+class Orbits:
+    """Two-body elements per row, grown as objects are added; rows that are not bound ellipses move in straight lines."""
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        old = self.__dict__.copy()
+        self.r0 = np.zeros((capacity, 3))
+        self.v0 = np.zeros((capacity, 3))
+        self.t0 = np.zeros(capacity)
+        self.bound = np.zeros(capacity, dtype=bool)
+        self.a = np.ones(capacity)
+        self.e = np.zeros(capacity)
+        self.root = np.ones(capacity)
+        self.M0 = np.zeros(capacity)
+        self.n = np.zeros(capacity)
+        self.P = np.zeros((capacity, 3))
+        self.Q = np.zeros((capacity, 3))
+        for name in ("r0", "v0", "t0", "bound", "a", "e", "root", "M0", "n", "P", "Q"):
+            if name in old:
+                getattr(self, name)[: self.size] = old[name][: self.size]
+
+    def add(self, count: int) -> np.ndarray:
+        """Append `count` rows; returns their indices."""
+        if self.size + count > len(self.t0):
+            self._alloc(max(2 * len(self.t0), self.size + count))
+        rows = np.arange(self.size, self.size + count)
+        self.size += count
+        return rows
+
+    def set_states(self, rows: np.ndarray, r: np.ndarray, v: np.ndarray, t0: np.ndarray) -> None:
+        self.r0[rows], self.v0[rows], self.t0[rows] = r, v, t0
+        rmag = np.linalg.norm(r, axis=1)
+        h = np.cross(r, v)
+        hmag = np.linalg.norm(h, axis=1)
+        energy = np.einsum("ij,ij->i", v, v) / 2 - MU_EARTH / np.maximum(rmag, 1e-9)
+        bound = (energy < -1e-9) & (hmag > 1e-6) & (rmag > EARTH_RADIUS_KM * 0.5)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = np.where(bound, -MU_EARTH / (2 * energy), 1.0)
+            evec = np.cross(v, h) / MU_EARTH - r / np.maximum(rmag, 1e-9)[:, None]
+            e = np.linalg.norm(evec, axis=1)
+            bound &= e < 0.99
+            # Near-circular orbits measure from the epoch position instead of perigee
+            circ = e < 1e-8
+            P = np.where(circ[:, None], r / np.maximum(rmag, 1e-9)[:, None], evec / np.maximum(e, 1e-12)[:, None])
+            Q = np.cross(h, P) / np.maximum(hmag, 1e-12)[:, None]
+            e = np.where(circ | ~bound, 0.0, e)
+            root = np.sqrt(1.0 - e**2)
+            cos_nu = np.einsum("ij,ij->i", r, P) / np.maximum(rmag, 1e-9)
+            sin_nu = np.einsum("ij,ij->i", r, Q) / np.maximum(rmag, 1e-9)
+            E0 = np.arctan2(root * sin_nu, e + cos_nu)
+        self.bound[rows] = bound
+        self.a[rows] = np.where(bound, a, 1.0)
+        self.e[rows] = e
+        self.root[rows] = root
+        self.M0[rows] = np.where(bound, E0 - e * np.sin(E0), 0.0)
+        self.n[rows] = np.where(bound, np.sqrt(MU_EARTH / self.a[rows] ** 3), 0.0)
+        self.P[rows], self.Q[rows] = P, Q
+
+    def at(self, rows: Optional[np.ndarray], t) -> tuple[np.ndarray, np.ndarray]:
+        """Position (km) and velocity (km/s) of `rows` (None: all) at unix time `t` (scalar, or one time per row)."""
+        if rows is None:
+            rows = slice(0, self.size)
+        dt = t - self.t0[rows]
+        a, e, n, root = self.a[rows], self.e[rows], self.n[rows], self.root[rows]
+        E = solve_kepler((self.M0[rows] + n * dt) % (2 * np.pi), e)
+        cE, sE = np.cos(E), np.sin(E)
+        k = np.sqrt(MU_EARTH * a) / (a * (1.0 - e * cE))
+        P, Q = self.P[rows], self.Q[rows]
+        r = (a * (cE - e))[:, None] * P + (a * root * sE)[:, None] * Q
+        v = (-k * sE)[:, None] * P + (k * root * cE)[:, None] * Q
+        linear = ~self.bound[rows]
+        if linear.any():
+            dtl = dt if np.ndim(dt) == 0 else dt[linear]
+            v[linear] = self.v0[rows][linear]
+            r[linear] = self.r0[rows][linear] + v[linear] * np.reshape(dtl, (-1, 1))
+        return r, v
+
+
+def cell_keys(pos: np.ndarray, cell_km: float) -> np.ndarray:
+    c = np.clip(np.floor(pos / cell_km).astype(np.int64) + _AXIS_OFFSET, 1, _AXIS_MAX)
+    return (c[:, 0] << (2 * _AXIS_BITS)) | (c[:, 1] << _AXIS_BITS) | c[:, 2]
+
+
+def _expand(query: np.ndarray, lo: np.ndarray, hi: np.ndarray, order: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs (query[i], order[lo[i]:hi[i]]) for every i."""
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = lo - (np.cumsum(counts) - counts)
+    idx = np.repeat(starts, counts) + np.arange(total)
+    return np.repeat(query, counts), order[idx]
+
+
+def self_join(sorted_keys: np.ndarray, order: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Every pair of entries in the same or adjacent cells, once."""
+    n = len(sorted_keys)
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    first = np.ones(n, dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    starts = np.flatnonzero(first)
+    ends = np.append(starts[1:], n)
+    cells = sorted_keys[starts]
+    cell_of = np.cumsum(first) - 1
+    parts = [_expand(order, np.arange(1, n + 1), ends[cell_of], order)]
+    # Neighbouring cells are looked up once per occupied cell, then paired member by member
+    q = (cells[:, None] + _HALF_SHELL[None, :]).ravel()
+    j = np.minimum(np.searchsorted(cells, q), len(cells) - 1)
+    hit = cells[j] == q
+    ci, cj = np.flatnonzero(hit) // len(_HALF_SHELL), j[hit]
+    nb, member = _expand(cj, starts[ci], ends[ci], np.arange(n))
+    parts.append(_expand(order[member], starts[nb], ends[nb], order))
+    return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+
+def cross_join(keys: np.ndarray, rows: np.ndarray, sorted_keys: np.ndarray, order: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Pairs of `rows` (with cell `keys`) and index entries in the same or adjacent cells."""
+    q = (keys[:, None] + _FULL_SHELL[None, :]).ravel()
+    lo, hi = np.searchsorted(sorted_keys, q, "left"), np.searchsorted(sorted_keys, q, "right")
+    return _expand(np.repeat(rows, len(_FULL_SHELL)), lo, hi, order)
+
+
+class _Sample(NamedTuple):
+    """Every object's cell at one sample time, as sorted keys and the rows in that order."""
+
+    t: float
+    sorted_keys: np.ndarray
+    order: np.ndarray
+
+    def rekey(self, rows: np.ndarray, keys: np.ndarray, is_dirty: np.ndarray) -> "_Sample":
+        """This sample with the entries of `rows` (flagged in `is_dirty`) replaced by their new cell `keys`."""
+        keep = ~is_dirty[self.order]
+        sorted_keys, order = self.sorted_keys[keep], self.order[keep]
+        by_key = np.argsort(keys, kind="stable")
+        at = np.searchsorted(sorted_keys, keys[by_key])
+        return _Sample(self.t, np.insert(sorted_keys, at, keys[by_key]), np.insert(order, at, rows[by_key].astype(order.dtype)))
+
+
+class Screener:
+    def __init__(self, distance_km: float = 5.0, window_s: float = 3600.0, step_s: float = 20.0, refine_iterations: int = 5):
+        self.distance_km = distance_km
+        self.window_s = window_s
+        self.step_s = step_s
+        self.refine_iterations = refine_iterations
+        self.half_step = step_s / 2
+        self.curvature_km = SURFACE_GRAVITY_KMS2 * self.half_step**2
+        self.cell_km = distance_km + 2 * MAX_SPEED_KMS * self.half_step + self.curvature_km
+
+        self.orbits = Orbits()
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._epochs: dict[int, float] = {}
+        self.dirty: set[int] = set()
+        self.samples: deque[_Sample] = deque()
+        # (row_a, row_b) with row_a < row_b -> the pair's encounters in the window, by TCA
+        self.encounters: dict[tuple[int, int], list[Conjunction]] = {}
+        self.last_candidates = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def window_end(self) -> float:
+        return self.samples[-1].t + self.half_step if self.samples else 0.0
+
+    def conjunctions(self) -> list[Conjunction]:
+        """The closest encounter of each pair still ahead in the window."""
+        return [min(found, key=lambda c: c.miss_km) for found in self.encounters.values()]
+
+    def update(self, object_id: str, state, epoch: float) -> bool:
+        """Set an object's state (a STATE_FIELDS dict or 6-tuple) at unix time `epoch`; False if nothing changed."""
+        sv = np.array([float(state.get(k) or 0.0) for k in STATE_FIELDS] if isinstance(state, dict) else state, dtype=float)
+        row = self.rows.get(object_id)
+        if row is None:
+            row = int(self.orbits.add(1)[0])
+            self.rows[object_id] = row
+            self.ids.append(object_id)
+        elif self._epochs.get(row) == epoch and np.array_equal(self.orbits.r0[row], sv[:3]) and np.array_equal(self.orbits.v0[row], sv[3:]):
+            return False
+        self.orbits.set_states(np.array([row]), sv[None, :3], sv[None, 3:], np.array([epoch]))
+        self._epochs[row] = epoch
+        self.dirty.add(row)
+        return True
+
+    def load(self, object_ids: list[str], states: np.ndarray, epochs: np.ndarray) -> None:
+        """Bulk `update` of new objects (catalogue bootstrap): states (n, 6) km and km/s."""
+        if any(oid in self.rows for oid in object_ids):
+            for oid, sv, t in zip(object_ids, states, epochs):
+                self.update(oid, sv, float(t))
+            return
+        rows = self.orbits.add(len(object_ids))
+        self.rows.update(zip(object_ids, rows.tolist()))
+        self.ids.extend(object_ids)
+        self.orbits.set_states(rows, states[:, :3], states[:, 3:], epochs)
+        self._epochs.update(zip(rows.tolist(), epochs.tolist()))
+        self.dirty.update(rows.tolist())
+
+    def _linear_pass(self, a, b, pa, va, pb, vb, t: float):
+        """Candidates whose straight-line relative motion comes close enough within half a step of `t`."""
+        dr, dv = pa - pb, va - vb
+        dv2 = np.einsum("ij,ij->i", dv, dv)
+        tau = np.clip(-np.einsum("ij,ij->i", dr, dv) / np.maximum(dv2, 1e-12), -self.half_step, self.half_step)
+        d = dr + dv * tau[:, None]
+        keep = np.einsum("ij,ij->i", d, d) <= (self.distance_km + self.curvature_km) ** 2
+        return a[keep], b[keep], t + tau[keep]
+
+    def _refine(self, a: np.ndarray, b: np.ndarray, t: np.ndarray, start: float) -> None:
+        """Newton iterations on the range rate for all candidates at once; encounters inside distance_km are recorded."""
+        if not len(a):
+            return
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        lo, hi = np.maximum(t - self.half_step, start), t + self.half_step
+        t = np.clip(t, lo, hi)
+        for _ in range(self.refine_iterations):
+            ra, va = self.orbits.at(a, t)
+            rb, vb = self.orbits.at(b, t)
+            dr, dv = ra - rb, va - vb
+            dv2 = np.einsum("ij,ij->i", dv, dv)
+            acc = -MU_EARTH * (ra / np.linalg.norm(ra, axis=1)[:, None] ** 3 - rb / np.linalg.norm(rb, axis=1)[:, None] ** 3)
+            fp = dv2 + np.einsum("ij,ij->i", dr, acc)
+            t = np.clip(t - np.einsum("ij,ij->i", dr, dv) / np.where(fp > 1e-12, fp, np.maximum(dv2, 1e-12)), lo, hi)
+        ra, va = self.orbits.at(a, t)
+        rb, vb = self.orbits.at(b, t)
+        miss = np.linalg.norm(ra - rb, axis=1)
+        keep = miss <= self.distance_km
+        a, b, t, miss = a[keep], b[keep], t[keep], miss[keep]
+        speed = np.linalg.norm(va[keep] - vb[keep], axis=1)
+
+        # Neighbouring samples converge on the same encounter: one per pair and step, the closest
+        by_time = np.lexsort((t, b, a))
+        a, b, t, miss, speed = a[by_time], b[by_time], t[by_time], miss[by_time], speed[by_time]
+        group = np.ones(len(a), dtype=bool)
+        group[1:] = (a[1:] != a[:-1]) | (b[1:] != b[:-1]) | (np.diff(t) >= self.step_s)
+        gid = np.cumsum(group)
+        best = np.lexsort((miss, gid))
+        best = best[np.r_[True, gid[best][1:] != gid[best][:-1]]] if len(best) else best
+        for i in best:
+            self._record(int(a[i]), int(b[i]), float(t[i]), float(miss[i]), float(speed[i]))
+
+    def _record(self, ra: int, rb: int, tca: float, miss: float, speed: float) -> None:
+        ia, ib = sorted((self.ids[ra], self.ids[rb]))
+        c = Conjunction(ia, ib, tca, miss, speed)
+        found = self.encounters.setdefault((ra, rb), [])
+        for i, other in enumerate(found):
+            if abs(other.tca - tca) < self.step_s:
+                if miss < other.miss_km:
+                    found[i] = c
+                return
+        found.append(c)
+        found.sort(key=lambda c: c.tca)
+
+    def full(self, now: float) -> int:
+        """Screen the whole catalogue over [now, now + window_s] from scratch; returns the pairs found."""
+        self.samples.clear()
+        self.encounters.clear()
+        self.dirty.clear()
+        self.advance(now)
+        return len(self.encounters)
+
+    def advance(self, now: float) -> int:
+        """
+        Move the window up to [now, now + window_s]: drop past samples and screen
+        the whole catalogue at the new ones. Returns the samples screened.
+        """
+        while self.samples and self.samples[0].t < now - self.half_step:
+            self.samples.popleft()
+        first = self.samples[-1].t + self.step_s if self.samples else now
+        times = np.arange(first, now + self.window_s + self.half_step, self.step_s)
+        self.last_candidates = 0
+        found_a, found_b, found_t = [], [], []
+        for t in times.tolist():
+            pos, vel = self.orbits.at(None, t)
+            keys = cell_keys(pos, self.cell_km)
+            order = np.argsort(keys, kind="stable").astype(np.int32)
+            sample = _Sample(t, keys[order], order)
+            self.samples.append(sample)
+            a, b = self_join(sample.sorted_keys, order)
+            self.last_candidates += len(a)
+            a, b, te = self._linear_pass(a, b, pos[a], vel[a], pos[b], vel[b], t)
+            found_a.append(a)
+            found_b.append(b)
+            found_t.append(te)
+        if found_a:
+            self._refine(np.concatenate(found_a), np.concatenate(found_b), np.concatenate(found_t), now)
+        return len(times)
+
+    def incremental(self, now: float) -> int:
+        """Re-screen objects updated since the last screen over the samples still ahead; returns how many."""
+        if not self.dirty:
+            return 0
+        dirty = np.fromiter(self.dirty, dtype=np.int64, count=len(self.dirty))
+        is_dirty = np.zeros(len(self.ids), dtype=bool)
+        is_dirty[dirty] = True
+        for key in [key for key in self.encounters if is_dirty[key[0]] or is_dirty[key[1]]]:
+            del self.encounters[key]
+        self.dirty.clear()
+
+        self.last_candidates = 0
+        found_a, found_b, found_t = [], [], []
+        for i in range(len(self.samples)):
+            sample = self.samples[i]
+            if sample.t < now - self.half_step:
+                continue
+            pos, vel = self.orbits.at(dirty, sample.t)
+            keys = cell_keys(pos, self.cell_km)
+            # Against objects unchanged since the sample was indexed (the index's entries for dirty ones are stale)
+            qa, qb = cross_join(keys, np.arange(len(dirty)), sample.sorted_keys, sample.order)
+            clean = ~is_dirty[qb]
+            qa, qb = qa[clean], qb[clean].astype(np.int64)
+            pb, vb = self.orbits.at(qb, sample.t)
+            # Against each other
+            order = np.argsort(keys, kind="stable")
+            da, db = self_join(keys[order], order)
+            self.last_candidates += len(qa) + len(da)
+            a, b, te = self._linear_pass(
+                np.concatenate([dirty[qa], dirty[da]]),
+                np.concatenate([qb, dirty[db]]),
+                np.concatenate([pos[qa], pos[da]]),
+                np.concatenate([vel[qa], vel[da]]),
+                np.concatenate([pb, pos[db]]),
+                np.concatenate([vb, vel[db]]),
+                sample.t,
+            )
+            found_a.append(a)
+            found_b.append(b)
+            found_t.append(te)
+            # Index the dirty rows at their new cells, so later cycles treat them as clean
+            self.samples[i] = sample.rekey(dirty, keys, is_dirty)
+        if found_a:
+            self._refine(np.concatenate(found_a), np.concatenate(found_b), np.concatenate(found_t), now)
+        return len(dirty)
+
+    def expire(self, now: float) -> int:
+        """Drop encounters whose closest approach has passed; returns how many."""
+        gone = 0
+        for key in list(self.encounters):
+            found = self.encounters[key]
+            ahead = [c for c in found if c.tca >= now]
+            gone += len(found) - len(ahead)
+            if ahead:
+                self.encounters[key] = ahead
+            else:
+                del self.encounters[key]
+        return gone
+
+    def screen(self, now: float) -> str:
+        """One cycle: updated objects, then the window's new samples. Returns "full" or "incremental"."""
+        if not self.samples:
+            self.full(now)
+            return "full"
+        self.expire(now)
+        self.incremental(now)
+        self.advance(now)
+        return "incremental"
@@ -1,59 +1,56 @@
 import os
+import threading
 import time
-from typing import Optional, Any
+from typing import Annotated, Optional, Any
 
-import jwt
-import redis
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel, Field
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import orjson
+from fastapi import Depends, FastAPI, Header
+from prometheus_client import Counter, Histogram
 from fastapi.responses import Response
 
+from sentinel_common.auth import verify_bearer
+from sentinel_common.codec import encode_response, observation_body
+from sentinel_common.keys import SHARD_BUCKETS, changes_key, idx_bucket_key, idx_key, restore_lock_key, shard_bucket, stats_key, track_key
+from sentinel_common.models import ObservationEvent
+from sentinel_common.profiling import debug_router
+from sentinel_common.redis_pool import async_redis_client, redis_client
+from sentinel_common.regimes import orbit_regime
+from sentinel_common.service import add_metrics_route, health_body, redis_ping
+from sentinel_common.snapshot import SNAPSHOT_PATH, TrackSnapshot
+from sentinel_common.tracing import server_timing
+
 
 APP_NAME = os.getenv("SERVICE_NAME", "fusion-engine")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 
-REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+LOW_CONF_THRESHOLD = float(os.getenv("LOW_CONF_THRESHOLD", "0.75"))
+CHANGE_STREAM_MAXLEN = int(os.getenv("CHANGE_STREAM_MAXLEN", "100000"))
+# /fuse as an async handler on redis.asyncio; "false" restores the threadpool handler
+REDIS_ASYNC = os.getenv("REDIS_ASYNC", "true").lower() == "true"
+# How often to check whether Redis came back empty and the catalogue needs restoring from the snapshot
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("TRACK_SNAPSHOT_CHECK_SECONDS", "10"))
+RESTORE_BATCH = int(os.getenv("TRACK_SNAPSHOT_RESTORE_BATCH", "1000"))
+RESTORE_MARK_KEY = "track:restore:mark"
+STATE_KEYS = ("x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms")
 
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+r = redis_client()
+ar = async_redis_client()
 
 fuse_total = Counter("sda_fuse_total", "Fused observations total", ["service"])
 fuse_latency = Histogram("sda_fuse_latency_seconds", "Fusion handler latency", ["service"])
-
-
-class ObservationEvent(BaseModel):
-    event_id: str
-    sensor_id: str
-    sensor_type: str
-    timestamp: str
-    object_id: str
-    measurement: dict = Field(default_factory=dict)
-    quality: dict = Field(default_factory=dict)
-    integrity: Optional[dict] = None
-
-
-def verify_bearer(auth: Optional[str]) -> dict:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return payload
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
-
-
-def track_key(object_id: str) -> str:
-    return f"track:{object_id}"
-
-
-def idx_key() -> str:
-    return "track:index"
+snapshot_restores = Counter("sda_track_snapshot_restores_total", "Catalogue restores from the track snapshot", ["service"])
+snapshot_restored = Counter("sda_track_snapshot_restored_tracks_total", "Tracks restored from the track snapshot", ["service"])
+snapshot_restore_failures = Counter("sda_track_snapshot_restore_failures_total", "Catalogue restores from the track snapshot that failed", ["service"])
+
+# Restores a track unless fusion has already written a newer one since Redis came back
+_RESTORE_TRACK = """
+if redis.call('HEXISTS', KEYS[1], 'json') == 1 then
+  return 0
+end
+redis.call('HSET', KEYS[1], 'json', ARGV[1], 'confidence', ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[3])
+return 1
+"""
 
 
 def safe_float(x: Any, default: float = 0.0) -> float:
@@ -83,7 +80,7 @@ def fuse(prev: Optional[dict], obs: ObservationEvent) -> dict:
         # Weighted update: give new obs weight w
         w = 0.35
         new_state = {}
-        for k in ["x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms"]:
+        for k in STATE_KEYS:
             new_state[k] = (1 - w) * safe_float(prev_state.get(k)) + w * safe_float(m.get(k))
         prev_conf = safe_float(prev.get("confidence"), 0.6)
         confidence = min(0.99, prev_conf + 0.02)
@@ -102,48 +99,260 @@ def fuse(prev: Optional[dict], obs: ObservationEvent) -> dict:
     }
 
 
-app = FastAPI(title=APP_NAME)
+def stats_delta(prev: Optional[dict], updated: dict) -> dict:
+    """
+    Change in the catalogue aggregates caused by replacing `prev` with `updated`.
+    Applied in the same MULTI as the track write, so track:stats never drifts from the tracks.
+    """
+    delta: dict = {}
 
+    def add(field: str, n: int):
+        if n:
+            delta[field] = delta.get(field, 0) + n
 
-@app.get("/health")
-def health():
-    # ping redis
+    new_low = safe_float(updated.get("confidence")) < LOW_CONF_THRESHOLD
+    new_regime = orbit_regime(updated.get("state") or {})
+    if prev is None:
+        add("tracks_total", 1)
+        add("low_conf", int(new_low))
+        add(f"regime:{new_regime}", 1)
+        return delta
+
+    old_low = safe_float(prev.get("confidence")) < LOW_CONF_THRESHOLD
+    old_regime = orbit_regime(prev.get("state") or {})
+    add("low_conf", int(new_low) - int(old_low))
+    if old_regime != new_regime:
+        add(f"regime:{old_regime}", -1)
+        add(f"regime:{new_regime}", 1)
+    return delta
+
+
+def restore_from_snapshot() -> int:
+    """
+    Refill the catalogue from the track snapshot when Redis has lost its data (it keeps
+    none across a restart or failover). RESTORE_MARK_KEY only exists in a Redis that
+    has been restored (or checked) since it started, so its absence is the signal.
+    Tracks fusion has written since are kept; track:stats gets the restored tracks'
+    aggregates. One replica restores, under a lock. Returns the number restored.
+    """
+    if r.exists(RESTORE_MARK_KEY):
+        return 0
+    snap = TrackSnapshot.open(SNAPSHOT_PATH)
+    if snap is None:
+        return 0
+    locked = False
+    try:
+        locked = bool(r.set(restore_lock_key(), APP_NAME, nx=True, ex=300))
+        if not locked:
+            return 0
+        restore = r.register_script(_RESTORE_TRACK)
+        restored = 0
+        stats: dict = {}
+        batch = []
+
+        def flush():
+            nonlocal restored
+            pipe = r.pipeline(transaction=False)
+            for rec, raw in batch:
+                restore(keys=[track_key(rec.object_id), idx_key(), idx_bucket_key(shard_bucket(rec.object_id))], args=[raw, rec.confidence, rec.object_id], client=pipe)
+            for (rec, _), done in zip(batch, pipe.execute()):
+                if done:
+                    restored += 1
+                    for field, n in stats_delta(None, {"confidence": rec.confidence, "state": dict(zip(STATE_KEYS, rec.state))}).items():
+                        stats[field] = stats.get(field, 0) + n
+            batch.clear()
+
+        for rec, raw in snap.iter_raw():
+            batch.append((rec, raw))
+            if len(batch) >= RESTORE_BATCH:
+                flush()
+        if batch:
+            flush()
+
+        pipe = r.pipeline(transaction=True)
+        for field, n in stats.items():
+            pipe.hincrby(stats_key(), field, n)
+        pipe.hset(stats_key(), "seeded", 1)
+        pipe.set(RESTORE_MARK_KEY, int(snap.created_at))
+        pipe.execute()
+    finally:
+        snap.close()
+        # Also after a failure partway, so another check (or replica) retries now rather than after the TTL
+        if locked:
+            r.delete(restore_lock_key())
+    snapshot_restores.labels(APP_NAME).inc()
+    snapshot_restored.labels(APP_NAME).inc(restored)
+    return restored
+
+
+def try_restore() -> None:
+    try:
+        restore_from_snapshot()
+    except Exception:
+        # Counted rather than raised: the next check retries
+        snapshot_restore_failures.labels(APP_NAME).inc()
+
+
+def snapshot_watch(stop_event: threading.Event) -> None:
+    """Redis can lose its data without fusion restarting (failover, pod restart), so keep checking."""
+    while not stop_event.wait(SNAPSHOT_CHECK_SECONDS):
+        try_restore()
+
+
+def backfill_index_buckets() -> int:
+    """
+    Add tracks indexed before track:index had per-shard buckets to theirs. track-api
+    filters the whole index for a shard until the buckets add up to it. Idempotent, so
+    replicas starting together may all run it. Returns the number of ids scanned.
+    """
+    pipe = r.pipeline(transaction=False)
+    pipe.scard(idx_key())
+    for b in range(SHARD_BUCKETS):
+        pipe.scard(idx_bucket_key(b))
+    total, *buckets = pipe.execute()
+    if sum(buckets) == total:
+        return 0
+    scanned = 0
+    cursor = 0
+    while True:
+        cursor, object_ids = r.sscan(idx_key(), cursor=cursor, count=RESTORE_BATCH)
+        pipe = r.pipeline(transaction=False)
+        for oid in object_ids:
+            pipe.sadd(idx_bucket_key(shard_bucket(oid)), oid)
+        pipe.execute()
+        scanned += len(object_ids)
+        if cursor == 0:
+            return scanned
+
+
+def backfill_buckets_quietly() -> None:
     try:
-        r.ping()
-        redis_ok = True
+        backfill_index_buckets()
     except Exception:
-        redis_ok = False
-    return {"status": "ok" if redis_ok else "degraded", "service": APP_NAME, "redis": redis_ok, "ts": int(time.time())}
+        # track-api keeps filtering the whole index; the next start retries
+        pass
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
+_stop = threading.Event()
+_snapshot_thread = threading.Thread(target=snapshot_watch, args=(_stop,), daemon=True)
+_backfill_thread = threading.Thread(target=backfill_buckets_quietly, daemon=True)
 
 
-@app.post("/fuse")
-def fuse_observation(evt: ObservationEvent, authorization: Optional[str] = Header(default=None)):
-    start = time.time()
-    verify_bearer(authorization)
+@app.on_event("startup")
+def startup():
+    if not _backfill_thread.is_alive():
+        _backfill_thread.start()
+    if not SNAPSHOT_PATH:
+        return
+    # Before taking traffic, so readers never see the catalogue half empty after a restart
+    try_restore()
+    if not _snapshot_thread.is_alive():
+        _snapshot_thread.start()
 
-    key = track_key(evt.object_id)
-    prev = r.hgetall(key) or None
-    prev_obj = None
-    if prev:
-        # redis hash stores flattened fields; we store JSON as a single field to keep it simple
-        # but for backward-compat, try json field first.
-        import json
-        raw = prev.get("json")
-        if raw:
-            prev_obj = json.loads(raw)
-
-    updated = fuse(prev_obj, evt)
-
-    import json
-    r.hset(key, mapping={"json": json.dumps(updated)})
-    r.sadd(idx_key(), evt.object_id)
 
+@app.on_event("shutdown")
+def shutdown():
+    _stop.set()
+
+
+@app.get("/health")
+def health():
+    return health_body(APP_NAME, redis_ping(r))
+
+
+def queue_track_write(pipe, evt: ObservationEvent, prev_obj: Optional[dict], updated: dict) -> None:
+    """The MULTI half of the fuse transaction; the commands are buffered, so this is the same for both clients."""
+    pipe.multi()
+    # "confidence" is duplicated outside the blob so readers can filter without decoding it
+    pipe.hset(track_key(evt.object_id), mapping={"json": orjson.dumps(updated), "confidence": updated["confidence"]})
+    pipe.sadd(idx_key(), evt.object_id)
+    pipe.sadd(idx_bucket_key(shard_bucket(evt.object_id)), evt.object_id)
+    for field, n in stats_delta(prev_obj, updated).items():
+        pipe.hincrby(stats_key(), field, n)
+    # Change feed for incremental consumers (mission-optimizer's revisit scheduler, conjunction-screener)
+    pipe.xadd(
+        changes_key(),
+        {
+            "object_id": evt.object_id,
+            "confidence": updated["confidence"],
+            "last_update": updated["last_update"],
+            "regime": orbit_regime(updated["state"]),
+        },
+        maxlen=CHANGE_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def fuse_response(response: Response, traceparent: Optional[str], accept: Optional[str], accept_encoding: Optional[str], start: float, t0: float, redis_s: float, updated: dict):
     fuse_total.labels(APP_NAME).inc()
     fuse_latency.labels(APP_NAME).observe(time.time() - start)
+    total = time.perf_counter() - t0
+    # Exclusive stages for the ingest trace (ingestion-gateway /slo)
+    response.headers["server-timing"] = server_timing({"fusion_app": total - redis_s, "fusion_redis": redis_s, "fusion_total": total})
+    if traceparent:
+        response.headers["traceparent"] = traceparent
+    return encode_response({"status": "ok", "track": updated}, accept, accept_encoding, headers=response.headers)
+
+
+def fuse_observation(
+    evt: Annotated[ObservationEvent, Depends(observation_body)],
+    response: Response,
+    traceparent: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    start = time.time()
+    t0 = time.perf_counter()
+
+    key = track_key(evt.object_id)
+    # CPU time inside the transaction callback, so the rest of the transaction is Redis round trips
+    compute = [0.0]
+
+    def write(pipe) -> dict:
+        # WATCH on the track key makes read-fuse-write atomic: a concurrent fuse of the same
+        # object forces a retry instead of losing an update or double-counting in track:stats.
+        raw = pipe.hget(key, "json")
+        c0 = time.perf_counter()
+        prev_obj = orjson.loads(raw) if raw else None
+        updated = fuse(prev_obj, evt)
+        queue_track_write(pipe, evt, prev_obj, updated)
+        compute[0] += time.perf_counter() - c0
+        return updated
+
+    tx0 = time.perf_counter()
+    updated = r.transaction(write, key, value_from_callable=True)
+    return fuse_response(response, traceparent, accept, accept_encoding, start, t0, time.perf_counter() - tx0 - compute[0], updated)
+
+
+async def fuse_observation_async(
+    evt: Annotated[ObservationEvent, Depends(observation_body)],
+    response: Response,
+    traceparent: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    """fuse_observation on the event loop: waiting on Redis does not hold a threadpool slot."""
+    start = time.time()
+    t0 = time.perf_counter()
+
+    key = track_key(evt.object_id)
+    compute = [0.0]
+
+    async def write(pipe) -> dict:
+        raw = await pipe.hget(key, "json")
+        c0 = time.perf_counter()
+        prev_obj = orjson.loads(raw) if raw else None
+        updated = fuse(prev_obj, evt)
+        queue_track_write(pipe, evt, prev_obj, updated)
+        compute[0] += time.perf_counter() - c0
+        return updated
+
+    tx0 = time.perf_counter()
+    updated = await ar.transaction(write, key, value_from_callable=True)
+    return fuse_response(response, traceparent, accept, accept_encoding, start, t0, time.perf_counter() - tx0 - compute[0], updated)
+
 
-    return {"status": "ok", "track": updated}
+app.post("/fuse")(fuse_observation_async if REDIS_ASYNC else fuse_observation)
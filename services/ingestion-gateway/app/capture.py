@@ -0,0 +1,137 @@
+"""
+Observation capture: every accepted event with its arrival time, on local disk.
+
+Layout under CAPTURE_DIR:
+  capture-<start_ms>.ndjson.gz   one segment per CAPTURE_SEGMENT_SECONDS
+  index.jsonl                    one line per chunk: segment, offset, length, count, first_t, last_t
+
+Each chunk of up to CAPTURE_CHUNK_EVENTS records is written as its own gzip
+member, so a segment is still a valid .gz file but any chunk can be read by
+seeking to its offset and decompressing `length` bytes. The index lets a
+reader start at an arbitrary time without scanning earlier data.
+
+Handlers only enqueue; a background thread does the encoding and I/O. When the
+queue is full, events are dropped from the capture (counted), never delayed.
+"""
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterator, Optional
+
+from prometheus_client import Counter
+
+
+capture_total = Counter("sda_capture_total", "Captured observations by outcome", ["service", "outcome"])
+
+
+class CaptureWriter:
+    def __init__(self, directory: str, service: str, chunk_events: int = 500, segment_seconds: float = 300.0, flush_seconds: float = 1.0, max_queue: int = 100_000):
+        self.directory = directory
+        self.service = service
+        self.chunk_events = chunk_events
+        self.segment_seconds = segment_seconds
+        self.flush_seconds = flush_seconds
+        self._q: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._seg_name: Optional[str] = None
+        self._seg_started = 0.0
+        self._seg_offset = 0
+
+    def offer(self, event: dict, arrival_ts: float) -> None:
+        try:
+            self._q.put_nowait((arrival_ts, event))
+        except queue.Full:
+            capture_total.labels(self.service, "dropped").inc()
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _run(self) -> None:
+        chunk: list[tuple[float, dict]] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._write_chunk(chunk)
+                return
+            if item:
+                chunk.append(item)
+            if len(chunk) >= self.chunk_events or time.monotonic() >= deadline:
+                self._write_chunk(chunk)
+                chunk = []
+                deadline = time.monotonic() + self.flush_seconds
+
+    def _write_chunk(self, chunk: list[tuple[float, dict]]) -> None:
+        if not chunk:
+            return
+        first_t = chunk[0][0]
+        if self._seg_name is None or first_t - self._seg_started >= self.segment_seconds:
+            self._seg_name = f"capture-{int(first_t * 1000)}.ndjson.gz"
+            self._seg_started = first_t
+            self._seg_offset = 0
+
+        lines = "".join(json.dumps({"t": t, "event": e}, separators=(",", ":")) + "\n" for t, e in chunk)
+        blob = gzip.compress(lines.encode(), compresslevel=6)
+        try:
+            with open(os.path.join(self.directory, self._seg_name), "ab") as f:
+                f.write(blob)
+            entry = {
+                "segment": self._seg_name,
+                "offset": self._seg_offset,
+                "length": len(blob),
+                "count": len(chunk),
+                "first_t": first_t,
+                "last_t": chunk[-1][0],
+            }
+            # Index line goes last, so an indexed chunk is always complete on disk
+            with open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._seg_offset += len(blob)
+            capture_total.labels(self.service, "written").inc(len(chunk))
+        except OSError:
+            capture_total.labels(self.service, "error").inc(len(chunk))
+
+
+def read_index(directory: str) -> list[dict]:
+    entries = []
+    with open(os.path.join(directory, "index.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break  # torn final line from a crash mid-write
+    return entries
+
+
+def read_capture(directory: str, start_t: Optional[float] = None, end_t: Optional[float] = None) -> Iterator[tuple[float, dict]]:
+    """Yield (arrival_ts, event) in capture order, seeking straight to chunks that overlap [start_t, end_t]."""
+    for entry in read_index(directory):
+        if start_t is not None and entry["last_t"] < start_t:
+            continue
+        if end_t is not None and entry["first_t"] > end_t:
+            break
+        with open(os.path.join(directory, entry["segment"]), "rb") as f:
+            f.seek(entry["offset"])
+            data = gzip.decompress(f.read(entry["length"]))
+        for line in data.splitlines():
+            rec = json.loads(line)
+            t = rec["t"]
+            if (start_t is None or t >= start_t) and (end_t is None or t <= end_t):
+                yield t, rec["event"]
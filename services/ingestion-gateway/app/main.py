@@ -1,76 +1,150 @@
 import os
 import time
-from typing import Optional
+from typing import Annotated, Optional
 
 import httpx
-import jwt
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel, Field
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from fastapi import Depends, FastAPI, Header, HTTPException
+from prometheus_client import Counter, Histogram
 from fastapi.responses import Response
 
+from sentinel_common.auth import verify_bearer
+from sentinel_common.codec import encode_body, observation_body, relay_response
+from sentinel_common.models import ObservationEvent
+from sentinel_common.profiling import debug_router
+from sentinel_common.service import add_metrics_route, health_body
+from sentinel_common.tracing import parse_server_timing, server_timing, trace_context, traceparent
+
+from .capture import CaptureWriter
+from .tracing import SloWindow, TraceExporter
 
 APP_NAME = os.getenv("SERVICE_NAME", "ingestion-gateway")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 FORWARD_URL = os.getenv("VALIDATION_URL", "http://validation-service:8000/validate")
 
 REQ_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "3.0"))
+FORWARD_MAX_CONNECTIONS = int(os.getenv("FORWARD_MAX_CONNECTIONS", "100"))
+# Body format (json | msgpack) and compression (identity | gzip | zstd) of the forward hop
+FORWARD_FORMAT = os.getenv("FORWARD_FORMAT", "json")
+FORWARD_ENCODING = os.getenv("FORWARD_ENCODING", "identity")
+
+# Capture (see app/capture.py); disabled unless CAPTURE_DIR is set
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "")
+CAPTURE_CHUNK_EVENTS = int(os.getenv("CAPTURE_CHUNK_EVENTS", "500"))
+CAPTURE_SEGMENT_SECONDS = float(os.getenv("CAPTURE_SEGMENT_SECONDS", "300"))
+
+# Tracing (see app/tracing.py); export is disabled unless TRACE_EXPORT_URL is set
+SLO_TARGET_SECONDS = float(os.getenv("SLO_TARGET_SECONDS", "2.0"))
+SLO_WINDOW_EVENTS = int(os.getenv("SLO_WINDOW_EVENTS", "10000"))
+TRACE_EXPORT_URL = os.getenv("TRACE_EXPORT_URL", "")
 
 ingest_total = Counter("sda_ingest_total", "Total observations received", ["service"])
 ingest_forward_fail = Counter("sda_ingest_forward_fail_total", "Forward failures", ["service"])
 ingest_latency = Histogram("sda_ingest_latency_seconds", "Ingest handler latency", ["service"])
-
-
-class ObservationEvent(BaseModel):
-    event_id: str
-    sensor_id: str
-    sensor_type: str
-    timestamp: str
-    object_id: str
-    measurement: dict = Field(default_factory=dict)
-    quality: dict = Field(default_factory=dict)
-    integrity: Optional[dict] = None
-
-
-def verify_bearer(auth: Optional[str]) -> None:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+ingest_to_track = Histogram(
+    "sda_ingest_to_track_seconds",
+    "Gateway receipt to track written, successful observations",
+    ["service"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0),
+)
+stage_latency = Histogram("sda_stage_latency_seconds", "Exclusive time per ingest stage, as seen by the gateway", ["service", "stage"])
 
 
 app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
+# One pooled client for all forwards instead of a new connection per request
+client = httpx.AsyncClient(
+    timeout=REQ_TIMEOUT,
+    limits=httpx.Limits(max_connections=FORWARD_MAX_CONNECTIONS, max_keepalive_connections=FORWARD_MAX_CONNECTIONS),
+)
+capture: Optional[CaptureWriter] = CaptureWriter(CAPTURE_DIR, APP_NAME, CAPTURE_CHUNK_EVENTS, CAPTURE_SEGMENT_SECONDS) if CAPTURE_DIR else None
+slo = SloWindow(SLO_WINDOW_EVENTS, SLO_TARGET_SECONDS)
+exporter: Optional[TraceExporter] = TraceExporter(TRACE_EXPORT_URL, APP_NAME) if TRACE_EXPORT_URL else None
+
+
+@app.on_event("startup")
+async def startup():
+    if capture is not None:
+        capture.start()
+    if exporter is not None:
+        exporter.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if capture is not None:
+        capture.stop()
+    if exporter is not None:
+        await exporter.stop()
+    await client.aclose()
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": APP_NAME, "ts": int(time.time())}
+    return health_body(APP_NAME, capture=capture is not None)
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+@app.get("/slo")
+def slo_report():
+    """p50/p95/p99 ingest-to-track latency of this replica's recent observations, with a per-stage breakdown."""
+    return {"service": APP_NAME, **slo.report()}
 
 
 @app.post("/observations")
-async def observations(evt: ObservationEvent, authorization: Optional[str] = Header(default=None)):
+async def observations(
+    evt: Annotated[ObservationEvent, Depends(observation_body)],
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    traceparent_header: Optional[str] = Header(default=None, alias="traceparent"),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
     start = time.time()
-    verify_bearer(authorization)
+    t0 = time.perf_counter()
     ingest_total.labels(APP_NAME).inc()
-
-    headers = {"Authorization": authorization}
+    body = evt.model_dump()
+    if capture is not None:
+        capture.offer(body, start)
+
+    trace_id, span_id = trace_context(traceparent_header)
+    content, headers = encode_body(body, FORWARD_FORMAT, FORWARD_ENCODING)
+    headers.update({"Authorization": authorization, "traceparent": traceparent(trace_id, span_id)})
+    forward_s = 0.0
+    downstream: dict = {}
+    ok = False
     try:
-        async with httpx.AsyncClient(timeout=REQ_TIMEOUT) as client:
-            resp = await client.post(FORWARD_URL, json=evt.model_dump(), headers=headers)
-            if resp.status_code != 200:
-                ingest_forward_fail.labels(APP_NAME).inc()
-                raise HTTPException(status_code=502, detail=f"Validation forward failed: {resp.text}")
-            return resp.json()
+        f0 = time.perf_counter()
+        resp = await client.post(FORWARD_URL, content=content, headers=headers)
+        forward_s = time.perf_counter() - f0
+        downstream = parse_server_timing(resp.headers.get("server-timing", ""))
+        if resp.status_code != 200:
+            ingest_forward_fail.labels(APP_NAME).inc()
+            raise HTTPException(status_code=502, detail=f"Validation forward failed: {resp.text}")
+        ok = True
     finally:
+        total = time.perf_counter() - t0
         ingest_latency.labels(APP_NAME).observe(time.time() - start)
+        stages = {"gateway_app": total - forward_s}
+        if forward_s:
+            stages["gateway_to_validation_net"] = max(0.0, forward_s - downstream.get("validation_total", forward_s))
+        stages.update((k, v) for k, v in downstream.items() if not k.endswith("_total"))
+        response.headers["server-timing"] = server_timing({**stages, "gateway_total": total})
+        response.headers["traceparent"] = traceparent(trace_id, span_id)
+        if ok:
+            ingest_to_track.labels(APP_NAME).observe(total)
+            for k, v in stages.items():
+                stage_latency.labels(APP_NAME, k).observe(v)
+            slo.add(total, stages)
+        if exporter is not None:
+            exporter.offer(
+                {
+                    "trace_id": trace_id,
+                    "span_id": span_id,
+                    "event_id": evt.event_id,
+                    "object_id": evt.object_id,
+                    "start": start,
+                    "total_s": total,
+                    "ok": ok,
+                    "stages": stages,
+                }
+            )
+    return relay_response(resp, accept, accept_encoding, response.headers)
@@ -0,0 +1,140 @@
+"""
+Per-observation tracing for the ingest chain: gateway -> validation-service -> fusion-engine.
+
+Each hop continues the W3C `traceparent` it receives and answers with a
+`Server-Timing` header listing its exclusive stage durations plus everything
+its downstream reported. The gateway therefore sees the whole breakdown for
+every observation:
+
+  gateway_app, gateway_to_validation_net,
+  validation_app, validation_to_fusion_net,
+  fusion_app, fusion_redis
+
+Network time of a hop is the caller's view of the call minus the callee's
+reported `<service>_total`. The stages sum to the ingest-to-track time, which
+is what NFR-002 bounds (p95 <= 2 s).
+
+The traceparent and Server-Timing helpers themselves live in sentinel_common.tracing.
+
+SloWindow keeps the last N traces for the /slo report. TraceExporter optionally
+batches finished traces to a collector (TRACE_EXPORT_URL, e.g.
+scripts/trace_collector.py); it only ever drops, never delays a request.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter
+
+
+trace_export_total = Counter("sda_trace_export_total", "Traces offered to the collector by outcome", ["service", "outcome"])
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class SloWindow:
+    """Ingest-to-track latency and stage breakdown of the last `size` successful traces."""
+
+    def __init__(self, size: int, target_s: float, percentile: float = 95.0):
+        self.target_s = target_s
+        self.percentile = percentile
+        self._items: Deque[Tuple[float, Dict[str, float]]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, total_s: float, stages: Dict[str, float]) -> None:
+        with self._lock:
+            self._items.append((total_s, stages))
+
+    def report(self) -> dict:
+        with self._lock:
+            items = list(self._items)
+        totals = sorted(t for t, _ in items)
+        names: Dict[str, List[float]] = {}
+        for _, stages in items:
+            for k, v in stages.items():
+                names.setdefault(k, []).append(v)
+        total_sum = sum(totals) or 1.0
+        p_target = percentile(totals, self.percentile)
+        return {
+            "objective": f"p{self.percentile:g} ingest-to-track <= {self.target_s:g}s (NFR-002)",
+            "window": len(totals),
+            "p50_s": percentile(totals, 50),
+            "p95_s": percentile(totals, 95),
+            "p99_s": percentile(totals, 99),
+            "max_s": totals[-1] if totals else 0.0,
+            "met": bool(totals) and p_target <= self.target_s,
+            "over_target_pct": 100.0 * sum(1 for t in totals if t > self.target_s) / len(totals) if totals else 0.0,
+            "stages": {
+                k: {
+                    "p50_s": percentile(sorted(v), 50),
+                    "p95_s": percentile(sorted(v), 95),
+                    "p99_s": percentile(sorted(v), 99),
+                    "share_pct": 100.0 * sum(v) / total_sum,
+                }
+                for k, v in names.items()
+            },
+        }
+
+
+class TraceExporter:
+    """Batches finished traces and POSTs them as {"traces": [...]} to a collector."""
+
+    def __init__(self, url: str, service: str, batch_size: int = 200, flush_seconds: float = 1.0, max_queue: int = 10_000):
+        self.url = url
+        self.service = service
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._q: Optional[asyncio.Queue] = None
+        self._max_queue = max_queue
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def offer(self, trace: dict) -> None:
+        if self._q is None:
+            return
+        try:
+            self._q.put_nowait(trace)
+        except asyncio.QueueFull:
+            trace_export_total.labels(self.service, "dropped").inc()
+
+    def start(self) -> None:
+        self._q = asyncio.Queue(maxsize=self._max_queue)
+        self._client = httpx.AsyncClient(timeout=5.0)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._q.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                resp = await self._client.post(self.url, json={"service": self.service, "traces": batch})
+                outcome = "exported" if resp.status_code < 300 else "failed"
+            except httpx.HTTPError:
+                outcome = "failed"
+            trace_export_total.labels(self.service, outcome).inc(len(batch))
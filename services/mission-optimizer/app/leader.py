@@ -0,0 +1,66 @@
+"""
+Redis-lease leader election with fencing tokens.
+
+One replica holds `optimizer:leader` (SET NX PX) and renews it every cycle. Each
+successful acquisition increments `optimizer:leader:epoch`; that number is the
+fencing token sent with every tasking push, so tasking-service can reject a
+deposed leader that is still running (GC pause, network partition) after its
+lease expired and another replica took over.
+"""
+from typing import Optional
+
+import redis
+
+
+# KEYS[1]=lease, KEYS[2]=epoch; ARGV[1]=holder id, ARGV[2]=ttl ms
+# Returns the holder's fencing token, or 0 when another replica holds the lease.
+_ACQUIRE = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+  return redis.call('INCR', KEYS[2])
+end
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  redis.call('PEXPIRE', KEYS[1], ARGV[2])
+  return tonumber(redis.call('GET', KEYS[2]))
+end
+return 0
+"""
+
+# KEYS[1]=lease; ARGV[1]=holder id
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    def __init__(self, r: redis.Redis, holder_id: str, ttl_ms: int, key: str = "optimizer:leader"):
+        self.r = r
+        self.holder_id = holder_id
+        self.ttl_ms = ttl_ms
+        self.key = key
+        self.epoch_key = f"{key}:epoch"
+        self.token: Optional[int] = None
+        self._acquire = r.register_script(_ACQUIRE)
+        self._release = r.register_script(_RELEASE)
+
+    @property
+    def is_leader(self) -> bool:
+        return self.token is not None
+
+    def tick(self) -> bool:
+        """Acquire or renew the lease. Any Redis error demotes this replica."""
+        try:
+            token = int(self._acquire(keys=[self.key, self.epoch_key], args=[self.holder_id, self.ttl_ms]))
+        except redis.RedisError:
+            token = 0
+        self.token = token or None
+        return self.is_leader
+
+    def release(self) -> None:
+        try:
+            self._release(keys=[self.key], args=[self.holder_id])
+        except redis.RedisError:
+            pass
+        self.token = None
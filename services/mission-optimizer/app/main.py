@@ -1,133 +1,332 @@
 import os
 import time
 import json
+import uuid
+import socket
 import threading
-from typing import Optional
+from datetime import datetime
+from typing import Iterator, Optional
 
-import jwt
-import redis
-import httpx
-from fastapi import FastAPI, Header, HTTPException
-from prometheus_client import Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from fastapi import FastAPI
+from prometheus_client import Counter, Gauge
 
+from sentinel_common.auth import issue_token, verify_bearer
+from sentinel_common.changes import ChangeFeed
+from sentinel_common.keys import idx_key, restore_lock_key, stats_key, track_key
+from sentinel_common.profiling import debug_router
+from sentinel_common.redis_pool import redis_client
+from sentinel_common.regimes import REGIMES, orbit_regime
+from sentinel_common.service import add_metrics_route, health_body, redis_ping
+from sentinel_common.snapshot import SNAPSHOT_PATH, SnapshotEntry, TrackSnapshot, write_snapshot
+
+from .leader import LeaderLease
+from .scheduler import RevisitScheduler, Sensor, coverage_regimes, sensors_from_policy
 
-APP_NAME = os.getenv("SERVICE_NAME", "mission-optimizer")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 
-REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+APP_NAME = os.getenv("SERVICE_NAME", "mission-optimizer")
 
 TASKING_URL = os.getenv("TASKING_URL", "http://tasking-service:8000/tasking")
 OPT_INTERVAL = float(os.getenv("OPT_INTERVAL_SECONDS", "5.0"))
 HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "3.0"))
-
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+LOW_CONF_THRESHOLD = float(os.getenv("LOW_CONF_THRESHOLD", "0.75"))
+REBUILD_BATCH = int(os.getenv("STATS_REBUILD_BATCH", "500"))
+CHANGE_BATCH = int(os.getenv("CHANGE_BATCH", "1000"))
+POLICY_PATH = os.getenv("POLICY_PATH", "config/policy.yaml")
+SLOT_SECONDS = float(os.getenv("SCHED_SLOT_SECONDS", "60"))
+HORIZON_SLOTS = int(os.getenv("SCHED_HORIZON_SLOTS", "10"))
+REVISIT_MIN_SECONDS = float(os.getenv("REVISIT_MIN_SECONDS", "60"))
+REVISIT_MAX_SECONDS = float(os.getenv("REVISIT_MAX_SECONDS", "1800"))
+LEASE_TTL_SECONDS = float(os.getenv("LEADER_LEASE_TTL_SECONDS", "15"))
+# The leader writes the catalogue to TRACK_SNAPSHOT_PATH this often (when the path is set)
+SNAPSHOT_INTERVAL = float(os.getenv("TRACK_SNAPSHOT_INTERVAL_SECONDS", "300"))
+INSTANCE_ID = f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+# Used when the policy file is absent (e.g. running outside the cluster)
+DEFAULT_SENSORS = [
+    Sensor("radar-1", "radar", 3, coverage_regimes("LEO/MEO")),
+    Sensor("optical-1", "optical", 2, coverage_regimes("GEO/clear-sky")),
+    Sensor("space-1", "space", 2, coverage_regimes("GEO/continuous")),
+]
+
+r = redis_client()
 
 opt_runs = Counter("sda_optimizer_runs_total", "Optimizer runs total", ["service"])
 opt_last_ts = Gauge("sda_optimizer_last_run_timestamp", "Last optimizer run unix timestamp", ["service"])
 opt_tasking_pushed = Counter("sda_optimizer_tasking_pushed_total", "Tasking pushes total", ["service"])
+opt_changes = Counter("sda_optimizer_track_changes_total", "Track changes applied to the revisit scheduler", ["service"])
+opt_resyncs = Counter("sda_optimizer_resyncs_total", "Full catalogue rescans of the revisit scheduler", ["service"])
+opt_is_leader = Gauge("sda_optimizer_is_leader", "1 if this replica holds the optimizer lease", ["service"])
+opt_scheduled = Gauge("sda_optimizer_scheduled_objects", "Objects held in the revisit scheduler", ["service"])
+opt_uncovered = Gauge("sda_optimizer_uncovered_objects", "Scheduled objects in a regime no sensor covers", ["service", "regime"])
+opt_warm_starts = Counter("sda_optimizer_warm_starts_total", "Revisit scheduler loads from the track snapshot", ["service"])
+snapshot_writes = Counter("sda_track_snapshot_writes_total", "Track snapshots written", ["service"])
+snapshot_records = Gauge("sda_track_snapshot_records", "Tracks in the last snapshot written", ["service"])
+snapshot_seconds = Gauge("sda_track_snapshot_write_seconds", "Duration of the last snapshot write", ["service"])
+snapshot_write_failures = Counter("sda_track_snapshot_write_failures_total", "Track snapshot writes that failed", ["service"])
+
+
+def parse_ts(ts: str) -> float:
+    try:
+        return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return time.time()
+
 
+def load_sensors() -> list[Sensor]:
+    import yaml
 
-def verify_bearer(auth: Optional[str]) -> dict:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return payload
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+        with open(POLICY_PATH, "r", encoding="utf-8") as f:
+            sensors = sensors_from_policy(yaml.safe_load(f) or {})
+        return sensors or DEFAULT_SENSORS
+    except OSError:
+        return DEFAULT_SENSORS
+
+
+def scan_raw() -> Iterator[str]:
+    """Stored track JSON, one pipelined round trip per SSCAN page."""
+    cursor = 0
+    while True:
+        cursor, object_ids = r.sscan(idx_key(), cursor=cursor, count=REBUILD_BATCH)
+        pipe = r.pipeline(transaction=False)
+        for oid in object_ids:
+            pipe.hget(track_key(oid), "json")
+        for raw in pipe.execute():
+            if raw:
+                yield raw
+        if cursor == 0:
+            break
+
+
+def scan_catalogue() -> Iterator[dict]:
+    for raw in scan_raw():
+        yield json.loads(raw)
+
+
+def read_stats() -> dict:
+    """O(1) read of the aggregates fusion-engine maintains on every track write."""
+    raw = r.hgetall(stats_key())
+    return {
+        "tracks_total": int(raw.get("tracks_total", 0)),
+        "low_conf": int(raw.get("low_conf", 0)),
+        "regimes": {g: int(raw.get(f"regime:{g}", 0)) for g in REGIMES},
+    }
+
 
+# KEYS[1]=track:stats, KEYS[2]=restore lock; ARGV=field, count pairs
+_SEED_STATS = """
+if redis.call('EXISTS', KEYS[2]) == 1 or redis.call('HEXISTS', KEYS[1], 'seeded') == 1 then
+  return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV))
+return 1
+"""
 
-def issue_token() -> str:
-    payload = {"svc": APP_NAME, "iss": JWT_ISSUER, "iat": int(time.time())}
-    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+def rebuild_stats() -> bool:
+    """
+    Full-catalogue scan to seed track:stats for tracks written before fusion kept aggregates.
+    Runs once (until the "seeded" marker is set); fusion increments landing mid-scan may be
+    off by one per concurrent write, which is acceptable for a one-off bootstrap.
+    Skipped while fusion-engine restores the snapshot, which adds the restored tracks to
+    track:stats itself: counting them here as well would count them twice.
+    """
+    if r.exists(restore_lock_key()):
+        return False
+    counts = {"seeded": 1, "tracks_total": 0, "low_conf": 0, **{f"regime:{g}": 0 for g in REGIMES}}
+    for t in scan_catalogue():
+        counts["tracks_total"] += 1
+        counts["low_conf"] += int(float(t.get("confidence", 0.0)) < LOW_CONF_THRESHOLD)
+        counts[f"regime:{orbit_regime(t.get('state') or {})}"] += 1
+    # Re-checked with the write: a restore may have started (or finished) during the scan
+    args = [x for field, n in counts.items() for x in (field, n)]
+    seed = r.register_script(_SEED_STATS)
+    return bool(seed(keys=[stats_key(), restore_lock_key()], args=args))
 
 
-def idx_key() -> str:
-    return "track:index"
+def change_feed() -> ChangeFeed:
+    return ChangeFeed(r, CHANGE_BATCH)
 
 
-def track_key(object_id: str) -> str:
-    return f"track:{object_id}"
+def resync(scheduler: RevisitScheduler, feed: ChangeFeed) -> None:
+    """Full rescan into the scheduler. Marks the feed first so writes during the scan are replayed, not lost."""
+    feed.mark()
+    for t in scan_catalogue():
+        scheduler.update(t["object_id"], float(t.get("confidence", 0.0)), parse_ts(t.get("last_update", "")), orbit_regime(t.get("state") or {}))
+    opt_resyncs.labels(APP_NAME).inc()
 
 
-def compute_tasking(tracks: list[dict]) -> dict:
+def warm_start(scheduler: RevisitScheduler) -> Optional[ChangeFeed]:
     """
-    Simple mission logic:
-    - Higher confidence tracks get less frequent re-tasking
-    - Lower confidence tracks get higher priority
-    - Convert into per-sensor "rate_hz" recommendations
+    Load the scheduler from the track snapshot instead of rescanning Redis; the returned
+    feed replays track:changes from where the snapshot was taken. None if there is no
+    snapshot, or the stream has since been trimmed past its position.
     """
-    # Default rates (Hz)
-    radar_rate = 2.0
-    optical_rate = 1.0
-    space_rate = 1.5
-
-    # Mission scoring: if many low-confidence tracks, increase sensor rates
-    low_conf = sum(1 for t in tracks if float(t.get("confidence", 0.0)) < 0.75)
-    total = max(1, len(tracks))
-    pressure = low_conf / total  # 0..1
+    snap = TrackSnapshot.open(SNAPSHOT_PATH)
+    if snap is None:
+        return None
+    try:
+        feed = change_feed()
+        feed.last_id, feed.position = snap.stream_last_id, snap.stream_entries_added
+        if feed.has_gap():
+            return None
+        for rec in snap:
+            scheduler.update(rec.object_id, rec.confidence, rec.last_update_ts, rec.regime)
+    finally:
+        snap.close()
+    opt_warm_starts.labels(APP_NAME).inc()
+    return feed
+
+
+def write_track_snapshot() -> int:
+    """Snapshot the catalogue, current to the change-feed position taken before the scan."""
+    start = time.perf_counter()
+    feed = change_feed()
+    feed.mark()
+
+    def entries():
+        for raw in scan_raw():
+            t = json.loads(raw)
+            state = t.get("state") or {}
+            yield SnapshotEntry(
+                t["object_id"], raw.encode(), state, float(t.get("confidence", 0.0)), parse_ts(t.get("last_update", "")), orbit_regime(state)
+            )
+
+    n = write_snapshot(SNAPSHOT_PATH, entries(), feed.last_id, feed.position)
+    snapshot_writes.labels(APP_NAME).inc()
+    snapshot_records.labels(APP_NAME).set(n)
+    snapshot_seconds.labels(APP_NAME).set(time.perf_counter() - start)
+    return n
+
+
+def snapshot_loop(stop_event: threading.Event, lease: LeaderLease):
+    """Its own thread: a large catalogue takes a while to scan and must not delay lease renewal."""
+    while not stop_event.wait(SNAPSHOT_INTERVAL):
+        if lease.is_leader:
+            try:
+                write_track_snapshot()
+            except Exception:
+                # The previous snapshot stays in place; the next interval tries again
+                snapshot_write_failures.labels(APP_NAME).inc()
+
+
+def apply_changes(scheduler: RevisitScheduler, feed: ChangeFeed) -> int:
+    n = 0
+    for c in feed.read():
+        scheduler.update(c["object_id"], float(c.get("confidence", 0.0)), parse_ts(c.get("last_update", "")), c.get("regime", "LEO"))
+        n += 1
+    opt_changes.labels(APP_NAME).inc(n)
+    return n
+
+
+def compute_tasking(stats: dict, scheduler: RevisitScheduler) -> dict:
+    """
+    Revisit-driven mission logic:
+    - Each object is due for revisit after an interval that grows with its confidence
+    - The most overdue objects are packed into time slots on sensors covering their regime,
+      limited by each sensor's max_tasks per slot
+    - A sensor's "rate_hz" rises with how full its own schedule is, not with global pressure
+    """
+    now = time.time()
+    schedule = scheduler.plan(now)
 
-    radar_rate = min(5.0, radar_rate + 3.0 * pressure)
-    optical_rate = min(3.0, optical_rate + 2.0 * pressure)
-    space_rate = min(4.0, space_rate + 2.5 * pressure)
+    low_conf = int(stats.get("low_conf", 0))
+    total = max(1, int(stats.get("tracks_total", 0)))
+    pressure = min(1.0, low_conf / total)  # 0..1
 
     return {
-        "generated_at": int(time.time()),
-        "policy": "pressure_based_v1",
-        "summary": {"tracks_total": total, "low_conf_tracks": low_conf, "pressure": round(pressure, 3)},
-        "sensors": {
-            "radar-1": {"rate_hz": round(radar_rate, 2)},
-            "optical-1": {"rate_hz": round(optical_rate, 2)},
-            "space-1": {"rate_hz": round(space_rate, 2)},
+        "generated_at": int(now),
+        "policy": "revisit_heap_v1",
+        "summary": {
+            "tracks_total": total,
+            "low_conf_tracks": low_conf,
+            "pressure": round(pressure, 3),
+            "regimes": stats.get("regimes", {}),
+            "scheduled_objects": len(scheduler),
+            "assigned_tasks": schedule["assigned"],
+            "unplaced_tasks": schedule["unplaced"],
+            "uncovered_objects": schedule["uncovered"],
         },
+        "slot_seconds": schedule["slot_seconds"],
+        "horizon_slots": schedule["horizon_slots"],
+        "sensors": schedule["sensors"],
     }
 
 
-def optimizer_loop(stop_event: threading.Event):
-    token = issue_token()
+def optimizer_loop(stop_event: threading.Event, lease: LeaderLease):
+    """
+    Every replica keeps its scheduler current from the change feed (hot standby), so a
+    follower that wins the lease can publish on its first cycle. Only the leader seeds
+    aggregates and pushes tasking, stamped with its fencing token.
+    """
+    # Imported here, in the optimizer thread, so they are not on the startup path
+    import httpx
+
+    token = issue_token(APP_NAME)
     headers = {"Authorization": f"Bearer {token}"}
+    client = httpx.Client(timeout=HTTP_TIMEOUT)
+    scheduler = RevisitScheduler(load_sensors(), SLOT_SECONDS, HORIZON_SLOTS, REVISIT_MIN_SECONDS, REVISIT_MAX_SECONDS)
+    feed: Optional[ChangeFeed] = None
+    # Renew well inside the TTL even when the optimizer interval is long
+    wait = min(OPT_INTERVAL, LEASE_TTL_SECONDS / 3)
+    next_run = 0.0
 
     while not stop_event.is_set():
+        leader = lease.tick()
+        opt_is_leader.labels(APP_NAME).set(int(leader))
         try:
-            object_ids = list(r.smembers(idx_key()))
-            tracks = []
-            for oid in object_ids[:200]:
-                raw = r.hget(track_key(oid), "json")
-                if raw:
-                    tracks.append(json.loads(raw))
-
-            tasking = compute_tasking(tracks)
-
-            with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                resp = client.post(TASKING_URL, json=tasking, headers=headers)
-                resp.raise_for_status()
-
-            opt_runs.labels(APP_NAME).inc()
-            opt_tasking_pushed.labels(APP_NAME).inc()
-            opt_last_ts.labels(APP_NAME).set(int(time.time()))
+            if time.time() >= next_run:
+                next_run = time.time() + OPT_INTERVAL
+                if leader and not r.hexists(stats_key(), "seeded"):
+                    rebuild_stats()
+
+                if feed is None:
+                    feed = warm_start(scheduler)
+                if feed is None or feed.has_gap():
+                    fresh = change_feed()
+                    resync(scheduler, fresh)
+                    feed = fresh
+                apply_changes(scheduler, feed)
+                opt_scheduled.labels(APP_NAME).set(len(scheduler))
+                uncovered = scheduler.uncovered()
+                for g in REGIMES:
+                    opt_uncovered.labels(APP_NAME, g).set(uncovered.get(g, 0))
+
+                if leader:
+                    tasking = compute_tasking(read_stats(), scheduler)
+                    tasking["fencing_token"] = lease.token
+
+                    resp = client.post(TASKING_URL, json=tasking, headers=headers)
+                    resp.raise_for_status()
+
+                    opt_tasking_pushed.labels(APP_NAME).inc()
+                opt_runs.labels(APP_NAME).inc()
+                opt_last_ts.labels(APP_NAME).set(int(time.time()))
         except Exception:
             # Intentionally swallow errors to keep loop alive in demo environments
             pass
 
-        stop_event.wait(OPT_INTERVAL)
+        stop_event.wait(wait)
+
+    lease.release()
+    client.close()
 
 
 app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
 _stop = threading.Event()
-_thread = threading.Thread(target=optimizer_loop, args=(_stop,), daemon=True)
+_lease = LeaderLease(r, INSTANCE_ID, int(LEASE_TTL_SECONDS * 1000))
+_thread = threading.Thread(target=optimizer_loop, args=(_stop, _lease), daemon=True)
+_snapshot_thread = threading.Thread(target=snapshot_loop, args=(_stop, _lease), daemon=True)
 
 
 @app.on_event("startup")
 def startup():
     if not _thread.is_alive():
         _thread.start()
+    if SNAPSHOT_PATH and SNAPSHOT_INTERVAL > 0 and not _snapshot_thread.is_alive():
+        _snapshot_thread.start()
 
 
 @app.on_event("shutdown")
@@ -137,14 +336,4 @@ def shutdown():
 
 @app.get("/health")
 def health():
-    try:
-        r.ping()
-        redis_ok = True
-    except Exception:
-        redis_ok = False
-    return {"status": "ok" if redis_ok else "degraded", "service": APP_NAME, "redis": redis_ok, "ts": int(time.time())}
-
-
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return health_body(APP_NAME, redis_ping(r), instance=INSTANCE_ID, leader=_lease.is_leader, fencing_token=_lease.token)
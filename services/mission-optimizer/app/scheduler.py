@@ -0,0 +1,183 @@
+"""
+Revisit scheduler: one deadline per object in a min-heap.
+
+An object's revisit deadline is its last update plus an interval that grows with
+confidence, so poorly-tracked objects come due first. Track changes replace an
+object's entry in O(log n) (the old heap entry is left behind and skipped when
+popped); planning pops only as many entries as there is sensor capacity and
+pushes them back, so a cycle costs O(k log n) for k scheduled tasks rather than
+a pass over the whole catalogue.
+
+Each regime has its own heap and planning merges only the regimes some sensor
+covers, so objects no sensor can observe (HEO with the default policy) are
+counted as uncovered instead of being popped, and left unplaced, every cycle.
+"""
+import heapq
+import itertools
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sentinel_common.regimes import REGIMES
+
+
+# (base, max) emission rate in Hz by sensor type; sensors run at base when idle
+# and approach max as their scheduled slots fill up.
+RATE_LIMITS = {"radar": (2.0, 5.0), "optical": (1.0, 3.0), "space": (1.5, 4.0)}
+DEFAULT_RATE_LIMITS = (1.0, 3.0)
+
+
+@dataclass
+class Sensor:
+    sensor_id: str
+    sensor_type: str
+    max_tasks: int = 3
+    regimes: frozenset = field(default_factory=lambda: frozenset(REGIMES))
+
+
+def coverage_regimes(hint: Optional[str]) -> frozenset:
+    """Regimes named in a policy coverage_hint ("LEO/MEO", "GEO/clear-sky"); all regimes if none are named."""
+    tokens = {t.upper() for t in re.split(r"[^A-Za-z]+", hint or "") if t}
+    named = frozenset(tokens & set(REGIMES))
+    return named or frozenset(REGIMES)
+
+
+def sensors_from_policy(raw: dict) -> list[Sensor]:
+    sensors = []
+    for s in (raw.get("sensor_inventory") or {}).get("sensors") or []:
+        if not s.get("is_available", True):
+            continue
+        sensors.append(
+            Sensor(
+                sensor_id=s["sensor_id"],
+                sensor_type=s["sensor_type"],
+                max_tasks=int(s.get("max_tasks", 3)),
+                regimes=coverage_regimes(s.get("coverage_hint")),
+            )
+        )
+    return sensors
+
+
+class RevisitScheduler:
+    def __init__(self, sensors: list[Sensor], slot_seconds: float, horizon_slots: int, min_revisit_s: float, max_revisit_s: float):
+        self.sensors = sensors
+        self.slot_seconds = slot_seconds
+        self.horizon_slots = horizon_slots
+        self.min_revisit_s = min_revisit_s
+        self.max_revisit_s = max_revisit_s
+        self._heaps: dict[str, list[tuple[float, int, str]]] = {g: [] for g in REGIMES}
+        self._entries: dict[str, tuple[float, int, str]] = {}  # object_id -> (deadline, seq, regime)
+        self._regime_counts = dict.fromkeys(REGIMES, 0)
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def revisit_interval(self, confidence: float) -> float:
+        c = max(0.0, min(1.0, confidence))
+        return self.min_revisit_s + (self.max_revisit_s - self.min_revisit_s) * c
+
+    def update(self, object_id: str, confidence: float, last_update_ts: float, regime: str) -> None:
+        deadline = last_update_ts + self.revisit_interval(confidence)
+        seq = next(self._seq)
+        prev = self._entries.get(object_id)
+        if prev is not None:
+            self._regime_counts[prev[2]] -= 1
+        self._regime_counts[regime] = self._regime_counts.get(regime, 0) + 1
+        self._entries[object_id] = (deadline, seq, regime)
+        heapq.heappush(self._heaps.setdefault(regime, []), (deadline, seq, object_id))
+        if sum(len(h) for h in self._heaps.values()) > 2 * len(self._entries) + 1024:
+            self._compact()
+
+    def _compact(self) -> None:
+        self._heaps = {g: [] for g in self._heaps}
+        for oid, (d, seq, regime) in self._entries.items():
+            self._heaps[regime].append((d, seq, oid))
+        for h in self._heaps.values():
+            heapq.heapify(h)
+
+    def _is_current(self, seq: int, object_id: str) -> bool:
+        entry = self._entries.get(object_id)
+        return entry is not None and entry[1] == seq
+
+    def uncovered(self) -> dict:
+        """Objects per regime that no sensor covers; they are never planned."""
+        covered = set().union(*(s.regimes for s in self.sensors))
+        return {g: n for g, n in self._regime_counts.items() if n and g not in covered}
+
+    def plan(self, now: float) -> dict:
+        """
+        Fill per-sensor, per-slot capacity with the most urgent objects.
+        Each object is placed in the earliest slot at or after its deadline slot where a
+        sensor covering its regime has room, preferring the least-loaded sensor.
+        """
+        slots = self.horizon_slots
+        load = {s.sensor_id: [0] * slots for s in self.sensors}
+        tasks: dict[str, list[dict]] = {s.sensor_id: [] for s in self.sensors}
+        capacity = sum(s.max_tasks for s in self.sensors) * slots
+        max_pops = 4 * capacity
+
+        heaps = [self._heaps[g] for g in set().union(*(s.regimes for s in self.sensors)) if g in self._heaps]
+        popped: list[tuple[list, tuple[float, int, str]]] = []
+        assigned = unplaced = 0
+        try:
+            while assigned < capacity and len(popped) < max_pops:
+                # Most urgent across the covered regimes' heaps
+                heap = min((h for h in heaps if h), key=lambda h: h[0], default=None)
+                if heap is None:
+                    break
+                item = heapq.heappop(heap)
+                deadline, seq, oid = item
+                if not self._is_current(seq, oid):
+                    continue
+                popped.append((heap, item))
+
+                first_slot = max(0, int((deadline - now) // self.slot_seconds))
+                if first_slot >= slots:
+                    break  # heap order: every remaining object is due beyond the horizon
+
+                regime = self._entries[oid][2]
+                placed = False
+                for slot in range(first_slot, slots):
+                    fits = [s for s in self.sensors if regime in s.regimes and load[s.sensor_id][slot] < s.max_tasks]
+                    if not fits:
+                        continue
+                    s = min(fits, key=lambda x: load[x.sensor_id][slot] / x.max_tasks)
+                    load[s.sensor_id][slot] += 1
+                    tasks[s.sensor_id].append(
+                        {
+                            "object_id": oid,
+                            "slot": slot,
+                            # start_ts and overdue_s move with `now`; tasking-service leaves them out of its versions
+                            "start_ts": int(now + slot * self.slot_seconds),
+                            "due_ts": int(deadline),
+                            "overdue_s": max(0, int(now - deadline)),
+                        }
+                    )
+                    assigned += 1
+                    placed = True
+                    break
+                if not placed:
+                    unplaced += 1
+        finally:
+            for heap, item in popped:
+                heapq.heappush(heap, item)
+
+        sensors_out = {}
+        for s in self.sensors:
+            base, top = RATE_LIMITS.get(s.sensor_type, DEFAULT_RATE_LIMITS)
+            utilization = sum(load[s.sensor_id]) / max(1, s.max_tasks * slots)
+            sensors_out[s.sensor_id] = {
+                "rate_hz": round(base + (top - base) * utilization, 2),
+                "utilization": round(utilization, 3),
+                "tasks": tasks[s.sensor_id],
+            }
+
+        return {
+            "slot_seconds": self.slot_seconds,
+            "horizon_slots": slots,
+            "assigned": assigned,
+            "unplaced": unplaced,
+            "uncovered": self.uncovered(),
+            "sensors": sensors_out,
+        }
@@ -0,0 +1,144 @@
+from __future__ import annotations
+from typing import Dict, List, Tuple
+import heapq
+import numpy as np
+
+from .matrix import ScoreMatrix
+
+
+# Scores are converted to integer costs so path comparisons are exact
+COST_SCALE = 1_000_000_000
+
+
+def prune_candidates(sm: ScoreMatrix, limit: int) -> List[Tuple[int, int, int]]:
+    """
+    Feasible (track, sensor, cost) edges, keeping for each sensor only the edges of
+    its `limit` best-scoring objects.
+
+    With at most `limit` tasks in the plan, an optimal assignment never needs an
+    object outside a sensor's top `limit`: the other `limit - 1` tasks touch at
+    most `limit - 1` objects, so an untouched object scoring at least as well is
+    always left to swap in.
+    """
+    edges: List[Tuple[int, int, int]] = []
+    total = sm.total
+    tracks = sm.tracks.tracks
+    for si in range(total.shape[1]):
+        col = total[:, si]
+        feasible = np.flatnonzero(np.isfinite(col))
+        # Stable order so equal scores keep track input order
+        feasible = feasible[np.argsort(-col[feasible], kind="stable")]
+        objects = set()
+        for ti in feasible:
+            oid = tracks[ti].object_id
+            if oid not in objects:
+                if len(objects) >= limit:
+                    break
+                objects.add(oid)
+            edges.append((int(ti), si, -int(round(float(col[ti]) * COST_SCALE))))
+    return edges
+
+
+class _Graph:
+    def __init__(self, n: int):
+        self.adj: List[List[int]] = [[] for _ in range(n)]
+        self.to: List[int] = []
+        self.cap: List[int] = []
+        self.cost: List[int] = []
+
+    def add(self, u: int, v: int, cap: int, cost: int) -> int:
+        e = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.adj[u].append(e)
+        self.adj[v].append(e + 1)
+        return e
+
+
+def select_optimal(sm: ScoreMatrix, max_tasks: int, max_per_object: int) -> List[Tuple[int, int]]:
+    """
+    Maximum total score assignment of at most `max_tasks` (track, sensor) pairs under
+    per-sensor capacity and per-object limits, by successive shortest paths on
+
+        source -> object (cap max_per_object) -> sensor (cap 1 per pair) -> sink (cap sensor capacity)
+
+    with Dijkstra over reduced costs. Each augmentation adds one task, so the
+    number of rounds is bounded by max_tasks, and pruning keeps the graph at
+    O(sensors * max_tasks) edges regardless of catalogue size.
+    """
+    n_s = sm.total.shape[1]
+    limit = min(max_tasks, int(sm.sensors.capacity.sum()))
+    if limit <= 0 or max_per_object <= 0 or n_s == 0:
+        return []
+
+    edges = prune_candidates(sm, limit)
+    tracks = sm.tracks.tracks
+
+    # Node layout: 0 source, 1 sink, then sensors, then objects (duplicate object_ids share a node)
+    src, sink = 0, 1
+    sensor_node = [2 + si for si in range(n_s)]
+    object_node: Dict[str, int] = {}
+    for ti, _, _ in edges:
+        oid = tracks[ti].object_id
+        if oid not in object_node:
+            object_node[oid] = 2 + n_s + len(object_node)
+    n = 2 + n_s + len(object_node)
+
+    g = _Graph(n)
+    for node in object_node.values():
+        g.add(src, node, max_per_object, 0)
+    pair_edge: Dict[int, Tuple[int, int]] = {}
+    for ti, si, cost in edges:
+        e = g.add(object_node[tracks[ti].object_id], sensor_node[si], 1, cost)
+        pair_edge[e] = (ti, si)
+    for si in range(n_s):
+        cap = int(sm.sensors.capacity[si])
+        if cap > 0:
+            g.add(sensor_node[si], sink, cap, 0)
+
+    # Initial potentials: the graph is a DAG with negative costs only on object -> sensor edges
+    pot = [0] * n
+    for _, si, cost in edges:
+        pot[sensor_node[si]] = min(pot[sensor_node[si]], cost)
+    pot[sink] = min((pot[sensor_node[si]] for si in range(n_s)), default=0)
+
+    inf = float("inf")
+    for _ in range(limit):
+        dist = [inf] * n
+        prev_edge = [-1] * n
+        dist[src] = 0
+        heap = [(0, src)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            pu = pot[u]
+            for e in g.adj[u]:
+                if g.cap[e] <= 0:
+                    continue
+                v = g.to[e]
+                nd = d + g.cost[e] + pu - pot[v]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev_edge[v] = e
+                    heapq.heappush(heap, (nd, v))
+        if dist[sink] == inf:
+            break
+        for v in range(n):
+            if dist[v] < inf:
+                pot[v] += dist[v]
+        # Real path cost = reduced distance corrected by potentials; stop once adding a task lowers the total
+        if pot[sink] - pot[src] >= 0:
+            break
+        v = sink
+        while v != src:
+            e = prev_edge[v]
+            g.cap[e] -= 1
+            g.cap[e ^ 1] += 1
+            v = g.to[e ^ 1]
+
+    picked = [pair for e, pair in pair_edge.items() if g.cap[e] == 0]
+    # Same presentation order as the greedy path: best score first, ties in input order
+    picked.sort(key=lambda p: (-sm.total[p[0], p[1]], p[0], p[1]))
+    return picked
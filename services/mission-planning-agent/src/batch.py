@@ -0,0 +1,96 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+import multiprocessing
+import os
+import threading
+
+from .matrix import ScoreMatrix, TrackArrays, select_greedy
+from .assignment import select_optimal
+
+
+PLAN_BATCH_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PLAN_BATCH_MAX_MISSIONS = int(os.getenv("PLAN_BATCH_MAX_MISSIONS", "100"))
+
+# (sensor columns of the shared matrix, max_tasks)
+SelectionJob = Tuple[List[int], int]
+
+
+def select_pairs(sm: ScoreMatrix, strategy: str, max_tasks: int, max_per_object: int) -> List[Tuple[int, int]]:
+    if strategy == "optimal":
+        # Maximum total score under the same caps (min-cost flow)
+        return select_optimal(sm, max_tasks, max_per_object)
+    # Greedy, with "diversity" from the per-sensor and per-object caps
+    return select_greedy(sm, max_tasks, max_per_object)
+
+
+def select_jobs(sm: ScoreMatrix, strategy: str, max_per_object: int, jobs: Sequence[SelectionJob]) -> List[List[Tuple[int, int]]]:
+    """Selection for several missions over one shared score matrix; picks index each job's own `sm.columns(cols)`."""
+    return [select_pairs(sm.columns(cols), strategy, max_tasks, max_per_object) for cols, max_tasks in jobs]
+
+
+@dataclass(frozen=True)
+class ObjectRef:
+    """All selection needs from a track."""
+    object_id: str
+
+
+def lean_tracks(ta: TrackArrays) -> TrackArrays:
+    """Track features with the models swapped for ObjectRefs, for pickling to workers."""
+    return replace(ta, tracks=[ObjectRef(t.object_id) for t in ta.tracks])
+
+
+def selection_view(sm: ScoreMatrix) -> ScoreMatrix:
+    """`sm` without track models and score components, which is what gets pickled to workers."""
+    return ScoreMatrix(tracks=lean_tracks(sm.tracks), sensors=sm.sensors, total=sm.total, components={})
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def pool() -> Optional[ProcessPoolExecutor]:
+    """Shared worker processes, started on first use; None when PLAN_BATCH_WORKERS <= 1."""
+    global _pool
+    if PLAN_BATCH_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the parent runs threads (track snapshot, explanations) that fork would copy mid-flight
+            _pool = ProcessPoolExecutor(max_workers=PLAN_BATCH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def run_chunked(fn: Callable[..., List[Any]], shared: tuple, items: Sequence[Any]) -> List[Any]:
+    """
+    fn(*shared, chunk) over `items` split into one chunk per worker, so `shared`
+    is pickled once per chunk rather than once per item. Results come back in
+    item order. Runs inline for a single item or without a pool.
+    """
+    items = list(items)
+    workers = pool()
+    if workers is None or len(items) < 2:
+        return fn(*shared, items)
+
+    n_chunks = min(PLAN_BATCH_WORKERS, len(items))
+    futures = [workers.submit(fn, *shared, items[i::n_chunks]) for i in range(n_chunks)]
+    results: List[Any] = [None] * len(items)
+    for i, fut in enumerate(futures):
+        for j, out in enumerate(fut.result()):
+            results[i + j * n_chunks] = out
+    return results
+
+
+def run_selection(sm: ScoreMatrix, strategy: str, max_per_object: int, jobs: Sequence[SelectionJob]) -> List[List[Tuple[int, int]]]:
+    if pool() is None or len(jobs) < 2:
+        return select_jobs(sm, strategy, max_per_object, jobs)
+    return run_chunked(select_jobs, (selection_view(sm), strategy, max_per_object), jobs)
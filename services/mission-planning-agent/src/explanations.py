@@ -0,0 +1,115 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .llm import LLM
+
+
+EXPLAIN_WORKERS = int(os.getenv("LLM_EXPLAIN_WORKERS", "2"))
+EXPLAIN_CACHE_SIZE = int(os.getenv("LLM_EXPLAIN_CACHE_SIZE", "1024"))
+PLAN_ID_CACHE_SIZE = int(os.getenv("PLAN_ID_CACHE_SIZE", "10000"))
+
+
+def explanation_key(mission_id: str, operator_intent: Optional[str], tasks: List[Dict]) -> str:
+    """Hash of what the explanation depends on; scores are rounded so recency drift doesn't miss the cache."""
+    basis = {
+        "mission_id": mission_id,
+        "intent": operator_intent or "",
+        "tasks": [(t["object_id"], t["sensor_id"], round(float(t["score"]), 3)) for t in tasks],
+    }
+    return hashlib.sha256(json.dumps(basis, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class Explanation:
+    status: str = "pending"  # pending | ready | failed
+    text: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    done: threading.Event = field(default_factory=threading.Event)
+    # Called from the worker thread once done; how waiting requests on the event loop are woken
+    callbacks: List[Callable[[], None]] = field(default_factory=list)
+
+
+class ExplanationStore:
+    """
+    Background LLM explanations, cached by explanation_key and addressable by plan_id.
+    Identical plans share one LLM call, including while it is still in flight.
+    """
+
+    def __init__(self, llm: LLM, workers: int = EXPLAIN_WORKERS):
+        self.llm = llm
+        self._lock = threading.Lock()
+        self._by_key: "OrderedDict[str, Explanation]" = OrderedDict()
+        self._plans: "OrderedDict[str, str]" = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="explain")
+
+    def request(self, plan_id: str, mission_id: str, operator_intent: Optional[str], tasks: List[Dict]) -> Explanation:
+        key = explanation_key(mission_id, operator_intent, tasks)
+        with self._lock:
+            self._plans[plan_id] = key
+            if len(self._plans) > PLAN_ID_CACHE_SIZE:
+                self._plans.popitem(last=False)
+
+            entry = self._by_key.get(key)
+            # Failures are retried by the next identical plan
+            if entry is not None and entry.status != "failed":
+                self._by_key.move_to_end(key)
+                return entry
+            entry = self._by_key[key] = Explanation()
+            if len(self._by_key) > EXPLAIN_CACHE_SIZE:
+                self._by_key.popitem(last=False)
+
+        self._pool.submit(self._generate, entry, mission_id, operator_intent, tasks)
+        return entry
+
+    def _generate(self, entry: Explanation, mission_id: str, operator_intent: Optional[str], tasks: List[Dict]) -> None:
+        try:
+            text = self.llm.explain_plan(mission_id, operator_intent, tasks)
+            if text:
+                entry.text, entry.status = text, "ready"
+            else:
+                entry.error, entry.status = "empty response", "failed"
+        except Exception as e:
+            entry.error, entry.status = str(e), "failed"
+        finally:
+            with self._lock:
+                entry.done.set()
+                callbacks, entry.callbacks = entry.callbacks, []
+            for cb in callbacks:
+                cb()
+
+    def get(self, plan_id: str) -> Optional[Explanation]:
+        with self._lock:
+            key = self._plans.get(plan_id)
+            return self._by_key.get(key) if key else None
+
+    async def wait(self, plan_id: str, wait_s: float) -> Optional[Explanation]:
+        """get(), but waits up to `wait_s` for a pending explanation on the event loop rather than in a thread."""
+        loop = asyncio.get_running_loop()
+        woken = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: woken.done() or woken.set_result(None))
+
+        with self._lock:
+            key = self._plans.get(plan_id)
+            entry = self._by_key.get(key) if key else None
+            if entry is None or wait_s <= 0 or entry.done.is_set():
+                return entry
+            entry.callbacks.append(wake)
+        try:
+            await asyncio.wait_for(woken, wait_s)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if wake in entry.callbacks:
+                    entry.callbacks.remove(wake)
+        return entry
@@ -11,6 +11,8 @@ class LLM:
         self.base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
         self.model = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
         self.max_tokens = int(os.getenv("LLM_MAX_TOKENS", "350"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+        self.session = requests.Session()
 
     def explain_plan(self, mission_id: str, operator_intent: Optional[str], tasks: List[Dict]) -> Optional[str]:
         if not self.enabled or not self.api_key:
@@ -34,7 +36,7 @@ class LLM:
         }
 
         headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
-        r = requests.post(f"{self.base_url}/chat/completions", json=payload, headers=headers, timeout=20)
+        r = self.session.post(f"{self.base_url}/chat/completions", json=payload, headers=headers, timeout=self.timeout)
         r.raise_for_status()
         data = r.json()
         return data["choices"][0]["message"]["content"].strip()
@@ -1,26 +1,54 @@
 from __future__ import annotations
 import os
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, HTTPException
 from dotenv import load_dotenv
 
-from .models import MissionRequest, PlanResponse
-from .policy import load_policy
-from .planner import build_plan
-
+# Before the package imports: several modules read their settings at import time
 load_dotenv()
 
+from sentinel_common.auth import verify_bearer
+from sentinel_common.profiling import debug_router
+
+from .models import (
+    BatchPlanRequest,
+    BatchPlanResponse,
+    ExplanationResponse,
+    MissionRequest,
+    PlanResponse,
+    WhatIfRequest,
+    WhatIfResponse,
+)
+from .policy import get_policy, policy_status
+from .planner import build_batch, build_plan, explanations, visibility
+from .tools.track_api import snapshot_cache, track_snapshot
+from . import batch, whatif
+
+
 app = FastAPI(title="Mission Planning Agent", version="1.0")
+app.include_router(debug_router(verify_bearer))
+
+
+@app.on_event("startup")
+def startup():
+    if os.getenv("TRACK_CACHE_BACKGROUND", "true").lower() == "true":
+        snapshot_cache.start()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    snapshot_cache.stop()
+    batch.shutdown()
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "track_snapshot": snapshot_cache.status(), "visibility": visibility.status()}
 
 
 @app.get("/policy")
-def get_policy():
-    path = os.getenv("POLICY_PATH", "config/policy.yaml")
-    pol = load_policy(path)
+def policy_info():
+    pol = get_policy()
     return {
         "policy_version": pol.policy_version,
         "hard_constraints": pol.hard_constraints,
@@ -28,14 +56,58 @@ def get_policy():
         "priority_rules": pol.priority_rules,
         "tie_break": pol.tie_break,
         "sensor_count": len(pol.sensors),
+        "policy_hash": pol.source_hash,
+        **policy_status(),
     }
 
 
+@app.post("/policy/whatif", response_model=WhatIfResponse)
+def policy_whatif(req: WhatIfRequest):
+    """Plan metrics for policy variants against the current track snapshot; nothing is applied."""
+    pol = get_policy()
+    variants = [whatif.Variant("base", {})] if req.include_base else []
+    variants += [whatif.Variant(v.name or f"variant-{i}", v.overrides) for i, v in enumerate(req.variants)]
+    variants += whatif.expand_sweep(req.sweep)
+    if not variants:
+        raise HTTPException(status_code=400, detail="No variants: pass variants or sweep, or include_base")
+    if len(variants) > whatif.WHATIF_MAX_VARIANTS:
+        raise HTTPException(status_code=413, detail=f"At most {whatif.WHATIF_MAX_VARIANTS} variants per request")
+
+    tracks = track_snapshot()
+    start = time.perf_counter()
+    low = req.low_confidence if req.low_confidence is not None else whatif.WHATIF_LOW_CONFIDENCE
+    results = whatif.simulate(pol, tracks, variants, req.mission, low)
+    return WhatIfResponse(
+        policy_version=pol.policy_version,
+        policy_hash=pol.source_hash,
+        tracks=len(tracks),
+        elapsed_ms=round(1000 * (time.perf_counter() - start), 3),
+        results=results,
+    )
+
+
 @app.post("/plan", response_model=PlanResponse)
 def plan(req: MissionRequest):
     return build_plan(req)
 
 
+@app.post("/plan:batch", response_model=BatchPlanResponse)
+def plan_batch(req: BatchPlanRequest):
+    """One plan per mission, as /plan would return them, from a single track snapshot and scoring pass."""
+    if len(req.missions) > batch.PLAN_BATCH_MAX_MISSIONS:
+        raise HTTPException(status_code=413, detail=f"At most {batch.PLAN_BATCH_MAX_MISSIONS} missions per batch")
+    return BatchPlanResponse(plans=build_batch(req.missions))
+
+
+@app.get("/plan/{plan_id}/explanation", response_model=ExplanationResponse)
+async def plan_explanation(plan_id: str, wait: float = 0.0):
+    """Explanation for a plan; `wait` long-polls up to that many seconds (max 30) while it is pending."""
+    expl = await explanations.wait(plan_id, max(0.0, min(wait, 30.0)))
+    if expl is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired plan_id")
+    return ExplanationResponse(plan_id=plan_id, status=expl.status, explanation=expl.text, error=expl.error)
+
+
 def run():
     import uvicorn
     port = int(os.getenv("PORT", "9000"))
@@ -0,0 +1,161 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+from .models import Track
+from .policy import HardConstraints, PriorityRule, SensorDef
+from .util import now_utc, parse_time
+
+
+# Score components in the order they are summed
+COMPONENTS = ("mission_priority", "confidence", "recency", "geometry", "diversity")
+
+
+@dataclass
+class TrackArrays:
+    tracks: Sequence[Track]
+    z_km: np.ndarray
+    confidence: np.ndarray
+    age_s: np.ndarray  # seconds since updated_at, may be negative for clock skew
+
+    @classmethod
+    def from_tracks(cls, tracks: Sequence[Track], now: Optional[float] = None) -> "TrackArrays":
+        now_ts = now if now is not None else now_utc().timestamp()
+        n = len(tracks)
+        z = np.empty(n)
+        conf = np.empty(n)
+        age = np.empty(n)
+        # parse_time once per track, not once per (track, sensor) pair
+        for i, t in enumerate(tracks):
+            z[i] = t.state.z_km
+            conf[i] = t.confidence
+            age[i] = now_ts - parse_time(t.updated_at).timestamp()
+        return cls(tracks=tracks, z_km=z, confidence=conf, age_s=age)
+
+
+@dataclass
+class SensorArrays:
+    sensors: Sequence[SensorDef]
+    allowed: np.ndarray   # bool, passes sensor-level hard constraints
+    capacity: np.ndarray  # int, tasks this sensor may take in one plan
+
+    @classmethod
+    def from_sensors(cls, sensors: Sequence[SensorDef], hard: HardConstraints) -> "SensorArrays":
+        allowed = np.array(
+            [s.is_available and (not hard.allowed_sensor_types or s.sensor_type in hard.allowed_sensor_types) for s in sensors],
+            dtype=bool,
+        )
+        capacity = np.array([min(s.max_tasks, hard.max_tasks_per_sensor) for s in sensors], dtype=np.int64)
+        return cls(sensors=sensors, allowed=allowed, capacity=capacity)
+
+
+@dataclass
+class ScoreMatrix:
+    tracks: TrackArrays
+    sensors: SensorArrays
+    total: np.ndarray                  # (T, S) weighted score, -inf where a hard constraint fails
+    components: Dict[str, np.ndarray]  # name -> (T,) or (T, S) unweighted component
+
+    def columns(self, cols: Sequence[int]) -> "ScoreMatrix":
+        """The same scores restricted to a subset of sensors (column order as given)."""
+        idx = np.asarray(cols, dtype=np.int64)
+        sa = SensorArrays(
+            sensors=[self.sensors.sensors[i] for i in idx],
+            allowed=self.sensors.allowed[idx],
+            capacity=self.sensors.capacity[idx],
+        )
+        components = {k: (c[:, idx] if c.ndim == 2 else c) for k, c in self.components.items()}
+        return ScoreMatrix(tracks=self.tracks, sensors=sa, total=self.total[:, idx], components=components)
+
+    def breakdown(self, ti: int, si: int) -> Dict[str, float]:
+        out = {}
+        for name in COMPONENTS:
+            c = self.components[name]
+            out[name] = float(c[ti, si] if c.ndim == 2 else c[ti])
+        return out
+
+
+def priority_boosts(ta: TrackArrays, rules: List[PriorityRule]) -> np.ndarray:
+    boost = np.zeros(len(ta.tracks))
+    age_min = ta.age_s / 60.0
+    for rule in rules:
+        m = np.ones(len(ta.tracks), dtype=bool)
+        if rule.z_km_min is not None:
+            m &= ta.z_km >= rule.z_km_min
+        if rule.confidence_max is not None:
+            m &= ta.confidence <= rule.confidence_max
+        if rule.updated_within_min is not None:
+            m &= age_min <= rule.updated_within_min
+        boost += np.where(m, rule.boost, 0.0)
+    return np.clip(boost, 0.0, 0.40)
+
+
+def track_feasible(ta: TrackArrays, hard: HardConstraints) -> np.ndarray:
+    return (ta.confidence >= hard.min_track_confidence) & (ta.z_km >= hard.no_task_z_km_below)
+
+
+def score_matrix(
+    ta: TrackArrays,
+    sa: SensorArrays,
+    rules: List[PriorityRule],
+    weights: Dict[str, float],
+    hard: HardConstraints,
+    horizon_min: int,
+    geometry: Optional[np.ndarray] = None,
+    access: Optional[np.ndarray] = None,
+) -> ScoreMatrix:
+    """
+    Hard constraints, priority boost and weighted score for every (track, sensor) pair.
+    `geometry` and `access` are (T, S) from the visibility engine; without them geometry stays neutral.
+    """
+    n_t, n_s = len(ta.tracks), len(sa.sensors)
+    age = np.maximum(ta.age_s, 0.0)
+    components = {
+        "mission_priority": np.clip(0.50 + priority_boosts(ta, rules), 0.0, 1.0),
+        "confidence": np.clip(ta.confidence, 0.0, 1.0),
+        "recency": 1.0 - np.minimum(age / max(horizon_min * 60, 1), 1.0),
+        "geometry": geometry if geometry is not None else np.full(n_t, 0.5),
+        "diversity": np.full(n_t, 0.5),  # handled at selection time, keep neutral here
+    }
+
+    per_track = np.zeros(n_t)
+    for name in COMPONENTS:
+        if name != "geometry":
+            per_track = per_track + weights[name] * components[name]
+    # Geometry is added last either way, so a neutral 0.5 column scores bit-for-bit like a scalar 0.5
+    pair = per_track[:, None] + weights["geometry"] * (geometry if geometry is not None else 0.5)
+
+    feasible = np.outer(track_feasible(ta, hard), sa.allowed)
+    if hard.require_visibility and access is not None:
+        feasible &= access
+    total = np.where(feasible, pair, -np.inf) if n_s else np.empty((n_t, 0))
+    return ScoreMatrix(tracks=ta, sensors=sa, total=total, components=components)
+
+
+def select_greedy(sm: ScoreMatrix, max_tasks: int, max_per_object: int) -> List[tuple[int, int]]:
+    """
+    Highest score first under per-sensor capacity and per-object limits.
+    Ties keep (track, sensor) input order, as the sort over candidate models did.
+    Only feasible cells are sorted, and the walk stops as soon as max_tasks are chosen.
+    """
+    flat = sm.total.ravel()
+    cells = np.flatnonzero(np.isfinite(flat))
+    order = cells[np.argsort(-flat[cells], kind="stable")]
+
+    n_s = sm.total.shape[1]
+    sensor_left = sm.sensors.capacity.copy()
+    tracks = sm.tracks.tracks
+    object_counts: Dict[str, int] = {}
+    picked: List[tuple[int, int]] = []
+    for cell in order:
+        if len(picked) >= max_tasks:
+            break
+        ti, si = divmod(int(cell), n_s)
+        oid = tracks[ti].object_id
+        if sensor_left[si] <= 0 or object_counts.get(oid, 0) >= max_per_object:
+            continue
+        picked.append((ti, si))
+        sensor_left[si] -= 1
+        object_counts[oid] = object_counts.get(oid, 0) + 1
+    return picked
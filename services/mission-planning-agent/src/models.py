@@ -1,6 +1,6 @@
 from __future__ import annotations
-from typing import Dict, List, Optional
-from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from pydantic import AliasChoices, BaseModel, Field
 
 
 class TrackState(BaseModel):
@@ -16,7 +16,8 @@ class Track(BaseModel):
     object_id: str
     state: TrackState
     confidence: float = Field(ge=0.0, le=1.0)
-    updated_at: str
+    # track-api serves this as "last_update"
+    updated_at: str = Field(validation_alias=AliasChoices("updated_at", "last_update"))
 
 
 class MissionRequest(BaseModel):
@@ -27,6 +28,10 @@ class MissionRequest(BaseModel):
     preferred_sensors: Optional[List[str]] = None
 
 
+class BatchPlanRequest(BaseModel):
+    missions: List[MissionRequest] = Field(min_length=1)
+
+
 class ConstraintResult(BaseModel):
     passed: bool
     reasons: List[str] = Field(default_factory=list)
@@ -42,6 +47,8 @@ class TaskRecommendation(BaseModel):
     score_breakdown: Dict[str, float] = Field(default_factory=dict)
     constraints: ConstraintResult
     rationale: Optional[str] = None
+    # UTC start/end of each period the sensor can see the object within the horizon (sensors with a site only)
+    access_windows: List[Dict[str, str]] = Field(default_factory=list)
 
 
 class PlanResponse(BaseModel):
@@ -50,3 +57,55 @@ class PlanResponse(BaseModel):
     tasks: List[TaskRecommendation]
     notes: List[str] = Field(default_factory=list)
     llm_used: bool = False
+    plan_id: Optional[str] = None
+    # disabled | pending | ready | failed; fetch pending ones from GET /plan/{plan_id}/explanation
+    explanation_status: str = "disabled"
+
+
+class BatchPlanResponse(BaseModel):
+    plans: List[PlanResponse]
+
+
+class ExplanationResponse(BaseModel):
+    plan_id: str
+    status: str
+    explanation: Optional[str] = None
+    error: Optional[str] = None
+
+
+class PolicyVariant(BaseModel):
+    name: Optional[str] = None
+    # Deep-merged into the current policy document; lists replace
+    overrides: Dict[str, Any] = Field(default_factory=dict)
+
+
+class WhatIfRequest(BaseModel):
+    variants: List[PolicyVariant] = Field(default_factory=list)
+    # Dotted policy path -> values; every combination becomes a variant
+    sweep: Dict[str, List[Any]] = Field(default_factory=dict)
+    # Horizon, max_tasks and preferred_sensors for every variant; default: each variant's mission_defaults
+    mission: Optional[MissionRequest] = None
+    low_confidence: Optional[float] = None
+    include_base: bool = True
+
+
+class VariantResult(BaseModel):
+    name: str
+    error: Optional[str] = None
+    tasks: int = 0
+    objects_tasked: int = 0
+    feasible_objects: int = 0
+    coverage: float = 0.0
+    mean_score: float = 0.0
+    total_score: float = 0.0
+    sensor_utilization: Dict[str, float] = Field(default_factory=dict)
+    utilization: float = 0.0
+    low_confidence_revisits: int = 0
+
+
+class WhatIfResponse(BaseModel):
+    policy_version: str
+    policy_hash: str
+    tracks: int
+    elapsed_ms: float
+    results: List[VariantResult]
@@ -1,97 +1,120 @@
 from __future__ import annotations
-from typing import Dict, List
-import os
-
-from .models import MissionRequest, PlanResponse, TaskRecommendation, ConstraintResult
-from .policy import load_policy, SensorDef
-from .tools.track_api import fetch_tracks
-from .rules_engine import check_constraints, priority_boost, score
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import uuid
+
+from .models import MissionRequest, PlanResponse, TaskRecommendation, ConstraintResult, Track
+from .policy import get_policy, Policy, SensorDef
+from .tools.track_api import track_snapshot
+from .matrix import ScoreMatrix, SensorArrays, TrackArrays, score_matrix
+from .batch import run_selection, select_pairs
 from .llm import LLM
+from .explanations import ExplanationStore
+from .visibility import VisibilityEngine
+from .util import now_utc
 
 
-def build_plan(req: MissionRequest) -> PlanResponse:
-    policy_path = os.getenv("POLICY_PATH", "config/policy.yaml")
-    pol = load_policy(policy_path)
+@dataclass
+class PlanInputs:
+    policy: Policy
+    tracks: Sequence[Track]
+    sensors: List[SensorDef]
+    horizon_min: int
+    max_tasks: int
+    now: float
 
+
+def prepare(req: MissionRequest, pol: Policy, tracks: Sequence[Track], now: Optional[float] = None) -> PlanInputs:
     horizon = int(req.time_horizon_min or pol.mission_defaults.get("time_horizon_min", 30))
     max_tasks = int(req.max_tasks or pol.mission_defaults.get("max_tasks", 5))
 
-    tracks = fetch_tracks(limit=150)
     sensors = pol.sensors
-
     if req.preferred_sensors:
         allowed = set(req.preferred_sensors)
         sensors = [s for s in sensors if s.sensor_id in allowed]
 
-    weights = pol.scoring.get("weights", {})
-    hard = pol.hard_constraints
+    return PlanInputs(policy=pol, tracks=tracks, sensors=sensors, horizon_min=horizon, max_tasks=max_tasks, now=now if now is not None else now_utc().timestamp())
 
-    sensor_counts: Dict[str, int] = {s.sensor_id: 0 for s in sensors}
-    object_counts: Dict[str, int] = {}
 
-    candidates: List[TaskRecommendation] = []
+visibility = VisibilityEngine()
 
-    for t in tracks:
-        pboost = priority_boost(t, pol.priority_rules)
 
-        for s in sensors:
-            if sensor_counts[s.sensor_id] >= min(s.max_tasks, int(hard.get("max_tasks_per_sensor", 3))):
-                continue
+def sensor_columns(inp: PlanInputs) -> List[int]:
+    """Index of each planned sensor in the inventory-wide score matrix."""
+    index = {s.sensor_id: i for i, s in enumerate(inp.policy.sensors)}
+    return [index[s.sensor_id] for s in inp.sensors]
 
-            if object_counts.get(t.object_id, 0) >= int(hard.get("max_tasks_per_object", 1)):
-                continue
 
-            cr = check_constraints(t, s, hard)
-            if not cr.passed:
-                continue
+def score_inventory(pol: Policy, tracks: Sequence[Track], now: float, horizon_min: int) -> ScoreMatrix:
+    """Scores against every sensor in the inventory; missions take their columns from this."""
+    ta = TrackArrays.from_tracks(tracks, now)
+    sa = SensorArrays.from_sensors(pol.sensors, pol.constraints)
+    geometry = access = None
+    if any(s.site is not None for s in pol.sensors):
+        geometry, access = visibility.lookup(tracks, pol.sensors, now, horizon_min * 60)
+    return score_matrix(ta, sa, pol.rules, pol.weights, pol.constraints, horizon_min, geometry, access)
 
-            sc, breakdown = score(t, pboost, weights, horizon)
 
-            candidates.append(
-                TaskRecommendation(
-                    task_id=f"task-{s.sensor_id}-{t.object_id}",
-                    object_id=t.object_id,
-                    sensor_id=s.sensor_id,
-                    sensor_type=s.sensor_type,
-                    score=sc,
-                    score_breakdown=breakdown,
-                    constraints=cr,
-                )
-            )
+def score_candidates(inp: PlanInputs) -> ScoreMatrix:
+    return score_inventory(inp.policy, inp.tracks, inp.now, inp.horizon_min).columns(sensor_columns(inp))
+
+
+def select(inp: PlanInputs, sm: ScoreMatrix) -> List[tuple[int, int]]:
+    pol = inp.policy
+    return select_pairs(sm, pol.selection_strategy, inp.max_tasks, pol.constraints.max_tasks_per_object)
+
 
-    candidates.sort(key=lambda x: x.score, reverse=True)
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
 
-    # Selection step adds "diversity" by avoiding too many tasks on same sensor
-    selected: List[TaskRecommendation] = []
-    for c in candidates:
-        if len(selected) >= max_tasks:
-            break
 
-        if sensor_counts.get(c.sensor_id, 0) >= min(
-            next((s.max_tasks for s in sensors if s.sensor_id == c.sensor_id), 3),
-            int(hard.get("max_tasks_per_sensor", 3)),
-        ):
-            continue
+def access_windows(inp: PlanInputs, t: Track, column: int) -> List[Dict[str, str]]:
+    windows = visibility.windows(t, column, inp.now, inp.horizon_min * 60)
+    return [{"start": _iso(a), "end": _iso(b)} for a, b in windows]
 
-        if object_counts.get(c.object_id, 0) >= int(hard.get("max_tasks_per_object", 1)):
-            continue
 
-        selected.append(c)
-        sensor_counts[c.sensor_id] = sensor_counts.get(c.sensor_id, 0) + 1
-        object_counts[c.object_id] = object_counts.get(c.object_id, 0) + 1
+def finalize(inp: PlanInputs, sm: ScoreMatrix, picked: List[tuple[int, int]]) -> List[TaskRecommendation]:
+    """Model objects only for the selected (track, sensor) pairs."""
+    cols = sensor_columns(inp)
+    out: List[TaskRecommendation] = []
+    for ti, si in picked:
+        t = sm.tracks.tracks[ti]
+        s = sm.sensors.sensors[si]
+        out.append(
+            TaskRecommendation(
+                task_id=f"task-{s.sensor_id}-{t.object_id}",
+                object_id=t.object_id,
+                sensor_id=s.sensor_id,
+                sensor_type=s.sensor_type,
+                score=float(sm.total[ti, si]),
+                score_breakdown=sm.breakdown(ti, si),
+                constraints=ConstraintResult(passed=True),
+                access_windows=access_windows(inp, t, cols[si]) if s.site is not None else [],
+            )
+        )
+    return out
+
+
+llm = LLM()
+explanations = ExplanationStore(llm)
+
 
+def respond(req: MissionRequest, pol: Policy, selected: List[TaskRecommendation]) -> PlanResponse:
+    plan_id = uuid.uuid4().hex
     notes: List[str] = []
-    llm = LLM()
     llm_used = False
-
-    if llm.enabled and selected:
-        try:
-            expl = llm.explain_plan(req.mission_id, req.operator_intent, [x.model_dump() for x in selected])
-            if expl:
-                notes.append(expl)
-                llm_used = True
-        except Exception:
-            notes.append("LLM explanation unavailable; returned deterministic results only.")
+    status = "disabled"
+
+    if llm.enabled and llm.api_key and selected:
+        # Never wait on the LLM: a cached explanation is inlined, otherwise it is generated in the background
+        expl = explanations.request(plan_id, req.mission_id, req.operator_intent, [x.model_dump() for x in selected])
+        status = expl.status
+        if expl.status == "ready":
+            notes.append(expl.text)
+            llm_used = True
+        else:
+            notes.append(f"LLM explanation pending; fetch GET /plan/{plan_id}/explanation.")
 
     if not selected:
         notes.append("No valid task recommendations. Check track availability and policy constraints.")
@@ -102,4 +125,44 @@ def build_plan(req: MissionRequest) -> PlanResponse:
         tasks=selected,
         notes=notes,
         llm_used=llm_used,
+        plan_id=plan_id,
+        explanation_status=status,
     )
+
+
+def build_plan(req: MissionRequest) -> PlanResponse:
+    pol = get_policy()
+    inp = prepare(req, pol, track_snapshot())
+    sm = score_candidates(inp)
+    return respond(req, pol, finalize(inp, sm, select(inp, sm)))
+
+
+def build_batch(reqs: Sequence[MissionRequest]) -> List[PlanResponse]:
+    """
+    Same plans as build_plan per request, from one policy, one track snapshot and
+    one clock reading. Scoring runs once per distinct horizon; per-mission sensor
+    filtering and selection run in the worker pool.
+    """
+    pol = get_policy()
+    tracks = track_snapshot()
+    now = now_utc().timestamp()
+    inputs = [prepare(req, pol, tracks, now) for req in reqs]
+
+    shared: Dict[int, ScoreMatrix] = {}
+    for inp in inputs:
+        if inp.horizon_min not in shared:
+            shared[inp.horizon_min] = score_inventory(pol, tracks, now, inp.horizon_min)
+
+    picks: List[List[tuple[int, int]]] = [[] for _ in inputs]
+    per_object = pol.constraints.max_tasks_per_object
+    for horizon, sm in shared.items():
+        members = [i for i, inp in enumerate(inputs) if inp.horizon_min == horizon]
+        jobs = [(sensor_columns(inputs[i]), inputs[i].max_tasks) for i in members]
+        for i, picked in zip(members, run_selection(sm, pol.selection_strategy, per_object, jobs)):
+            picks[i] = picked
+
+    out: List[PlanResponse] = []
+    for req, inp, picked in zip(reqs, inputs, picks):
+        sm = shared[inp.horizon_min].columns(sensor_columns(inp))
+        out.append(respond(req, pol, finalize(inp, sm, picked)))
+    return out
@@ -1,9 +1,28 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import hashlib
+import os
+import threading
 import yaml
 
 
+class PolicyError(ValueError):
+    """Policy file is missing, unparsable or fails validation."""
+
+
+@dataclass(frozen=True)
+class SensorSite:
+    """Where a sensor looks from. Ground sites are fixed on the rotating Earth; space sensors fly a circular orbit."""
+    kind: str = "ground"  # ground | space
+    lat_deg: float = 0.0
+    lon_deg: float = 0.0
+    alt_km: float = 0.0
+    inc_deg: float = 0.0
+    min_elevation_deg: float = 10.0
+    max_range_km: float = 1e9
+
+
 @dataclass
 class SensorDef:
     sensor_id: str
@@ -11,6 +30,54 @@ class SensorDef:
     is_available: bool = True
     max_tasks: int = 3
     coverage_hint: Optional[str] = None
+    # None: geometry is not modelled for this sensor (neutral score, never blocked)
+    site: Optional[SensorSite] = None
+
+
+@dataclass(frozen=True)
+class PriorityRule:
+    """One `priority_rules` entry with its thresholds already converted to floats."""
+    name: str
+    boost: float
+    z_km_min: Optional[float] = None
+    confidence_max: Optional[float] = None
+    updated_within_min: Optional[float] = None
+
+    def matches(self, z_km: float, confidence: float, age_min: float) -> bool:
+        if self.z_km_min is not None and z_km < self.z_km_min:
+            return False
+        if self.confidence_max is not None and confidence > self.confidence_max:
+            return False
+        if self.updated_within_min is not None and age_min > self.updated_within_min:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class HardConstraints:
+    min_track_confidence: float = 0.0
+    allowed_sensor_types: FrozenSet[str] = frozenset()
+    max_tasks_per_sensor: int = 3
+    max_tasks_per_object: int = 1
+    no_task_z_km_below: float = -1e9
+    # Drop pairs whose sensor has no access to the track within the planning horizon
+    require_visibility: bool = False
+
+
+DEFAULT_WEIGHTS = {
+    "mission_priority": 0.35,
+    "confidence": 0.30,
+    "recency": 0.15,
+    "geometry": 0.10,
+    "diversity": 0.10,
+}
+
+SITE_KINDS = ("ground", "space")
+
+RULE_CONDITIONS = ("z_km_min", "confidence_max", "updated_within_min")
+
+# tie_break.strategy: "optimal" solves the assignment exactly; the others select greedily by score
+SELECTION_STRATEGIES = ("llm_then_rules", "greedy", "optimal")
 
 
 @dataclass
@@ -22,31 +89,222 @@ class Policy:
     priority_rules: List[Dict[str, Any]]
     tie_break: Dict[str, Any]
     sensors: List[SensorDef]
+    # Compiled forms used on the planning hot path
+    constraints: HardConstraints = field(default_factory=HardConstraints)
+    rules: List[PriorityRule] = field(default_factory=list)
+    weights: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_WEIGHTS))
+    selection_strategy: str = "llm_then_rules"
+    source_hash: str = ""
+    # The loaded document, for deriving variants (what-if simulation)
+    document: Dict[str, Any] = field(default_factory=dict)
 
 
-def load_policy(path: str) -> Policy:
-    with open(path, "r", encoding="utf-8") as f:
-        raw = yaml.safe_load(f)
+def _number(value: Any, where: str) -> float:
+    if isinstance(value, bool):
+        raise PolicyError(f"{where}: expected a number, got {value!r}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise PolicyError(f"{where}: expected a number, got {value!r}")
+
+
+def _mapping(value: Any, where: str) -> Dict[str, Any]:
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise PolicyError(f"{where}: expected a mapping")
+    return value
+
+
+def compile_constraints(hard: Dict[str, Any]) -> HardConstraints:
+    allowed = hard.get("allowed_sensor_types") or []
+    if not isinstance(allowed, list):
+        raise PolicyError("hard_constraints.allowed_sensor_types: expected a list")
+    d = HardConstraints()
+    return HardConstraints(
+        min_track_confidence=_number(hard.get("min_track_confidence", d.min_track_confidence), "hard_constraints.min_track_confidence"),
+        allowed_sensor_types=frozenset(str(t) for t in allowed),
+        max_tasks_per_sensor=int(_number(hard.get("max_tasks_per_sensor", d.max_tasks_per_sensor), "hard_constraints.max_tasks_per_sensor")),
+        max_tasks_per_object=int(_number(hard.get("max_tasks_per_object", d.max_tasks_per_object), "hard_constraints.max_tasks_per_object")),
+        no_task_z_km_below=_number(hard.get("no_task_z_km_below", d.no_task_z_km_below), "hard_constraints.no_task_z_km_below"),
+        require_visibility=bool(hard.get("require_visibility", d.require_visibility)),
+    )
+
+
+def compile_site(site: Any, where: str) -> Optional[SensorSite]:
+    if site is None:
+        return None
+    site = _mapping(site, where)
+    kind = str(site.get("kind", "ground"))
+    if kind not in SITE_KINDS:
+        raise PolicyError(f"{where}.kind: expected one of {list(SITE_KINDS)}, got {kind!r}")
+    d = SensorSite()
+    fields = ("lat_deg", "lon_deg", "alt_km", "inc_deg", "min_elevation_deg", "max_range_km")
+    values = {k: _number(site.get(k, getattr(d, k)), f"{where}.{k}") for k in fields}
+    if kind == "space" and values["alt_km"] <= 0:
+        raise PolicyError(f"{where}.alt_km: space sensors need an orbit altitude above 0")
+    return SensorSite(kind=kind, **values)
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[PriorityRule]:
+    if not isinstance(rules, list):
+        raise PolicyError("priority_rules: expected a list")
+    compiled = []
+    for i, rule in enumerate(rules):
+        where = f"priority_rules[{i}]"
+        rule = _mapping(rule, where)
+        when = _mapping(rule.get("when"), f"{where}.when")
+        unknown = set(when) - set(RULE_CONDITIONS)
+        if unknown:
+            raise PolicyError(f"{where}.when: unknown condition(s) {sorted(unknown)}")
+        cond = {k: _number(when[k], f"{where}.when.{k}") for k in RULE_CONDITIONS if when.get(k) is not None}
+        compiled.append(
+            PriorityRule(
+                name=str(rule.get("name", f"rule-{i}")),
+                boost=_number(rule.get("boost", 0.0), f"{where}.boost"),
+                **cond,
+            )
+        )
+    return compiled
+
+
+def compile_weights(scoring: Dict[str, Any]) -> Dict[str, float]:
+    raw = _mapping(scoring.get("weights"), "scoring.weights")
+    weights = dict(DEFAULT_WEIGHTS)
+    for k, v in raw.items():
+        weights[k] = _number(v, f"scoring.weights.{k}")
+    return weights
+
+
+def parse_policy(text: str, source_hash: str = "") -> Policy:
+    try:
+        raw = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise PolicyError(f"invalid YAML: {e}")
+    return build_policy(raw, source_hash)
+
+
+def build_policy(raw: Any, source_hash: str = "") -> Policy:
+    """Validated, compiled Policy from an already-loaded policy document."""
+    raw = _mapping(raw, "policy")
 
-    sensors_raw = raw.get("sensor_inventory", {}).get("sensors", [])
+    inventory = _mapping(raw.get("sensor_inventory"), "sensor_inventory")
+    sensors_raw = inventory.get("sensors") or []
+    if not isinstance(sensors_raw, list):
+        raise PolicyError("sensor_inventory.sensors: expected a list")
     sensors = []
-    for s in sensors_raw:
+    seen = set()
+    for i, s in enumerate(sensors_raw):
+        s = _mapping(s, f"sensor_inventory.sensors[{i}]")
+        if not s.get("sensor_id") or not s.get("sensor_type"):
+            raise PolicyError(f"sensor_inventory.sensors[{i}]: sensor_id and sensor_type are required")
+        if s["sensor_id"] in seen:
+            raise PolicyError(f"sensor_inventory.sensors[{i}]: duplicate sensor_id {s['sensor_id']!r}")
+        seen.add(s["sensor_id"])
         sensors.append(
             SensorDef(
                 sensor_id=s["sensor_id"],
                 sensor_type=s["sensor_type"],
                 is_available=bool(s.get("is_available", True)),
-                max_tasks=int(s.get("max_tasks", 3)),
+                max_tasks=int(_number(s.get("max_tasks", 3), f"sensor_inventory.sensors[{i}].max_tasks")),
                 coverage_hint=s.get("coverage_hint"),
+                site=compile_site(s.get("site"), f"sensor_inventory.sensors[{i}].site"),
             )
         )
 
+    hard = _mapping(raw.get("hard_constraints"), "hard_constraints")
+    scoring = _mapping(raw.get("scoring"), "scoring")
+    rules = raw.get("priority_rules") or []
+    tie_break = _mapping(raw.get("tie_break"), "tie_break")
+    strategy = str(tie_break.get("strategy", "llm_then_rules"))
+    if strategy not in SELECTION_STRATEGIES:
+        raise PolicyError(f"tie_break.strategy: expected one of {list(SELECTION_STRATEGIES)}, got {strategy!r}")
+
     return Policy(
         policy_version=str(raw.get("policy_version", "unknown")),
-        mission_defaults=raw.get("mission_defaults", {}),
-        hard_constraints=raw.get("hard_constraints", {}),
-        scoring=raw.get("scoring", {}),
-        priority_rules=raw.get("priority_rules", []),
-        tie_break=raw.get("tie_break", {}),
+        mission_defaults=_mapping(raw.get("mission_defaults"), "mission_defaults"),
+        hard_constraints=hard,
+        scoring=scoring,
+        priority_rules=rules,
+        tie_break=tie_break,
         sensors=sensors,
+        constraints=compile_constraints(hard),
+        rules=compile_rules(rules),
+        weights=compile_weights(scoring),
+        selection_strategy=strategy,
+        source_hash=source_hash,
+        document=raw,
     )
+
+
+def load_policy(path: str) -> Policy:
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise PolicyError(f"cannot read {path}: {e}")
+    return parse_policy(data.decode("utf-8"), hashlib.sha256(data).hexdigest())
+
+
+class PolicyCache:
+    """
+    Parsed policy per path, re-read only when the file's (mtime, size) changes and
+    re-parsed only when its content hash changes. A reload that fails validation
+    keeps serving the last good policy and records the error in `last_error`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Tuple[int, int], Policy]] = {}
+        self.last_error: Optional[str] = None
+
+    def get(self, path: str) -> Policy:
+        try:
+            st = os.stat(path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except OSError as e:
+            sig = None
+            err = PolicyError(f"cannot read {path}: {e}")
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == sig:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == sig:
+                return entry[1]
+            try:
+                if sig is None:
+                    raise err
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                if entry is not None and entry[1].source_hash == digest:
+                    pol = entry[1]  # touched but unchanged
+                else:
+                    pol = parse_policy(data.decode("utf-8"), digest)
+            except (OSError, UnicodeDecodeError, PolicyError) as e:
+                self.last_error = str(e)
+                if entry is None:
+                    raise e if isinstance(e, PolicyError) else PolicyError(str(e))
+                return entry[1]
+            self._entries[path] = (sig, pol)
+            self.last_error = None
+            return pol
+
+
+_cache = PolicyCache()
+
+
+def policy_path() -> str:
+    return os.getenv("POLICY_PATH", "config/policy.yaml")
+
+
+def get_policy(path: Optional[str] = None) -> Policy:
+    """Current policy from the process-wide cache."""
+    return _cache.get(path or policy_path())
+
+
+def policy_status() -> Dict[str, Any]:
+    return {"last_reload_error": _cache.last_error}
@@ -1,11 +1,9 @@
 from __future__ import annotations
 from typing import List, Optional
-from ..policy import SensorDef, load_policy
-import os
+from ..policy import SensorDef, get_policy
 
 def list_sensors(preferred: Optional[List[str]] = None) -> List[SensorDef]:
-    policy_path = os.getenv("POLICY_PATH", "config/policy.yaml")
-    pol = load_policy(policy_path)
+    pol = get_policy()
     sensors = pol.sensors
     if preferred:
         allowed = set(preferred)
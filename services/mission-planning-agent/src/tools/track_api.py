@@ -1,44 +1,203 @@
 from __future__ import annotations
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import math
 import os
+import threading
 import time
-import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 from ..models import Track
 
 
+TRACK_PAGE_SIZE = int(os.getenv("TRACK_PAGE_SIZE", "500"))
+TRACK_FETCH_CONCURRENCY = int(os.getenv("TRACK_FETCH_CONCURRENCY", "4"))
+# Tracks considered per plan; the snapshot holds this many
+PLAN_TRACK_LIMIT = int(os.getenv("PLAN_TRACK_LIMIT", "150"))
+TRACK_CACHE_TTL_SECONDS = float(os.getenv("TRACK_CACHE_TTL_SECONDS", "5"))
+# How long an old snapshot may still be served while track-api is failing
+TRACK_CACHE_MAX_STALE_SECONDS = float(os.getenv("TRACK_CACHE_MAX_STALE_SECONDS", "60"))
+TOKEN_TTL_SECONDS = 3600
+
+
+class TrackPage(BaseModel):
+    count: int = 0
+    total: Optional[int] = None
+    tracks: List[Track] = Field(default_factory=list)
+
+
+_page_adapter = TypeAdapter(TrackPage)
+
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max(1, TRACK_FETCH_CONCURRENCY)))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(1, TRACK_FETCH_CONCURRENCY)))
+
+_token_lock = threading.Lock()
+_token: Tuple[str, float] = ("", 0.0)
+
+
 def mint_service_token() -> str:
     secret = os.getenv("JWT_SECRET", "")
     if not secret:
         raise RuntimeError("JWT_SECRET not set (expected from secret-jwt)")
 
+    now = int(time.time())
     payload = {
         "sub": "mission-planning-agent",
+        "svc": "mission-planning-agent",
+        "iss": os.getenv("JWT_ISSUER", "sentinel-sda"),
         "role": "service",
-        "iat": int(time.time()),
-        "exp": int(time.time()) + 3600,
+        "iat": now,
+        "exp": now + TOKEN_TTL_SECONDS,
     }
-    return jwt.encode(payload, secret, algorithm="HS256")
-
+    import jwt
 
-def fetch_tracks(limit: int = 100) -> List[Track]:
-    base = os.getenv("TRACK_API_BASE", "http://track-api:8000").rstrip("/")
-    token = mint_service_token()
+    return jwt.encode(payload, secret, algorithm="HS256")
 
-    url = f"{base}/tracks?limit={limit}"
-    headers = {"Authorization": f"Bearer {token}"}
 
-    r = requests.get(url, headers=headers, timeout=10)
-    r.raise_for_status()
+def service_token() -> str:
+    """Cached service token, re-minted a minute before it expires."""
+    global _token
+    with _token_lock:
+        token, exp = _token
+        if not token or time.time() > exp - 60:
+            token = mint_service_token()
+            _token = (token, time.time() + TOKEN_TTL_SECONDS)
+        return token
 
-    data = r.json()
-    if isinstance(data, dict) and "tracks" in data:
-        data = data["tracks"]
 
+def _parse_page(resp: requests.Response) -> TrackPage:
+    try:
+        # One pass from JSON bytes into models
+        return _page_adapter.validate_json(resp.content)
+    except ValidationError:
+        pass
+    # Some tracks are malformed: keep the valid ones
+    data = resp.json()
+    items = data.get("tracks", []) if isinstance(data, dict) else data
     tracks: List[Track] = []
-    for item in data:
+    for item in items:
         try:
             tracks.append(Track.model_validate(item))
         except Exception:
             continue
-    return tracks
+    total = data.get("total") if isinstance(data, dict) else None
+    return TrackPage(count=len(tracks), total=total, tracks=tracks)
+
+
+def _get_page(base: str, limit: int, shard: int = 0, shards: int = 1) -> TrackPage:
+    params = {"limit": limit}
+    if shards > 1:
+        params.update(shard=shard, shards=shards)
+    r = _session.get(f"{base}/tracks", params=params, headers={"Authorization": f"Bearer {service_token()}"}, timeout=10)
+    r.raise_for_status()
+    return _parse_page(r)
+
+
+def fetch_tracks(limit: int = 100) -> List[Track]:
+    """
+    Up to `limit` tracks. One request when they fit in a page; otherwise the
+    catalogue is split into hash shards of about a page each and fetched concurrently.
+    """
+    base = os.getenv("TRACK_API_BASE", "http://track-api:8000").rstrip("/")
+    # Hash shards are uneven; size them for ~80% of a page so few are truncated. A power
+    # of two, so track-api serves each from its index buckets rather than filtering the index.
+    shards = 1 << max(0, math.ceil(math.log2(math.ceil(limit / (0.8 * TRACK_PAGE_SIZE)))))
+    page = min(limit, TRACK_PAGE_SIZE)
+    first = _get_page(base, page, 0, shards)
+    if shards == 1 or first.total is None or first.total <= len(first.tracks):
+        return first.tracks[:limit]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(TRACK_FETCH_CONCURRENCY, shards - 1))) as pool:
+        pages = [first] + list(pool.map(lambda i: _get_page(base, page, i, shards), range(1, shards)))
+    tracks = [t for p in pages for t in p.tracks]
+    return tracks[:limit]
+
+
+@dataclass
+class TrackSnapshot:
+    tracks: List[Track]
+    fetched_at: float
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class TrackSnapshotCache:
+    """
+    Shared track snapshot for all planning requests.
+
+    Readers get the current snapshot while it is younger than `ttl_s`. An expired
+    snapshot is refreshed by exactly one caller while the others wait for it,
+    and the optional background thread refreshes ahead of expiry so /plan
+    rarely waits at all. If track-api fails, a snapshot up to `max_stale_s`
+    old keeps being served.
+    """
+
+    def __init__(self, limit: int, ttl_s: float, max_stale_s: float):
+        self.limit = limit
+        self.ttl_s = ttl_s
+        self.max_stale_s = max_stale_s
+        self._snapshot: Optional[TrackSnapshot] = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    def _refresh(self) -> TrackSnapshot:
+        snap = TrackSnapshot(tracks=fetch_tracks(self.limit), fetched_at=time.time())
+        self._snapshot = snap
+        self.last_error = None
+        return snap
+
+    def get(self) -> TrackSnapshot:
+        snap = self._snapshot
+        if snap is not None and snap.age_s < self.ttl_s:
+            return snap
+        with self._refresh_lock:
+            # Someone else may have refreshed while we waited for the lock
+            snap = self._snapshot
+            if snap is not None and snap.age_s < self.ttl_s:
+                return snap
+            try:
+                return self._refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                if snap is not None and snap.age_s < self.max_stale_s:
+                    return snap
+                raise
+
+    def _run(self) -> None:
+        interval = max(0.5, 0.8 * self.ttl_s)
+        while not self._stop.wait(interval):
+            with self._refresh_lock:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    self.last_error = str(e)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="track-snapshot", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def status(self) -> dict:
+        snap = self._snapshot
+        return {
+            "tracks": len(snap.tracks) if snap else 0,
+            "age_s": round(snap.age_s, 3) if snap else None,
+            "last_error": self.last_error,
+        }
+
+
+snapshot_cache = TrackSnapshotCache(PLAN_TRACK_LIMIT, TRACK_CACHE_TTL_SECONDS, TRACK_CACHE_MAX_STALE_SECONDS)
+
+
+def track_snapshot() -> List[Track]:
+    return snapshot_cache.get().tracks
@@ -0,0 +1,266 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+import os
+import threading
+import numpy as np
+
+from .models import Track
+from .policy import SensorDef, SensorSite
+from .util import parse_time
+
+
+MU_EARTH = 398600.4418  # km^3/s^2
+EARTH_RADIUS_KM = 6378.137
+EARTH_ROT_RAD_S = 7.2921159e-5
+J2000_UNIX = 946728000.0
+GMST_J2000_RAD = 4.894961213
+
+VIS_STEP_SECONDS = float(os.getenv("VIS_STEP_SECONDS", "60"))
+# Each track's windows cover this far ahead of when they were computed; they are
+# recomputed once less than one planning horizon remains
+VIS_PRECOMPUTE_SECONDS = float(os.getenv("VIS_PRECOMPUTE_SECONDS", "7200"))
+
+
+def gmst(t: np.ndarray) -> np.ndarray:
+    return (GMST_J2000_RAD + EARTH_ROT_RAD_S * (t - J2000_UNIX)) % (2 * np.pi)
+
+
+def propagate(r0: np.ndarray, v0: np.ndarray, dt: np.ndarray) -> np.ndarray:
+    """
+    Two-body positions for N states at K offsets: r0, v0 (N, 3), dt (N, K) seconds -> (N, K, 3).
+    Unbound or degenerate states (hyperbolic, radial, inside the Earth) fall back to straight-line motion.
+    """
+    rmag = np.linalg.norm(r0, axis=1)
+    vmag2 = np.einsum("ij,ij->i", v0, v0)
+    h = np.cross(r0, v0)
+    hmag = np.linalg.norm(h, axis=1)
+    energy = vmag2 / 2 - MU_EARTH / np.maximum(rmag, 1e-9)
+    bound = (energy < -1e-9) & (hmag > 1e-6) & (rmag > EARTH_RADIUS_KM * 0.5)
+
+    out = r0[:, None, :] + v0[:, None, :] * dt[:, :, None]
+    if not bound.any():
+        return out
+
+    r, v, hh, rm = r0[bound], v0[bound], h[bound], rmag[bound]
+    a = -MU_EARTH / (2 * energy[bound])
+    evec = np.cross(v, hh) / MU_EARTH - r / rm[:, None]
+    e = np.linalg.norm(evec, axis=1)
+    ok = e < 0.99
+    # Perifocal basis; near-circular orbits measure from the epoch position instead of perigee
+    circ = e < 1e-8
+    P = np.where(circ[:, None], r / rm[:, None], evec / np.maximum(e, 1e-12)[:, None])
+    Q = np.cross(hh, P) / np.linalg.norm(hh, axis=1)[:, None]
+    e = np.where(circ, 0.0, e)
+
+    root = np.sqrt(np.maximum(1 - e**2, 0.0))
+    cos_nu = np.einsum("ij,ij->i", r, P) / rm
+    sin_nu = np.einsum("ij,ij->i", r, Q) / rm
+    E0 = np.arctan2(root * sin_nu, e + cos_nu)
+    M0 = E0 - e * np.sin(E0)
+    n = np.sqrt(MU_EARTH / a**3)
+
+    M = M0[:, None] + n[:, None] * dt[bound]
+    E = M.copy()
+    for _ in range(8):
+        E = E - (E - e[:, None] * np.sin(E) - M) / (1 - e[:, None] * np.cos(E))
+    xp = a[:, None] * (np.cos(E) - e[:, None])
+    yp = a[:, None] * root[:, None] * np.sin(E)
+    pos = xp[:, :, None] * P[:, None, :] + yp[:, :, None] * Q[:, None, :]
+
+    idx = np.flatnonzero(bound)[ok]
+    out[idx] = pos[ok]
+    return out
+
+
+def sensor_positions(site: SensorSite, t: np.ndarray) -> np.ndarray:
+    """Inertial sensor position at times t (..., ) -> (..., 3)."""
+    if site.kind == "space":
+        rs = EARTH_RADIUS_KM + site.alt_km
+        u = math.sqrt(MU_EARTH / rs**3) * (t - J2000_UNIX)
+        inc = math.radians(site.inc_deg)
+        return rs * np.stack([np.cos(u), np.sin(u) * math.cos(inc), np.sin(u) * math.sin(inc)], axis=-1)
+    lat = math.radians(site.lat_deg)
+    lon = math.radians(site.lon_deg) + gmst(t)
+    rs = EARTH_RADIUS_KM + site.alt_km
+    return rs * np.stack([math.cos(lat) * np.cos(lon), math.cos(lat) * np.sin(lon), np.full_like(t, math.sin(lat))], axis=-1)
+
+
+def visible(site: SensorSite, r: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Line of sight, look-angle and range limits for targets r (N, K, 3) at times t (K,) -> (N, K) bool."""
+    p = sensor_positions(site, t)[None, :, :]
+    rel = r - p
+    rng = np.linalg.norm(rel, axis=2)
+    ok = rng <= site.max_range_km
+    if site.kind == "space":
+        # Earth (plus 100 km of atmosphere) must not block the line of sight
+        d = rel / np.maximum(rng, 1e-9)[:, :, None]
+        along = np.clip(-np.einsum("nki,nki->nk", d, np.broadcast_to(p, d.shape)), 0.0, rng)
+        closest = np.linalg.norm(p + d * along[:, :, None], axis=2)
+        ok &= closest > EARTH_RADIUS_KM + 100.0
+    else:
+        up = p / np.linalg.norm(p, axis=2)[:, :, None]
+        sin_el = np.einsum("nki,nki->nk", rel, np.broadcast_to(up, rel.shape)) / np.maximum(rng, 1e-9)
+        ok &= sin_el >= math.sin(math.radians(site.min_elevation_deg))
+    return ok
+
+
+@dataclass
+class _Row:
+    row: int
+    t0: float  # time of sample 0
+
+
+class VisibilityEngine:
+    """
+    Access windows per (track, sensor) on a fixed time grid, cached per track.
+
+    Each track's samples cover VIS_PRECOMPUTE_SECONDS from when they were computed.
+    A track is re-propagated only when its state or update time changes, or when its
+    window runs short; everything else is a lookup into one (rows, sensors, samples)
+    array. Sensors without a `site` are treated as always able to see the track, with
+    a neutral geometry term. Illumination (optical night / sunlit target) is not modelled.
+    """
+
+    def __init__(self, step_s: float = VIS_STEP_SECONDS, precompute_s: float = VIS_PRECOMPUTE_SECONDS):
+        self.step_s = step_s
+        self.samples = max(2, int(precompute_s // step_s) + 1)
+        self._lock = threading.Lock()
+        self._sensor_sig: Tuple = ()
+        self._sites: List[Optional[SensorSite]] = []
+        # Keyed by object id plus state, so duplicate ids with different states don't share a row
+        self._rows: Dict[Tuple, _Row] = {}
+        self._latest: Dict[str, Tuple] = {}
+        self._masks = np.zeros((0, 0, self.samples), dtype=bool)
+        self._free: List[int] = []
+        self.recomputed = 0
+
+    def _reset(self, sensors: Sequence[SensorDef]) -> None:
+        self._sensor_sig = tuple((s.sensor_id, s.site) for s in sensors)
+        self._sites = [s.site for s in sensors]
+        self._rows = {}
+        self._latest = {}
+        self._free = []
+        self._masks = np.zeros((0, len(sensors), self.samples), dtype=bool)
+
+    def _alloc(self, n: int) -> List[int]:
+        rows = self._free[:n]
+        self._free = self._free[n:]
+        need = n - len(rows)
+        if need:
+            start = self._masks.shape[0]
+            grow = max(need, start // 2, 256)
+            self._masks = np.concatenate([self._masks, np.zeros((grow, self._masks.shape[1], self.samples), dtype=bool)])
+            rows += list(range(start, start + need))
+            self._free += list(range(start + need, start + grow))
+        return rows
+
+    def _compute(self, tracks: Sequence[Track], rows: List[int], t0: float) -> None:
+        r0 = np.array([[t.state.x_km, t.state.y_km, t.state.z_km] for t in tracks])
+        v0 = np.array([[t.state.vx_kms, t.state.vy_kms, t.state.vz_kms] for t in tracks])
+        epoch = np.array([parse_time(t.updated_at).timestamp() for t in tracks])
+        t = t0 + self.step_s * np.arange(self.samples)
+        pos = propagate(r0, v0, t[None, :] - epoch[:, None])
+        for si, site in enumerate(self._sites):
+            self._masks[rows, si, :] = True if site is None else visible(site, pos, t)
+        self.recomputed += len(tracks)
+
+    @staticmethod
+    def _key(t: Track) -> Tuple:
+        s = t.state
+        return (t.object_id, t.updated_at, s.x_km, s.y_km, s.z_km, s.vx_kms, s.vy_kms, s.vz_kms)
+
+    @property
+    def span_s(self) -> float:
+        return (self.samples - 1) * self.step_s
+
+    def _refresh(self, tracks: Sequence[Track], sensors: Sequence[SensorDef], grid_now: float, horizon_s: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Cache rows and sample offsets for `tracks`, recomputing only what changed or ran out of window. Caller holds the lock."""
+        span = self.span_s
+        if tuple((s.sensor_id, s.site) for s in sensors) != self._sensor_sig:
+            self._reset(sensors)
+
+        keys = [self._key(t) for t in tracks]
+        current = set(keys)
+        stale: Dict[Tuple, Track] = {}
+        for key, t in zip(keys, tracks):
+            entry = self._rows.get(key)
+            if entry is None or not entry.t0 <= grid_now <= entry.t0 + span - horizon_s:
+                stale[key] = t
+        if len(self._rows) > 2 * len(current) + 256:
+            # Objects that dropped out of the snapshot give their rows back
+            for key in [key for key in self._rows if key not in current]:
+                self._free.append(self._rows.pop(key).row)
+            self._latest = {key[0]: key for key in self._rows}
+        if stale:
+            for key in stale:
+                # A new state supersedes the object's previous one unless both are in this snapshot
+                prev = self._latest.get(key[0])
+                if prev is not None and prev != key and prev not in current and prev in self._rows:
+                    self._free.append(self._rows.pop(prev).row)
+                self._latest[key[0]] = key
+            new_rows = iter(self._alloc(sum(1 for key in stale if key not in self._rows)))
+            rows = []
+            for key in stale:
+                entry = self._rows.get(key)
+                row = entry.row if entry is not None else next(new_rows)
+                self._rows[key] = _Row(row, grid_now)
+                rows.append(row)
+            # One batched propagation for everything that changed
+            self._compute(list(stale.values()), rows, grid_now)
+
+        idx = np.array([self._rows[key].row for key in keys], dtype=np.int64)
+        t0 = np.array([self._rows[key].t0 for key in keys])
+        return idx, np.rint((grid_now - t0) / self.step_s).astype(np.int64)
+
+    def lookup(self, tracks: Sequence[Track], sensors: Sequence[SensorDef], now: float, horizon_s: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (T, S) geometry term and (T, S) any-access flag over [now, now + horizon].
+        Geometry is the fraction of the horizon the sensor has access, 0.5 for sensors without a site.
+        """
+        if not tracks or not sensors:
+            return np.zeros((len(tracks), len(sensors))), np.zeros((len(tracks), len(sensors)), dtype=bool)
+        grid_now = math.floor(now / self.step_s) * self.step_s
+        horizon_s = min(horizon_s, self.span_s)
+        k = int(horizon_s // self.step_s) + 1
+        with self._lock:
+            idx, offsets = self._refresh(tracks, sensors, grid_now, horizon_s)
+            cols = offsets[:, None] + np.arange(k)[None, :]
+            win = np.take_along_axis(self._masks[idx], cols[:, None, :], axis=2)
+        frac = win.mean(axis=2)
+        no_site = np.array([s.site is None for s in sensors])
+        geometry = np.where(no_site[None, :], 0.5, frac)
+        return geometry, win.any(axis=2)
+
+    def windows(self, track: Track, sensor_index: int, now: float, horizon_s: float) -> List[Tuple[float, float]]:
+        """Access windows (start, end unix seconds) for one cached pair, for reporting selected tasks."""
+        with self._lock:
+            entry = self._rows.get(self._key(track))
+            if entry is None or self._sites[sensor_index] is None:
+                return []
+            grid_now = math.floor(now / self.step_s) * self.step_s
+            off = int(round((grid_now - entry.t0) / self.step_s))
+            k = int(min(horizon_s, self.span_s) // self.step_s) + 1
+            mask = self._masks[entry.row, sensor_index, off:off + k].copy()
+        out: List[Tuple[float, float]] = []
+        start = None
+        for j, m in enumerate(mask):
+            if m and start is None:
+                start = j
+            elif not m and start is not None:
+                out.append((grid_now + start * self.step_s, grid_now + (j - 1) * self.step_s))
+                start = None
+        if start is not None:
+            out.append((grid_now + start * self.step_s, grid_now + (len(mask) - 1) * self.step_s))
+        return out
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "rows": len(self._rows),
+                "sensors_with_site": sum(1 for s in self._sites if s is not None),
+                "step_s": self.step_s,
+                "window_s": self.span_s,
+                "recomputed": self.recomputed,
+            }
@@ -0,0 +1,266 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import copy
+import itertools
+import json
+import os
+import time
+import numpy as np
+
+from .models import MissionRequest, Track
+from .policy import Policy, PolicyError, SensorDef, SensorSite, build_policy
+from .matrix import TrackArrays, SensorArrays, score_matrix
+from .batch import lean_tracks, run_chunked, select_pairs
+
+
+WHATIF_MAX_VARIANTS = int(os.getenv("WHATIF_MAX_VARIANTS", "1000"))
+# Tracks below this confidence count as low-confidence revisits (the policy's "Revisit low confidence tracks" threshold)
+WHATIF_LOW_CONFIDENCE = float(os.getenv("WHATIF_LOW_CONFIDENCE", "0.75"))
+
+SensorKey = Tuple[str, Optional[SensorSite]]
+
+
+@dataclass
+class Variant:
+    name: str
+    overrides: Dict[str, Any]
+
+
+def merge(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep merge of mappings; lists and scalars in `overrides` replace the base value."""
+    out = dict(base)
+    for k, v in overrides.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = merge(out[k], v)
+        else:
+            out[k] = copy.deepcopy(v)
+    return out
+
+
+def set_path(doc: Dict[str, Any], dotted: str, value: Any) -> None:
+    parts = dotted.split(".")
+    for p in parts[:-1]:
+        doc = doc.setdefault(p, {})
+    doc[parts[-1]] = value
+
+
+def expand_sweep(sweep: Dict[str, Sequence[Any]]) -> List[Variant]:
+    """Cartesian product of dotted-path values, e.g. {"scoring.weights.geometry": [0.1, 0.2]}."""
+    if not sweep:
+        return []
+    paths = list(sweep)
+    out = []
+    for values in itertools.product(*(sweep[p] for p in paths)):
+        overrides: Dict[str, Any] = {}
+        for path, value in zip(paths, values):
+            set_path(overrides, path, value)
+        out.append(Variant(name=",".join(f"{p}={json.dumps(v)}" for p, v in zip(paths, values)), overrides=overrides))
+    return out
+
+
+@dataclass
+class Job:
+    index: int
+    policy: Policy
+    horizon_min: int
+    max_tasks: int
+    sensors: List[SensorDef]
+
+
+@dataclass
+class Features:
+    """Everything variants share: per-track arrays and visibility per (horizon, sensor key)."""
+    tracks: TrackArrays
+    n_objects: int
+    keys: Dict[SensorKey, int]
+    geometry: Dict[int, np.ndarray]  # horizon_min -> (T, U)
+    access: Dict[int, np.ndarray]
+
+
+def sensor_key(s: SensorDef) -> SensorKey:
+    return (s.sensor_id, s.site)
+
+
+def precompute(tracks: Sequence[Track], jobs: Sequence[Job], now: float) -> Features:
+    """Track features once for all variants; visibility once per horizon over the union of their sited sensors."""
+    # /plan's engine, so what-if runs share its cached access windows and see the same ones
+    from .planner import visibility
+
+    ta = TrackArrays.from_tracks(tracks, now)
+    sited: Dict[SensorKey, SensorDef] = {}
+    for job in jobs:
+        for s in job.sensors:
+            if s.site is not None:
+                sited.setdefault(sensor_key(s), s)
+    keys = {k: i for i, k in enumerate(sited)}
+    geometry, access = {}, {}
+    for horizon in sorted({j.horizon_min for j in jobs}):
+        if sited:
+            geometry[horizon], access[horizon] = visibility.lookup(tracks, list(sited.values()), now, horizon * 60)
+    return Features(
+        tracks=lean_tracks(ta),
+        n_objects=len({t.object_id for t in tracks}),
+        keys=keys,
+        geometry=geometry,
+        access=access,
+    )
+
+
+def _geometry(feat: Features, sensors: Sequence[SensorDef], horizon: int) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    if not any(s.site is not None for s in sensors):
+        return None, None
+    n_t = len(feat.tracks.tracks)
+    geometry = np.full((n_t, len(sensors)), 0.5)
+    access = np.ones((n_t, len(sensors)), dtype=bool)
+    for j, s in enumerate(sensors):
+        if s.site is not None:
+            u = feat.keys[sensor_key(s)]
+            geometry[:, j] = feat.geometry[horizon][:, u]
+            access[:, j] = feat.access[horizon][:, u]
+    return geometry, access
+
+
+def evaluate(feat: Features, job: Job, low_confidence: float) -> Dict[str, Any]:
+    """Plan one variant and summarise it. Picks are the ones /plan would make under this policy."""
+    pol = job.policy
+    ta = feat.tracks
+    sa = SensorArrays.from_sensors(job.sensors, pol.constraints)
+    geometry, access = _geometry(feat, job.sensors, job.horizon_min)
+    sm = score_matrix(ta, sa, pol.rules, pol.weights, pol.constraints, job.horizon_min, geometry, access)
+    picks = select_pairs(sm, pol.selection_strategy, job.max_tasks, pol.constraints.max_tasks_per_object)
+
+    scores = np.array([sm.total[ti, si] for ti, si in picks])
+    feasible_rows = np.isfinite(sm.total).any(axis=1) if sm.total.size else np.zeros(len(ta.tracks), dtype=bool)
+    tasked = {ta.tracks[ti].object_id for ti, _ in picks}
+    per_sensor: Dict[str, int] = {s.sensor_id: 0 for s in job.sensors}
+    for _, si in picks:
+        per_sensor[job.sensors[si].sensor_id] += 1
+    capacity = {s.sensor_id: int(c) for s, c, ok in zip(job.sensors, sa.capacity, sa.allowed) if ok and c > 0}
+    return {
+        "tasks": len(picks),
+        "objects_tasked": len(tasked),
+        "feasible_objects": len({ta.tracks[i].object_id for i in np.flatnonzero(feasible_rows)}),
+        "coverage": len(tasked) / feat.n_objects if feat.n_objects else 0.0,
+        "mean_score": float(scores.mean()) if len(picks) else 0.0,
+        "total_score": float(scores.sum()),
+        "sensor_utilization": {sid: per_sensor[sid] / cap for sid, cap in capacity.items()},
+        "utilization": len(picks) / sum(capacity.values()) if capacity else 0.0,
+        "low_confidence_revisits": int(sum(1 for ti, _ in picks if ta.confidence[ti] < low_confidence)),
+    }
+
+
+def evaluate_chunk(feat: Features, low_confidence: float, jobs: Sequence[Job]) -> List[Dict[str, Any]]:
+    return [evaluate(feat, job, low_confidence) for job in jobs]
+
+
+def compile_variants(base: Policy, variants: Sequence[Variant]) -> List[Tuple[Variant, Optional[Policy], Optional[str]]]:
+    out = []
+    for v in variants:
+        try:
+            out.append((v, build_policy(merge(base.document, v.overrides), base.source_hash), None))
+        except PolicyError as e:
+            out.append((v, None, str(e)))
+    return out
+
+
+def simulate(
+    base: Policy,
+    tracks: Sequence[Track],
+    variants: Sequence[Variant],
+    mission: Optional[MissionRequest] = None,
+    low_confidence: float = WHATIF_LOW_CONFIDENCE,
+    now: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Metrics per variant against one frozen track snapshot, in variant order.
+    Variants that fail policy validation get an `error` instead of metrics.
+    Without `mission`, each variant plans with its own mission_defaults.
+    """
+    now = now if now is not None else time.time()
+    compiled = compile_variants(base, variants)
+    jobs: List[Job] = []
+    for i, (v, pol, _) in enumerate(compiled):
+        if pol is None:
+            continue
+        sensors = pol.sensors
+        if mission is not None and mission.preferred_sensors:
+            allowed = set(mission.preferred_sensors)
+            sensors = [s for s in sensors if s.sensor_id in allowed]
+        jobs.append(
+            Job(
+                index=i,
+                policy=pol,
+                horizon_min=int(mission.time_horizon_min if mission else pol.mission_defaults.get("time_horizon_min", 30)),
+                max_tasks=int(mission.max_tasks if mission else pol.mission_defaults.get("max_tasks", 5)),
+                sensors=sensors,
+            )
+        )
+
+    results: List[Dict[str, Any]] = [{"name": v.name, "error": err} for v, _, err in compiled]
+    if jobs:
+        feat = precompute(tracks, jobs, now)
+        for job, metrics in zip(jobs, run_chunked(evaluate_chunk, (feat, low_confidence), jobs)):
+            results[job.index].update(metrics)
+    return results
+
+
+def load_tracks(path: str) -> List[Track]:
+    """Tracks from a saved `GET /tracks` response (or a bare list of tracks)."""
+    with open(path) as f:
+        data = json.load(f)
+    items = data.get("tracks", []) if isinstance(data, dict) else data
+    return [Track.model_validate(t) for t in items]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    import yaml
+    from .policy import load_policy, policy_path
+
+    p = argparse.ArgumentParser(description="Evaluate policy variants against one track snapshot.")
+    p.add_argument("--policy", default=None, help="base policy (default POLICY_PATH)")
+    p.add_argument("--variants", default=None, help="YAML/JSON list of {name, overrides}")
+    p.add_argument("--sweep", action="append", default=[], metavar="PATH=V1,V2,...",
+                   help="dotted policy path and values to sweep, e.g. scoring.weights.geometry=0,0.1,0.2 (repeatable)")
+    p.add_argument("--tracks", default=None, help="saved GET /tracks response (default: fetch from TRACK_API_BASE)")
+    p.add_argument("--horizon-min", type=int, default=None)
+    p.add_argument("--max-tasks", type=int, default=None)
+    p.add_argument("--low-confidence", type=float, default=WHATIF_LOW_CONFIDENCE)
+    args = p.parse_args(argv)
+
+    base = load_policy(args.policy or policy_path())
+    variants = [Variant("base", {})]
+    if args.variants:
+        with open(args.variants) as f:
+            for i, v in enumerate(yaml.safe_load(f) or []):
+                variants.append(Variant(str(v.get("name", f"variant-{i}")), v.get("overrides") or {}))
+    sweep = {}
+    for item in args.sweep:
+        path, _, values = item.partition("=")
+        sweep[path] = [yaml.safe_load(x) for x in values.split(",")]
+    variants += expand_sweep(sweep)
+
+    if args.tracks:
+        tracks = load_tracks(args.tracks)
+    else:
+        from .tools.track_api import PLAN_TRACK_LIMIT, fetch_tracks
+        tracks = fetch_tracks(PLAN_TRACK_LIMIT)
+
+    mission = None
+    if args.horizon_min is not None or args.max_tasks is not None:
+        d = base.mission_defaults
+        mission = MissionRequest(
+            mission_id="whatif",
+            time_horizon_min=args.horizon_min or int(d.get("time_horizon_min", 30)),
+            max_tasks=args.max_tasks or int(d.get("max_tasks", 5)),
+        )
+
+    start = time.perf_counter()
+    results = simulate(base, tracks, variants, mission, args.low_confidence)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"tracks": len(tracks), "variants": len(variants), "elapsed_s": round(elapsed, 3), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Observation event generation shared by the single-sensor loop and the load generator.
+Every caller passes its own `random.Random`, so concurrent sensors never share or reseed RNG state.
+"""
+import random
+import time
+
+
+def now_iso() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def rand_object_id(rng: random.Random, object_pool: int) -> str:
+    return f"obj-{rng.randint(1, object_pool):03d}"
+
+
+def gen_measurement(rng: random.Random) -> dict:
+    return {
+        "x_km": rng.uniform(-20000, 20000),
+        "y_km": rng.uniform(-20000, 20000),
+        "z_km": rng.uniform(-20000, 20000),
+        "vx_kms": rng.uniform(-2.0, 2.0),
+        "vy_kms": rng.uniform(-2.0, 2.0),
+        "vz_kms": rng.uniform(-2.0, 2.0),
+    }
+
+
+def gen_quality(rng: random.Random) -> dict:
+    return {
+        "snr_db": round(rng.uniform(5, 25), 2),
+        "measurement_sigma": round(rng.uniform(0.1, 1.0), 2),
+    }
+
+
+def observed_event(sensor_id: str, sensor_type: str, seq: int, object_id: str, measurement: dict, quality: dict) -> dict:
+    return {
+        "event_id": f"evt-{sensor_id}-{int(time.time() * 1000)}-{seq}",
+        "sensor_id": sensor_id,
+        "sensor_type": sensor_type,
+        "timestamp": now_iso(),
+        "object_id": object_id,
+        "measurement": measurement,
+        "quality": quality,
+        "integrity": {"signed": True, "signature": "demo-signature"},
+    }
+
+
+def make_event(sensor_id: str, sensor_type: str, rng: random.Random, object_pool: int, seq: int) -> dict:
+    return observed_event(sensor_id, sensor_type, seq, rand_object_id(rng, object_pool), gen_measurement(rng), gen_quality(rng))
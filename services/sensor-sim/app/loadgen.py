@@ -0,0 +1,347 @@
+"""
+Asyncio load generator: N virtual sensors posting to the ingestion gateway.
+
+Open loop (default) fires each event at its scheduled time whether or not earlier
+requests have returned, and measures latency from that scheduled time, so a
+slow server shows up as latency instead of silently lowering the offered rate
+(coordinated omission). When `max_inflight` requests are outstanding, further
+sends are dropped and counted. Closed loop runs `concurrency` workers that each
+send, wait for the response, then send again, optionally paced to `rate`.
+
+Usage:
+  python -m app.loadgen --rate 3000 --sensors 300 --duration 30
+  python -m app.loadgen --mode closed --concurrency 200 --duration 30 --report out.json
+  python -m app.loadgen --model orbital --object-pool 100000 --rate 3000 --duration 30
+  python -m app.loadgen --format msgpack --encoding zstd --rate 3000 --duration 30
+
+With --model orbital the virtual sensors of each type share one site (app/orbits.py)
+and report noisy observations of whatever the catalogue has in view; a sensor
+with nothing visible skips that send.
+
+Set SIM_MODE=loadgen to run it inside the sensor-sim pod instead of the single-sensor loop.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from sentinel_common.auth import issue_token
+from sentinel_common.codec import ENCODINGS, FORMATS, encode_body
+
+from .events import make_event, observed_event
+from .orbits import Catalogue, OrbitalObserver, sensor_model
+
+
+SENSOR_TYPES = ("radar", "optical", "space")
+
+lg_sent = Counter("sda_loadgen_sent_total", "Load generator requests by outcome", ["outcome"])
+lg_latency = Histogram(
+    "sda_loadgen_latency_seconds",
+    "Load generator client-side latency (from scheduled send time)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram (~1% relative error) with exact count, mean and max."""
+
+    GROWTH = 1.02
+
+    def __init__(self):
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        us = max(1.0, seconds * 1e6)
+        idx = int(math.log(us) / math.log(self.GROWTH))
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= target:
+                return min(self.max, self.GROWTH ** (idx + 1) / 1e6)
+        return self.max
+
+    def summary_ms(self) -> dict:
+        return {
+            "p50": round(1000 * self.percentile(0.50), 3),
+            "p90": round(1000 * self.percentile(0.90), 3),
+            "p99": round(1000 * self.percentile(0.99), 3),
+            "p999": round(1000 * self.percentile(0.999), 3),
+            "max": round(1000 * self.max, 3),
+            "mean": round(1000 * self.total / max(1, self.count), 3),
+        }
+
+
+@dataclass
+class LoadConfig:
+    url: str
+    token: str
+    sensors: int = 100
+    rate: float = 1000.0
+    duration: float = 30.0
+    mode: str = "open"
+    poisson: bool = False
+    concurrency: int = 100
+    max_inflight: int = 2000
+    connections: int = 200
+    object_pool: int = 1000
+    timeout: float = 3.0
+    seed: int = 1
+    model: str = "random"
+    catalog_seed: int = 42
+    body_format: str = "json"
+    encoding: str = "identity"
+
+
+class VirtualSensor:
+    def __init__(self, index: int, seed: int, object_pool: int, observer: Optional[OrbitalObserver] = None):
+        self.sensor_type = SENSOR_TYPES[index % len(SENSOR_TYPES)]
+        self.sensor_id = f"vsim-{self.sensor_type}-{index:04d}"
+        self.rng = random.Random(seed * 1_000_003 + index)
+        self.object_pool = object_pool
+        self.observer = observer
+        self.seq = 0
+
+    def next_event(self) -> Optional[dict]:
+        self.seq += 1
+        if self.observer is None:
+            return make_event(self.sensor_id, self.sensor_type, self.rng, self.object_pool, self.seq)
+        obs = self.observer.sample(time.time())
+        return observed_event(self.sensor_id, self.sensor_type, self.seq, *obs) if obs else None
+
+
+def orbital_observers(cfg: LoadConfig) -> dict[str, OrbitalObserver]:
+    """One observer per sensor type over a shared catalogue: three propagations per tick regardless of sensor count."""
+    cat = Catalogue(cfg.object_pool, seed=cfg.catalog_seed)
+    return {t: OrbitalObserver(sensor_model(t, cat, seed=cfg.seed * 31 + i)) for i, t in enumerate(SENSOR_TYPES)}
+
+
+class LoadGenerator:
+    def __init__(self, cfg: LoadConfig):
+        self.cfg = cfg
+        self.hist = LatencyHistogram()
+        self.ok = self.errors = self.dropped = self.abandoned = 0
+        self.inflight = 0
+        self.started_at = 0.0
+        self.finished_at: Optional[float] = None
+        self._tasks: set[asyncio.Task] = set()
+        observers = orbital_observers(cfg) if cfg.model == "orbital" else {}
+        self.observers = list(observers.values())
+        self.sensors = [
+            VirtualSensor(i, cfg.seed, cfg.object_pool, observers.get(SENSOR_TYPES[i % len(SENSOR_TYPES)]))
+            for i in range(cfg.sensors)
+        ]
+        self.skipped = 0
+
+    async def _send(self, client: httpx.AsyncClient, evt: dict, scheduled: float) -> None:
+        self.inflight += 1
+        try:
+            body, headers = encode_body(evt, self.cfg.body_format, self.cfg.encoding)
+            resp = await client.post(self.cfg.url, content=body, headers=headers)
+            outcome = "ok" if resp.status_code == 200 else "error"
+        except Exception:
+            outcome = "error"
+        finally:
+            self.inflight -= 1
+        latency = time.perf_counter() - scheduled
+        self.hist.record(latency)
+        lg_latency.observe(latency)
+        lg_sent.labels(outcome).inc()
+        if outcome == "ok":
+            self.ok += 1
+        else:
+            self.errors += 1
+
+    async def _open_sensor(self, client: httpx.AsyncClient, sensor: VirtualSensor, end: float) -> None:
+        rate = self.cfg.rate / max(1, len(self.sensors))
+        # Stagger sensors across one period so they don't fire in lockstep
+        next_at = time.perf_counter() + sensor.rng.random() / rate
+        while next_at < end:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            evt = sensor.next_event()
+            if evt is None:
+                self.skipped += 1
+            elif self.inflight >= self.cfg.max_inflight:
+                self.dropped += 1
+                lg_sent.labels("dropped").inc()
+            else:
+                task = asyncio.create_task(self._send(client, evt, next_at))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            next_at += sensor.rng.expovariate(rate) if self.cfg.poisson else 1.0 / rate
+
+    async def _refresh_observers(self) -> None:
+        """Re-propagate every tick in a worker thread: ~50 ms per observer at 100k objects would stall the send schedule."""
+        tick = min(o.tick_s for o in self.observers)
+        next_at = time.time()
+        while True:
+            next_at += tick
+            await asyncio.sleep(max(0.0, next_at - time.time()))
+            for observer in self.observers:
+                await asyncio.to_thread(observer.refresh, time.time())
+
+    async def _closed_worker(self, client: httpx.AsyncClient, worker: int, end: float) -> None:
+        pace = self.cfg.concurrency / self.cfg.rate if self.cfg.rate > 0 else 0.0
+        i = worker
+        next_at = time.perf_counter()
+        while time.perf_counter() < end:
+            sensor = self.sensors[i % len(self.sensors)]
+            i += self.cfg.concurrency
+            scheduled = max(next_at, time.perf_counter())
+            evt = sensor.next_event()
+            if evt is None:
+                self.skipped += 1
+            else:
+                await self._send(client, evt, scheduled)
+            if pace:
+                next_at = scheduled + pace
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+    async def run(self) -> dict:
+        cfg = self.cfg
+        limits = httpx.Limits(max_connections=cfg.connections, max_keepalive_connections=cfg.connections)
+        headers = {"Authorization": f"Bearer {cfg.token}"}
+        async with httpx.AsyncClient(timeout=cfg.timeout, limits=limits, headers=headers) as client:
+            refresher = None
+            if self.observers:
+                for observer in self.observers:
+                    await asyncio.to_thread(observer.refresh, time.time())
+                refresher = asyncio.create_task(self._refresh_observers())
+            self.started_at = time.perf_counter()
+            end = self.started_at + cfg.duration
+            if cfg.mode == "closed":
+                workers = [self._closed_worker(client, w, end) for w in range(cfg.concurrency)]
+            else:
+                workers = [self._open_sensor(client, s, end) for s in self.sensors]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                if refresher is not None:
+                    refresher.cancel()
+            # Give in-flight requests one timeout to finish, then abandon the rest so the
+            # run ends on schedule even when the target is saturated
+            if self._tasks:
+                _, pending = await asyncio.wait(list(self._tasks), timeout=cfg.timeout)
+                for task in pending:
+                    task.cancel()
+                self.abandoned = len(pending)
+            self.finished_at = time.perf_counter()
+        return self.report()
+
+    def report(self) -> dict:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at if self.started_at else 0.0
+        done = self.ok + self.errors
+        return {
+            "mode": self.cfg.mode,
+            "model": self.cfg.model,
+            "sensors": len(self.sensors),
+            "target_rps": self.cfg.rate,
+            "achieved_rps": round(done / elapsed, 1) if elapsed else 0.0,
+            "ok_rps": round(self.ok / elapsed, 1) if elapsed else 0.0,
+            "elapsed_s": round(elapsed, 3),
+            "sent": done,
+            "ok": self.ok,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "abandoned": self.abandoned,
+            "skipped_not_visible": self.skipped,
+            "inflight": self.inflight,
+            "latency_ms": self.hist.summary_ms(),
+        }
+
+
+def config_from_env(url: str, token: str) -> LoadConfig:
+    return LoadConfig(
+        url=url,
+        token=token,
+        sensors=int(os.getenv("LOADGEN_SENSORS", "100")),
+        rate=float(os.getenv("LOADGEN_RATE", "1000")),
+        duration=float(os.getenv("LOADGEN_DURATION_SECONDS", "3600")),
+        mode=os.getenv("LOADGEN_MODE", "open"),
+        poisson=os.getenv("LOADGEN_POISSON", "false").lower() == "true",
+        concurrency=int(os.getenv("LOADGEN_CONCURRENCY", "100")),
+        max_inflight=int(os.getenv("LOADGEN_MAX_INFLIGHT", "2000")),
+        connections=int(os.getenv("LOADGEN_CONNECTIONS", "200")),
+        object_pool=int(os.getenv("OBJECT_POOL", "1000")),
+        timeout=float(os.getenv("HTTP_TIMEOUT_SECONDS", "3.0")),
+        model=os.getenv("SIM_MODEL", "random"),
+        catalog_seed=int(os.getenv("CATALOG_SEED", "42")),
+        body_format=os.getenv("INGEST_FORMAT", "json"),
+        encoding=os.getenv("INGEST_ENCODING", "identity"),
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description="High-rate observation load generator")
+    p.add_argument("--url", default=os.getenv("INGEST_URL", "http://localhost:8001/observations"))
+    p.add_argument("--token", default=None, help="Bearer token (default: minted from JWT_SECRET/JWT_ISSUER)")
+    p.add_argument("--sensors", type=int, default=100, help="virtual sensors")
+    p.add_argument("--rate", type=float, default=1000.0, help="aggregate target events/s (closed loop: pacing cap, 0 = unpaced)")
+    p.add_argument("--duration", type=float, default=30.0, help="seconds")
+    p.add_argument("--mode", choices=["open", "closed"], default="open")
+    p.add_argument("--poisson", action="store_true", help="open loop: exponential inter-arrival times")
+    p.add_argument("--concurrency", type=int, default=100, help="closed loop workers")
+    p.add_argument("--max-inflight", type=int, default=2000, help="open loop: drop sends beyond this many outstanding")
+    p.add_argument("--connections", type=int, default=200, help="HTTP connection pool size")
+    p.add_argument("--object-pool", type=int, default=1000)
+    p.add_argument("--timeout", type=float, default=3.0)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--model", choices=["random", "orbital"], default="random", help="observation model")
+    p.add_argument("--catalog-seed", type=int, default=42, help="orbital model: catalogue seed")
+    p.add_argument("--format", choices=list(FORMATS), default=os.getenv("INGEST_FORMAT", "json"), help="observation body format")
+    p.add_argument("--encoding", choices=list(ENCODINGS), default=os.getenv("INGEST_ENCODING", "identity"), help="observation body compression")
+    p.add_argument("--report", default=None, help="also write the JSON report to this path")
+    args = p.parse_args()
+
+    cfg = LoadConfig(
+        url=args.url,
+        token=args.token or issue_token("sensor-sim:loadgen"),
+        sensors=args.sensors,
+        rate=args.rate,
+        duration=args.duration,
+        mode=args.mode,
+        poisson=args.poisson,
+        concurrency=args.concurrency,
+        max_inflight=args.max_inflight,
+        connections=args.connections,
+        object_pool=args.object_pool,
+        timeout=args.timeout,
+        seed=args.seed,
+        model=args.model,
+        catalog_seed=args.catalog_seed,
+        body_format=args.format,
+        encoding=args.encoding,
+    )
+    report = asyncio.run(LoadGenerator(cfg).run())
+    out = json.dumps(report, indent=2)
+    print(out)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+
+
+if __name__ == "__main__":
+    main()
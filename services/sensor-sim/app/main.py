@@ -1,129 +1,149 @@
 import os
 import time
-import json
 import random
+import asyncio
 import threading
 from typing import Optional
 
 import httpx
-import jwt
-from fastapi import FastAPI
-from prometheus_client import Counter, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from fastapi import FastAPI, Header
+from prometheus_client import Counter, Gauge
+
+from sentinel_common.auth import issue_token, verify_bearer
+from sentinel_common.codec import encode_body
+from sentinel_common.profiling import debug_router
+from sentinel_common.service import add_metrics_route, health_body
+
+from .events import make_event, observed_event
+from .loadgen import LoadGenerator, config_from_env
+from .orbits import Catalogue, OrbitalObserver, sensor_model
 
 
 APP_NAME = os.getenv("SERVICE_NAME", "sensor-sim")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 
 SENSOR_ID = os.getenv("SENSOR_ID", "radar-1")
 SENSOR_TYPE = os.getenv("SENSOR_TYPE", "radar")
+# "sensor": one emitter thread for SENSOR_ID; "loadgen": asyncio load generator (see app/loadgen.py)
+SIM_MODE = os.getenv("SIM_MODE", "sensor")
+# "random": independent random states; "orbital": propagated catalogue with per-type visibility (see app/orbits.py)
+SIM_MODEL = os.getenv("SIM_MODEL", "random")
 
 INGEST_URL = os.getenv("INGEST_URL", "http://ingestion-gateway:8000/observations")
 TASKING_URL = os.getenv("TASKING_URL", "http://tasking-service:8000/tasking")
+# Observation body format (json | msgpack) and compression (identity | gzip | zstd); the loadgen uses these too
+INGEST_FORMAT = os.getenv("INGEST_FORMAT", "json")
+INGEST_ENCODING = os.getenv("INGEST_ENCODING", "identity")
 
 BASE_RATE_HZ = float(os.getenv("BASE_RATE_HZ", "1.5"))
 OBJECT_POOL = int(os.getenv("OBJECT_POOL", "25"))
 HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "3.0"))
 TASKING_POLL_SECONDS = float(os.getenv("TASKING_POLL_SECONDS", "5.0"))
+# Server-side wait per long-poll; tasking changes arrive as soon as they are stored
+TASKING_LONG_POLL_SECONDS = float(os.getenv("TASKING_LONG_POLL_SECONDS", "25.0"))
+
+# Orbital model: every pod with the same seed and size shares one catalogue
+CATALOG_SIZE = int(os.getenv("CATALOG_SIZE", str(OBJECT_POOL)))
+CATALOG_SEED = int(os.getenv("CATALOG_SEED", "42"))
+ORBIT_TICK_SECONDS = float(os.getenv("ORBIT_TICK_SECONDS", "1.0"))
+SENSOR_LAT_DEG = os.getenv("SENSOR_LAT_DEG")
+SENSOR_LON_DEG = os.getenv("SENSOR_LON_DEG")
 
 sent_total = Counter("sda_sensor_sent_total", "Sensor events sent total", ["service", "sensor_id"])
 send_fail = Counter("sda_sensor_send_fail_total", "Sensor send failures total", ["service", "sensor_id"])
 current_rate = Gauge("sda_sensor_current_rate_hz", "Current sensor emission rate Hz", ["service", "sensor_id"])
 
 
-def issue_token() -> str:
-    payload = {"svc": f"{APP_NAME}:{SENSOR_ID}", "iss": JWT_ISSUER, "iat": int(time.time())}
-    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
-
-
-def now_iso() -> str:
-    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-
-
-def rand_object_id() -> str:
-    return f"obj-{random.randint(1, OBJECT_POOL):03d}"
-
-
-def gen_measurement(seed: int) -> dict:
-    random.seed(seed + int(time.time()))
-    return {
-        "x_km": random.uniform(-20000, 20000),
-        "y_km": random.uniform(-20000, 20000),
-        "z_km": random.uniform(-20000, 20000),
-        "vx_kms": random.uniform(-2.0, 2.0),
-        "vy_kms": random.uniform(-2.0, 2.0),
-        "vz_kms": random.uniform(-2.0, 2.0),
-    }
-
-
-def gen_quality() -> dict:
-    return {
-        "snr_db": round(random.uniform(5, 25), 2),
-        "measurement_sigma": round(random.uniform(0.1, 1.0), 2),
-    }
-
-
 class SensorLoop:
     def __init__(self):
         self.rate_hz = BASE_RATE_HZ
         self.stop = threading.Event()
-        self.token = issue_token()
+        self.token = issue_token(f"{APP_NAME}:{SENSOR_ID}")
         self.headers = {"Authorization": f"Bearer {self.token}"}
+        self.rng = random.Random()
+        self.seq = 0
+        self.observer = None
+        if SIM_MODEL == "orbital":
+            model = sensor_model(
+                SENSOR_TYPE,
+                Catalogue(CATALOG_SIZE, seed=CATALOG_SEED),
+                seed=self.rng.randrange(2**32),
+                lat_deg=float(SENSOR_LAT_DEG) if SENSOR_LAT_DEG else None,
+                lon_deg=float(SENSOR_LON_DEG) if SENSOR_LON_DEG else None,
+            )
+            self.observer = OrbitalObserver(model, tick_s=ORBIT_TICK_SECONDS)
 
     def poll_tasking(self):
-        while not self.stop.is_set():
-            try:
-                with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                    resp = client.get(f"{TASKING_URL}/{SENSOR_ID}", headers=self.headers)
+        version = -1
+        with httpx.Client(timeout=HTTP_TIMEOUT + TASKING_LONG_POLL_SECONDS) as client:
+            while not self.stop.is_set():
+                try:
+                    resp = client.get(
+                        f"{TASKING_URL}/{SENSOR_ID}",
+                        params={"since_version": version, "timeout": TASKING_LONG_POLL_SECONDS},
+                        headers=self.headers,
+                    )
                     if resp.status_code == 200:
                         data = resp.json()
+                        version = int(data.get("version", version))
                         task = data.get("tasking", {}) or {}
                         rate = float(task.get("rate_hz", BASE_RATE_HZ))
                         self.rate_hz = max(0.2, min(10.0, rate))
                         current_rate.labels(APP_NAME, SENSOR_ID).set(self.rate_hz)
-            except Exception:
-                pass
-            self.stop.wait(TASKING_POLL_SECONDS)
+                        continue  # long-poll returned: re-arm immediately
+                except Exception:
+                    pass
+                self.stop.wait(TASKING_POLL_SECONDS)
+
+    def next_event(self) -> Optional[dict]:
+        if self.observer is None:
+            return make_event(SENSOR_ID, SENSOR_TYPE, self.rng, OBJECT_POOL, self.seq)
+        obs = self.observer.next(time.time())
+        return observed_event(SENSOR_ID, SENSOR_TYPE, self.seq, *obs) if obs else None
 
     def emit(self):
-        while not self.stop.is_set():
-            # Emit one observation
-            oid = rand_object_id()
-            evt = {
-                "event_id": f"evt-{SENSOR_ID}-{int(time.time() * 1000)}",
-                "sensor_id": SENSOR_ID,
-                "sensor_type": SENSOR_TYPE,
-                "timestamp": now_iso(),
-                "object_id": oid,
-                "measurement": gen_measurement(hash(oid) % 10000),
-                "quality": gen_quality(),
-                "integrity": {"signed": True, "signature": "demo-signature"},
-            }
-
-            try:
-                with httpx.Client(timeout=HTTP_TIMEOUT) as client:
-                    resp = client.post(INGEST_URL, json=evt, headers=self.headers)
+        with httpx.Client(timeout=HTTP_TIMEOUT) as client:
+            while not self.stop.is_set():
+                # Emit one observation
+                self.seq += 1
+                evt = self.next_event()
+                if evt is None:
+                    # Orbital model with nothing in view: idle until the next tick
+                    self.stop.wait(ORBIT_TICK_SECONDS)
+                    continue
+
+                try:
+                    body, headers = encode_body(evt, INGEST_FORMAT, INGEST_ENCODING)
+                    resp = client.post(INGEST_URL, content=body, headers={**self.headers, **headers})
                     if resp.status_code == 200:
                         sent_total.labels(APP_NAME, SENSOR_ID).inc()
                     else:
                         send_fail.labels(APP_NAME, SENSOR_ID).inc()
-            except Exception:
-                send_fail.labels(APP_NAME, SENSOR_ID).inc()
+                except Exception:
+                    send_fail.labels(APP_NAME, SENSOR_ID).inc()
 
-            # Sleep based on current rate
-            period = 1.0 / max(0.1, self.rate_hz)
-            self.stop.wait(period)
+                # Sleep based on current rate
+                period = 1.0 / max(0.1, self.rate_hz)
+                self.stop.wait(period)
 
 
 app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
 _loop = SensorLoop()
 _task_thread = threading.Thread(target=_loop.poll_tasking, daemon=True)
 _emit_thread = threading.Thread(target=_loop.emit, daemon=True)
+_loadgen: Optional[LoadGenerator] = None
+# Held here: the event loop keeps only a weak reference to a task
+_loadgen_task: Optional[asyncio.Task] = None
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
+    global _loadgen, _loadgen_task
+    if SIM_MODE == "loadgen":
+        _loadgen = LoadGenerator(config_from_env(INGEST_URL, _loop.token))
+        _loadgen_task = asyncio.get_running_loop().create_task(_loadgen.run())
+        return
     current_rate.labels(APP_NAME, SENSOR_ID).set(_loop.rate_hz)
     if not _task_thread.is_alive():
         _task_thread.start()
@@ -132,20 +152,33 @@ def startup():
 
 
 @app.on_event("shutdown")
-def shutdown():
+async def shutdown():
     _loop.stop.set()
+    if _loadgen_task is not None and not _loadgen_task.done():
+        _loadgen_task.cancel()
+        try:
+            await _loadgen_task
+        except asyncio.CancelledError:
+            pass
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": APP_NAME, "sensor_id": SENSOR_ID, "sensor_type": SENSOR_TYPE, "rate_hz": _loop.rate_hz}
+    return health_body(APP_NAME, mode=SIM_MODE, model=SIM_MODEL, sensor_id=SENSOR_ID, sensor_type=SENSOR_TYPE, rate_hz=_loop.rate_hz)
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+@app.get("/loadgen")
+def loadgen_report():
+    if _loadgen is None:
+        return {"mode": SIM_MODE, "running": False}
+    out = {"running": not _loadgen_task.done(), **_loadgen.report()}
+    if _loadgen_task.done() and not _loadgen_task.cancelled() and _loadgen_task.exception() is not None:
+        out["error"] = repr(_loadgen_task.exception())
+    return out
 
 
 @app.get("/debug")
-def debug():
-    return {"headers": _loop.headers, "ingest_url": INGEST_URL, "tasking_url": TASKING_URL}
+def debug(authorization: Optional[str] = Header(default=None)):
+    # Never echo _loop.headers: they carry this sensor's bearer token
+    verify_bearer(authorization)
+    return {"ingest_url": INGEST_URL, "tasking_url": TASKING_URL, "sensor_id": SENSOR_ID, "mode": SIM_MODE, "model": SIM_MODEL}
@@ -0,0 +1,276 @@
+"""
+Vectorized two-body object catalogue and sensor visibility.
+
+Every object carries Keplerian elements drawn once from a seeded RNG, so every
+sensor-sim pod with the same CATALOG_SEED sees the same `obj-NNN` on the same
+orbit and successive observations of an object are consistent. Propagation
+solves Kepler's equation for the whole catalogue at once with a fixed number of
+Newton iterations, which keeps a 100k-object tick in the tens of milliseconds.
+
+Frames are simplified: positions/velocities are inertial (km, km/s), Earth
+rotation uses a linear GMST, and the Sun direction is a mean-longitude circle.
+"""
+import math
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+
+
+MU_EARTH = 398600.4418  # km^3/s^2
+EARTH_RADIUS_KM = 6378.137
+EARTH_ROT_RAD_S = 7.2921159e-5
+J2000_UNIX = 946728000.0
+GMST_J2000_RAD = 4.894961213
+OBLIQUITY_RAD = math.radians(23.439)
+
+# Catalogue mix: (fraction, regime)
+REGIME_MIX = ((0.60, "LEO"), (0.15, "MEO"), (0.15, "GEO"), (0.10, "HEO"))
+
+
+@dataclass
+class SensorSite:
+    sensor_type: str
+    lat_deg: float = 0.0
+    lon_deg: float = 0.0
+    alt_km: float = 0.0
+    min_elevation_deg: float = 10.0
+    max_range_km: float = 6000.0
+    sigma_pos_km: float = 0.05     # range-independent position noise
+    sigma_ang_rad: float = 0.0     # angular noise, contributes range * sigma_ang_rad
+    sigma_vel_kms: float = 0.005
+
+
+# Per-type defaults; SENSOR_LAT_DEG/SENSOR_LON_DEG override the location
+DEFAULT_SITES = {
+    # Ground radar: LEO-dominant, precise range
+    "radar": SensorSite("radar", lat_deg=42.6, lon_deg=-71.5, min_elevation_deg=10.0, max_range_km=6000.0, sigma_pos_km=0.05, sigma_vel_kms=0.005),
+    # Ground telescope: deep space, night only, target must be sunlit, angles-only
+    "optical": SensorSite("optical", lat_deg=33.8, lon_deg=-106.7, min_elevation_deg=20.0, max_range_km=60000.0, sigma_ang_rad=1e-5, sigma_pos_km=0.1, sigma_vel_kms=0.02),
+    # Space-based sensor in a 700 km orbit: Earth-limb occlusion, target must be sunlit
+    "space": SensorSite("space", alt_km=700.0, max_range_km=45000.0, sigma_ang_rad=5e-6, sigma_pos_km=0.2, sigma_vel_kms=0.01),
+}
+
+
+def gmst(t: float) -> float:
+    return (GMST_J2000_RAD + EARTH_ROT_RAD_S * (t - J2000_UNIX)) % (2 * math.pi)
+
+
+def sun_direction(t: float) -> np.ndarray:
+    days = (t - J2000_UNIX) / 86400.0
+    lam = math.radians((280.46 + 0.9856474 * days) % 360.0)
+    return np.array([math.cos(lam), math.sin(lam) * math.cos(OBLIQUITY_RAD), math.sin(lam) * math.sin(OBLIQUITY_RAD)])
+
+
+def solve_kepler(M: np.ndarray, e: np.ndarray, iterations: int = 8) -> np.ndarray:
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(iterations):
+        E = E - (E - e * np.sin(E) - M) / (1.0 - e * np.cos(E))
+    return E
+
+
+def sunlit(r: np.ndarray, sun: np.ndarray) -> np.ndarray:
+    """Cylindrical Earth shadow model."""
+    along = r @ sun
+    perp = np.linalg.norm(r - np.outer(along, sun), axis=1)
+    return (along > 0) | (perp > EARTH_RADIUS_KM)
+
+
+class Catalogue:
+    def __init__(self, size: int, seed: int = 42, epoch: float = J2000_UNIX):
+        rng = np.random.default_rng(seed)
+        self.size = size
+        self.epoch = epoch
+        self.object_ids = [f"obj-{i + 1:03d}" for i in range(size)]
+
+        counts = [int(frac * size) for frac, _ in REGIME_MIX]
+        counts[0] += size - sum(counts)
+        regime = np.concatenate([np.full(c, g) for c, (_, g) in zip(counts, REGIME_MIX)])
+        rng.shuffle(regime)
+        self.regime = regime
+
+        a = np.empty(size)
+        e = np.empty(size)
+        inc = np.empty(size)
+        for g, n in zip(("LEO", "MEO", "GEO", "HEO"), counts):
+            m = regime == g
+            if g == "LEO":
+                a[m] = EARTH_RADIUS_KM + rng.uniform(300, 2000, n)
+                e[m] = rng.uniform(0.0, 0.02, n)
+                inc[m] = np.radians(rng.uniform(0, 100, n))
+            elif g == "MEO":
+                a[m] = EARTH_RADIUS_KM + rng.uniform(19000, 23500, n)
+                e[m] = rng.uniform(0.0, 0.02, n)
+                inc[m] = np.radians(rng.uniform(50, 65, n))
+            elif g == "GEO":
+                a[m] = 42164.0 + rng.normal(0, 20, n)
+                e[m] = rng.uniform(0.0, 0.001, n)
+                inc[m] = np.radians(rng.uniform(0, 5, n))
+            else:  # Molniya-like
+                a[m] = rng.uniform(26000, 26700, n)
+                e[m] = rng.uniform(0.68, 0.74, n)
+                inc[m] = np.radians(rng.normal(63.4, 0.5, n))
+
+        raan = rng.uniform(0, 2 * np.pi, size)
+        argp = rng.uniform(0, 2 * np.pi, size)
+        self.a, self.e = a, e
+        self.M0 = rng.uniform(0, 2 * np.pi, size)
+        self.n = np.sqrt(MU_EARTH / a**3)
+
+        co, so = np.cos(raan), np.sin(raan)
+        cw, sw = np.cos(argp), np.sin(argp)
+        ci, si = np.cos(inc), np.sin(inc)
+        # Perifocal -> inertial basis vectors, (size, 3) each
+        self.P = np.stack([co * cw - so * sw * ci, so * cw + co * sw * ci, sw * si], axis=1)
+        self.Q = np.stack([-co * sw - so * cw * ci, -so * sw + co * cw * ci, cw * si], axis=1)
+
+    def propagate(self, t: float, idx: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Inertial position (km) and velocity (km/s) at unix time `t`, for all objects or `idx`."""
+        sel = slice(None) if idx is None else idx
+        a, e, n = self.a[sel], self.e[sel], self.n[sel]
+        M = (self.M0[sel] + n * (t - self.epoch)) % (2 * np.pi)
+        E = solve_kepler(M, e)
+        cE, sE = np.cos(E), np.sin(E)
+        root = np.sqrt(1.0 - e**2)
+        rmag = a * (1.0 - e * cE)
+
+        xp = a * (cE - e)
+        yp = a * root * sE
+        k = np.sqrt(MU_EARTH * a) / rmag
+        vxp = -k * sE
+        vyp = k * root * cE
+
+        P, Q = self.P[sel], self.Q[sel]
+        r = xp[:, None] * P + yp[:, None] * Q
+        v = vxp[:, None] * P + vyp[:, None] * Q
+        return r, v
+
+
+class SensorModel:
+    """Visibility and noisy observations of a Catalogue from one sensor."""
+
+    def __init__(self, site: SensorSite, catalogue: Catalogue, seed: int = 0):
+        self.site = site
+        self.cat = catalogue
+        self.rng = np.random.default_rng(seed)
+        # Space sensor orbit: circular, fixed plane
+        self._orbit_r = EARTH_RADIUS_KM + site.alt_km
+        self._orbit_n = math.sqrt(MU_EARTH / self._orbit_r**3)
+
+    def position(self, t: float) -> np.ndarray:
+        s = self.site
+        if s.sensor_type == "space":
+            u = self._orbit_n * (t - J2000_UNIX)
+            inc = math.radians(98.2)
+            return self._orbit_r * np.array([math.cos(u), math.sin(u) * math.cos(inc), math.sin(u) * math.sin(inc)])
+        lat, lon = math.radians(s.lat_deg), math.radians(s.lon_deg) + gmst(t)
+        rs = EARTH_RADIUS_KM + s.alt_km
+        return rs * np.array([math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)])
+
+    def visible(self, t: float, r: np.ndarray) -> np.ndarray:
+        """Boolean mask over rows of `r` (catalogue positions at `t`)."""
+        s = self.site
+        p = self.position(t)
+        rel = r - p
+        rng_km = np.linalg.norm(rel, axis=1)
+        ok = rng_km <= s.max_range_km
+
+        if s.sensor_type == "space":
+            # Line of sight must clear the Earth (plus 100 km of atmosphere)
+            d = rel / rng_km[:, None]
+            tca = np.clip(-(d @ p), 0.0, rng_km)
+            closest = np.linalg.norm(p[None, :] + d * tca[:, None], axis=1)
+            ok &= closest > EARTH_RADIUS_KM + 100.0
+        else:
+            up = p / np.linalg.norm(p)
+            sin_el = (rel @ up) / rng_km
+            ok &= sin_el >= math.sin(math.radians(s.min_elevation_deg))
+
+        if s.sensor_type in ("optical", "space"):
+            sun = sun_direction(t)
+            ok &= sunlit(r, sun)
+            if s.sensor_type == "optical":
+                # Site must be in darkness (Sun below -6 deg)
+                ok &= float(p @ sun) / np.linalg.norm(p) < math.sin(math.radians(-6.0))
+        return ok
+
+    def observe(self, t: float, max_obs: Optional[int] = None) -> dict:
+        """
+        Noisy observations of visible objects at time `t`, as arrays:
+        idx, r (km), v (km/s), range_km, sigma_km.
+        """
+        r, v = self.cat.propagate(t)
+        idx = np.flatnonzero(self.visible(t, r))
+        if max_obs is not None and idx.size > max_obs:
+            idx = self.rng.choice(idx, size=max_obs, replace=False)
+        r, v = r[idx], v[idx]
+        rng_km = np.linalg.norm(r - self.position(t), axis=1)
+        sigma = self.site.sigma_pos_km + rng_km * self.site.sigma_ang_rad
+        r = r + self.rng.normal(size=r.shape) * sigma[:, None]
+        v = v + self.rng.normal(size=v.shape) * self.site.sigma_vel_kms
+        return {"idx": idx, "r": r, "v": v, "range_km": rng_km, "sigma_km": sigma}
+
+
+def sensor_model(sensor_type: str, catalogue: Catalogue, seed: int = 0, lat_deg: Optional[float] = None, lon_deg: Optional[float] = None) -> SensorModel:
+    site = DEFAULT_SITES.get(sensor_type, DEFAULT_SITES["radar"])
+    site = replace(
+        site,
+        sensor_type=sensor_type if sensor_type in DEFAULT_SITES else "radar",
+        lat_deg=site.lat_deg if lat_deg is None else lat_deg,
+        lon_deg=site.lon_deg if lon_deg is None else lon_deg,
+    )
+    return SensorModel(site, catalogue, seed=seed)
+
+
+def measurement_dict(r: np.ndarray, v: np.ndarray) -> dict:
+    return {
+        "x_km": float(r[0]),
+        "y_km": float(r[1]),
+        "z_km": float(r[2]),
+        "vx_kms": float(v[0]),
+        "vy_kms": float(v[1]),
+        "vz_kms": float(v[2]),
+    }
+
+
+def quality_dict(range_km: float, sigma_km: float) -> dict:
+    # One-way (1/R^2) falloff: SNR drops 20 dB per decade of range, clipped to the sim's usual 5-25 dB
+    snr = 25.0 - 40.0 * math.log10(max(range_km, 500.0) / 500.0) / 2.0
+    return {"snr_db": round(max(5.0, min(25.0, snr)), 2), "measurement_sigma": round(float(sigma_km), 3)}
+
+
+class OrbitalObserver:
+    """
+    Per-pod helper for the emit loop: re-propagates once per `tick_s` and hands out
+    one visible object per call, extrapolated linearly to the call time.
+
+    next() re-propagates inline when the tick is up. An event loop instead runs
+    refresh() in a worker thread once per tick and draws with sample(), which never
+    propagates; draws use their own RNG so they don't share the model's with that thread.
+    """
+
+    def __init__(self, model: SensorModel, tick_s: float = 1.0):
+        self.model = model
+        self.tick_s = tick_s
+        self.rng = np.random.default_rng(int(model.rng.integers(2**32)))
+        self._current: Optional[tuple[float, dict]] = None
+
+    def refresh(self, now: float) -> None:
+        self._current = (now, self.model.observe(now))
+
+    def next(self, now: float) -> Optional[tuple[str, dict, dict]]:
+        if self._current is None or now - self._current[0] >= self.tick_s:
+            self.refresh(now)
+        return self.sample(now)
+
+    def sample(self, now: float) -> Optional[tuple[str, dict, dict]]:
+        if self._current is None:
+            return None
+        t, obs = self._current
+        if obs["idx"].size == 0:
+            return None
+        k = int(self.rng.integers(obs["idx"].size))
+        dt = now - t
+        r = obs["r"][k] + obs["v"][k] * dt
+        oid = self.model.cat.object_ids[int(obs["idx"][k])]
+        return oid, measurement_dict(r, obs["v"][k]), quality_dict(float(obs["range_km"][k]), float(obs["sigma_km"][k]))
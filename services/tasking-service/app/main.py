@@ -1,69 +1,105 @@
 import os
 import time
+import asyncio
 from typing import Optional
 
-import jwt
 from fastapi import FastAPI, Header, HTTPException
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from prometheus_client import Counter
+
+from sentinel_common.auth import verify_bearer
+from sentinel_common.profiling import debug_router
+from sentinel_common.redis_pool import async_redis_client
+from sentinel_common.service import add_metrics_route, health_body
+
+from .store import StaleFence, TaskingStore, UpdateNotifier
 
 
 APP_NAME = os.getenv("SERVICE_NAME", "tasking-service")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
+
+LONG_POLL_MAX_SECONDS = float(os.getenv("LONG_POLL_MAX_SECONDS", "30"))
+
+r = async_redis_client()
+store = TaskingStore(r)
+notifier = UpdateNotifier(r)
 
 tasking_updates = Counter("sda_tasking_updates_total", "Tasking updates total", ["service"])
 tasking_reads = Counter("sda_tasking_reads_total", "Tasking reads total", ["service"])
+tasking_fenced = Counter("sda_tasking_fenced_total", "Tasking updates rejected for a stale fencing token", ["service"])
+long_poll_wakeups = Counter("sda_tasking_long_poll_total", "Long-poll requests by outcome", ["service", "outcome"])
 
-# In-memory store (OK for sandbox demo; replace with Redis later if desired)
-LATEST_TASKING: dict = {"generated_at": 0, "policy": "none", "summary": {}, "sensors": {}}
 
-
-def verify_bearer(auth: Optional[str]) -> dict:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return payload
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
 
 
-app = FastAPI(title=APP_NAME)
+@app.on_event("startup")
+async def startup():
+    notifier.start()
 
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "service": APP_NAME, "ts": int(time.time()), "tasking_ts": LATEST_TASKING.get("generated_at", 0)}
+@app.on_event("shutdown")
+async def shutdown():
+    await notifier.stop()
+    await r.aclose()
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+@app.get("/health")
+async def health():
+    try:
+        latest = await store.latest()
+        fence = await store.fence()
+        redis_ok = True
+    except Exception:
+        latest, fence, redis_ok = {}, None, False
+    return health_body(APP_NAME, redis_ok, tasking_ts=latest.get("generated_at", 0), fencing_token=fence)
 
 
 @app.post("/tasking")
-def set_tasking(body: dict, authorization: Optional[str] = Header(default=None)):
+async def set_tasking(body: dict, authorization: Optional[str] = Header(default=None)):
     verify_bearer(authorization)
-    global LATEST_TASKING
-    LATEST_TASKING = body
+    try:
+        changed = await store.push(body)
+    except StaleFence as e:
+        tasking_fenced.labels(APP_NAME).inc()
+        raise HTTPException(status_code=409, detail=str(e))
     tasking_updates.labels(APP_NAME).inc()
-    return {"status": "ok", "stored_at": int(time.time())}
+    return {"status": "ok", "stored_at": int(time.time()), "sensors_changed": changed}
 
 
 @app.get("/tasking")
-def get_tasking(authorization: Optional[str] = Header(default=None)):
+async def get_tasking(authorization: Optional[str] = Header(default=None)):
     verify_bearer(authorization)
     tasking_reads.labels(APP_NAME).inc()
-    return LATEST_TASKING
+    return await store.latest()
 
 
 @app.get("/tasking/{sensor_id}")
-def get_tasking_for_sensor(sensor_id: str, authorization: Optional[str] = Header(default=None)):
+async def get_tasking_for_sensor(
+    sensor_id: str,
+    authorization: Optional[str] = Header(default=None),
+    since_version: Optional[int] = None,
+    timeout: float = 25.0,
+):
+    """
+    With `since_version`, long-polls: returns as soon as the sensor's version exceeds it,
+    or with the unchanged tasking after `timeout` seconds. Without it, returns immediately.
+    """
     verify_bearer(authorization)
     tasking_reads.labels(APP_NAME).inc()
-    sensors = LATEST_TASKING.get("sensors", {}) or {}
-    return {"sensor_id": sensor_id, "tasking": sensors.get(sensor_id, {"rate_hz": 1.0}), "generated_at": LATEST_TASKING.get("generated_at", 0)}
+
+    if since_version is None:
+        return await store.sensor(sensor_id)
+
+    changed = notifier.waiter(sensor_id)
+    current = await store.sensor(sensor_id)
+    if current["version"] > since_version:
+        long_poll_wakeups.labels(APP_NAME, "immediate").inc()
+        return current
+
+    try:
+        await asyncio.wait_for(changed.wait(), timeout=max(0.0, min(timeout, LONG_POLL_MAX_SECONDS)))
+        long_poll_wakeups.labels(APP_NAME, "changed").inc()
+    except asyncio.TimeoutError:
+        long_poll_wakeups.labels(APP_NAME, "timeout").inc()
+    return await store.sensor(sensor_id)
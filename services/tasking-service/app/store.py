@@ -0,0 +1,176 @@
+"""
+Redis-backed tasking store with per-sensor versions.
+
+Layout:
+  tasking:latest          full plan as last pushed by mission-optimizer (JSON)
+  tasking:fence           highest fencing token accepted
+  tasking:sensor:<id>     hash {json, stable, version, generated_at}
+  tasking:updates         pub/sub channel, "<sensor_id> <version>" per change
+
+A push is applied by one Lua script, so the fence check, the plan and every
+sensor's version bump land atomically and all replicas agree on versions. A
+sensor's version only moves when its own tasking actually changes. Each task's
+timing relative to the push (TIMING_FIELDS) is left out of that comparison. It is
+stored with the rest of the doc, but it moves on every push, so counting it would
+bump every sensor's version and wake every long-poll on every plan.
+"""
+import asyncio
+import json
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+
+UPDATES_CHANNEL = "tasking:updates"
+DEFAULT_SENSOR_TASKING = {"rate_hz": 1.0}
+# Per-task fields mission-optimizer recomputes from the plan time on every push
+TIMING_FIELDS = ("start_ts", "overdue_s")
+
+
+def latest_key() -> str:
+    return "tasking:latest"
+
+
+def fence_key() -> str:
+    return "tasking:fence"
+
+
+def sensor_key(sensor_id: str) -> str:
+    return f"tasking:sensor:{sensor_id}"
+
+
+# KEYS[1]=fence, KEYS[2]=latest, KEYS[3..]=sensor hashes
+# ARGV[1]=fencing token or "", ARGV[2]=plan JSON, ARGV[3]=generated_at,
+# ARGV[4..]=(sensor_id, sensor JSON, sensor JSON without timing) triples
+# Returns {changed_count, 0} or {-1, current_fence} when the token is stale.
+_PUSH = """
+local fence = ARGV[1]
+if fence ~= '' then
+  local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+  if tonumber(fence) < current then
+    return {-1, current}
+  end
+  redis.call('SET', KEYS[1], fence)
+end
+redis.call('SET', KEYS[2], ARGV[2])
+local changed = 0
+for i = 3, #KEYS do
+  local a = 4 + (i - 3) * 3
+  local sensor_id, doc, stable = ARGV[a], ARGV[a + 1], ARGV[a + 2]
+  if redis.call('HGET', KEYS[i], 'stable') ~= stable then
+    local version = redis.call('HINCRBY', KEYS[i], 'version', 1)
+    redis.call('HSET', KEYS[i], 'stable', stable)
+    redis.call('PUBLISH', '""" + UPDATES_CHANNEL + """', sensor_id .. ' ' .. version)
+    changed = changed + 1
+  end
+  redis.call('HSET', KEYS[i], 'json', doc, 'generated_at', ARGV[3])
+end
+return {changed, 0}
+"""
+
+
+def stable_doc(doc: dict) -> dict:
+    """A sensor's tasking without TIMING_FIELDS: what its version tracks."""
+    tasks = doc.get("tasks")
+    if not isinstance(tasks, list):
+        return doc
+    return {**doc, "tasks": [{k: v for k, v in t.items() if k not in TIMING_FIELDS} if isinstance(t, dict) else t for t in tasks]}
+
+
+class StaleFence(Exception):
+    def __init__(self, token: int, current: int):
+        super().__init__(f"Stale fencing token {token} (current {current})")
+        self.current = current
+
+
+class TaskingStore:
+    def __init__(self, r: aioredis.Redis):
+        self.r = r
+        self._push = r.register_script(_PUSH)
+
+    async def push(self, body: dict) -> int:
+        """Store a plan; returns how many sensors' tasking changed."""
+        sensors = body.get("sensors") or {}
+        fence = body.get("fencing_token")
+        keys = [fence_key(), latest_key()] + [sensor_key(sid) for sid in sensors]
+        args = ["" if fence is None else int(fence), json.dumps(body), int(body.get("generated_at", 0))]
+        for sid, doc in sensors.items():
+            args += [sid, json.dumps(doc, sort_keys=True), json.dumps(stable_doc(doc), sort_keys=True)]
+
+        changed, current = await self._push(keys=keys, args=args)
+        if int(changed) < 0:
+            raise StaleFence(int(fence), int(current))
+        return int(changed)
+
+    async def latest(self) -> dict:
+        raw = await self.r.get(latest_key())
+        return json.loads(raw) if raw else {"generated_at": 0, "policy": "none", "summary": {}, "sensors": {}}
+
+    async def fence(self) -> int:
+        return int(await self.r.get(fence_key()) or 0)
+
+    async def sensor(self, sensor_id: str) -> dict:
+        h = await self.r.hgetall(sensor_key(sensor_id))
+        return {
+            "sensor_id": sensor_id,
+            "tasking": json.loads(h["json"]) if h.get("json") else DEFAULT_SENSOR_TASKING,
+            "generated_at": int(h.get("generated_at", 0)),
+            "version": int(h.get("version", 0)),
+        }
+
+
+class UpdateNotifier:
+    """
+    One pub/sub subscription per process fanned out to long-poll waiters.
+    Waiters register before reading the current version, so an update published
+    between the read and the wait still wakes them.
+    """
+
+    def __init__(self, r: aioredis.Redis):
+        self.r = r
+        self._events: dict[str, asyncio.Event] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def waiter(self, sensor_id: str) -> asyncio.Event:
+        ev = self._events.get(sensor_id)
+        if ev is None:
+            ev = self._events[sensor_id] = asyncio.Event()
+        return ev
+
+    def _wake(self, sensor_id: Optional[str] = None) -> None:
+        if sensor_id is None:
+            events, self._events = self._events, {}
+            for ev in events.values():
+                ev.set()
+            return
+        ev = self._events.pop(sensor_id, None)
+        if ev is not None:
+            ev.set()
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.r.pubsub() as ps:
+                    await ps.subscribe(UPDATES_CHANNEL)
+                    # Anything published while (re)connecting was missed: let waiters re-read
+                    self._wake()
+                    async for msg in ps.listen():
+                        if msg.get("type") == "message":
+                            self._wake(str(msg["data"]).split(" ", 1)[0])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(1.0)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
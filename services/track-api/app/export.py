@@ -0,0 +1,135 @@
+"""
+Streaming catalogue export.
+
+The index is walked with SSCAN so neither Redis nor this process ever holds the
+whole catalogue; each cursor page is fetched with one pipelined round trip and
+encoded as soon as it arrives. Memory use is bounded by `batch_size`.
+
+Batches are the stored JSON bytes, so NDJSON is a straight concatenation and
+only the Arrow path pays for decoding.
+"""
+import io
+import zlib
+from typing import Callable, Iterable, Iterator
+
+import orjson
+
+
+STATE_FIELDS = ["x_km", "y_km", "z_km", "vx_kms", "vy_kms", "vz_kms"]
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+class ExportError(ValueError):
+    """Raised for export options this deployment cannot serve."""
+
+
+def iter_track_batches(r, idx_key: str, fetch_raw: Callable[[list[str]], list[bytes]], batch_size: int) -> Iterator[list[bytes]]:
+    """Yield lists of raw track JSON, one list per SSCAN page."""
+    cursor = 0
+    while True:
+        cursor, object_ids = r.sscan(idx_key, cursor=cursor, count=batch_size)
+        if object_ids:
+            batch = fetch_raw(object_ids)
+            if batch:
+                yield batch
+        if cursor == 0:
+            break
+
+
+def encode_ndjson(batches: Iterable[list[bytes]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"\n".join(batch) + b"\n"
+
+
+def _arrow_schema(pa):
+    state = [pa.field(k, pa.float64()) for k in STATE_FIELDS]
+    return pa.schema(
+        [
+            pa.field("track_id", pa.string()),
+            pa.field("object_id", pa.string()),
+            pa.field("last_update", pa.string()),
+            pa.field("confidence", pa.float64()),
+            *state,
+            pa.field("flags", pa.list_(pa.string())),
+            pa.field("source_count", pa.int32()),
+        ]
+    )
+
+
+def encode_arrow(raw_batches: Iterable[list[bytes]]) -> Iterator[bytes]:
+    """Encode each batch as one Arrow IPC record batch with state flattened into columns."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(pa)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        chunk = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return chunk
+
+    for raw_batch in raw_batches:
+        batch = [orjson.loads(raw) for raw in raw_batch]
+        states = [t.get("state") or {} for t in batch]
+        columns = {
+            "track_id": [t.get("track_id") for t in batch],
+            "object_id": [t.get("object_id") for t in batch],
+            "last_update": [t.get("last_update") for t in batch],
+            "confidence": [float(t.get("confidence", 0.0)) for t in batch],
+            "flags": [list(t.get("flags") or []) for t in batch],
+            "source_count": [len(t.get("sources") or []) for t in batch],
+        }
+        for k in STATE_FIELDS:
+            columns[k] = [float(s.get(k, 0.0)) for s in states]
+        writer.write_batch(pa.record_batch([columns[f.name] for f in schema], schema=schema))
+        yield drain()
+
+    writer.close()
+    yield drain()
+
+
+def compress(chunks: Iterable[bytes], compression: str) -> Iterator[bytes]:
+    """Apply streaming gzip/zstd; flushes per chunk so clients see batches as they are produced."""
+    if compression == "none":
+        yield from chunks
+        return
+
+    if compression == "gzip":
+        comp = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            out = comp.compress(chunk) + comp.flush(zlib.Z_SYNC_FLUSH)
+            if out:
+                yield out
+        yield comp.flush()
+        return
+
+    import zstandard
+
+    comp = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        out = comp.compress(chunk) + comp.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def check_options(fmt: str, compression: str) -> None:
+    """Reject unsupported or unavailable options before the response starts streaming."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    if compression not in COMPRESSIONS:
+        raise ExportError(f"Unsupported compression '{compression}' (expected one of: {', '.join(COMPRESSIONS)})")
+    try:
+        if fmt == "arrow":
+            import pyarrow  # noqa: F401
+        if compression == "zstd":
+            import zstandard  # noqa: F401
+    except ImportError as e:
+        raise ExportError(f"Export option not available in this build: {e.name}") from e
@@ -1,91 +1,382 @@
 import os
 import time
-import json
-from typing import Optional
+import zlib
+from typing import Iterable, Optional
 
-import jwt
-import redis
+import orjson
 from fastapi import FastAPI, Header, HTTPException
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
+from prometheus_client import Counter
+from fastapi.responses import Response, StreamingResponse
+
+from sentinel_common.auth import verify_bearer
+from sentinel_common.codec import encode_response
+from sentinel_common.keys import SHARD_BUCKETS, conjunction_meta_key, conjunction_tca_key, conjunctions_key, idx_bucket_key, idx_key, track_key
+from sentinel_common.profiling import debug_router
+from sentinel_common.redis_pool import async_redis_client, redis_client, redis_unavailable
+from sentinel_common.service import add_metrics_route, health_body, redis_ping
+from sentinel_common.snapshot import SNAPSHOT_PATH, TrackSnapshot
+
+from .export import FORMATS, ExportError, check_options, compress, encode_arrow, encode_ndjson, iter_track_batches
 
 
 APP_NAME = os.getenv("SERVICE_NAME", "track-api")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 
-REDIS_HOST = os.getenv("REDIS_HOST", "redis")
-REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-REDIS_DB = int(os.getenv("REDIS_DB", "0"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Serve stored track JSON bytes as-is; "false" restores the decode/re-encode path
+PASSTHROUGH = os.getenv("TRACK_API_PASSTHROUGH", "true").lower() == "true"
+# List/get as async handlers on redis.asyncio; "false" restores the threadpool handlers.
+# The export stream stays on the sync client either way.
+REDIS_ASYNC = os.getenv("REDIS_ASYNC", "true").lower() == "true"
+# How often to look for a newer track snapshot (served while Redis is unreachable)
+SNAPSHOT_RECHECK_SECONDS = float(os.getenv("TRACK_SNAPSHOT_RECHECK_SECONDS", "30"))
 
-r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+r = redis_client()
+# Separate client for track blobs: bytes in, bytes out, no UTF-8 round trip
+r_raw = redis_client(decode_responses=False)
+ar = async_redis_client()
+ar_raw = async_redis_client(decode_responses=False)
 
 track_queries = Counter("sda_track_queries_total", "Track queries total", ["service"])
+track_exports = Counter("sda_track_exports_total", "Track catalogue exports total", ["service", "format"])
+conjunction_queries = Counter("sda_conjunction_queries_total", "Conjunction queries total", ["service"])
+snapshot_reads = Counter("sda_track_snapshot_reads_total", "Track reads served from the snapshot while Redis was unreachable", ["service"])
+
+_snapshot: Optional[TrackSnapshot] = None
+_snapshot_ino = 0
+_snapshot_checked = float("-inf")
 
 
-def verify_bearer(auth: Optional[str]) -> dict:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
+def current_snapshot() -> Optional[TrackSnapshot]:
+    """The newest track snapshot, re-opened when mission-optimizer has replaced the file."""
+    global _snapshot, _snapshot_ino, _snapshot_checked
+    if not SNAPSHOT_PATH or time.monotonic() - _snapshot_checked < SNAPSHOT_RECHECK_SECONDS:
+        return _snapshot
+    _snapshot_checked = time.monotonic()
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return payload
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
+        ino = os.stat(SNAPSHOT_PATH).st_ino
+    except OSError:
+        return _snapshot
+    if ino != _snapshot_ino:
+        # The old mapping is left to the garbage collector; a request may still be reading it
+        _snapshot = TrackSnapshot.open(SNAPSHOT_PATH) or _snapshot
+        _snapshot_ino = ino
+    return _snapshot
+
+
+def from_snapshot(exc: Exception) -> TrackSnapshot:
+    """The snapshot to answer from when `exc` means Redis is unreachable; re-raises anything else."""
+    snap = current_snapshot() if redis_unavailable(exc) else None
+    if snap is None:
+        raise exc
+    snapshot_reads.labels(APP_NAME).inc()
+    return snap
 
 
-def track_key(object_id: str) -> str:
-    return f"track:{object_id}"
+def snapshot_headers(snap: TrackSnapshot) -> dict:
+    return {"X-Track-Source": "snapshot", "X-Snapshot-Age-Seconds": str(int(snap.age_s))}
 
 
-def idx_key() -> str:
-    return "track:index"
+def fetch_raw_tracks(object_ids: Iterable[str], min_conf: float = 0.0) -> list[bytes]:
+    """Pipelined fetch of stored track JSON, filtered on the side-car confidence field."""
+    pipe = r_raw.pipeline(transaction=False)
+    for oid in object_ids:
+        pipe.hmget(track_key(oid), "json", "confidence")
+    return filter_raw(pipe.execute(), min_conf)
+
+
+async def fetch_raw_tracks_async(object_ids: Iterable[str], min_conf: float = 0.0) -> list[bytes]:
+    pipe = ar_raw.pipeline(transaction=False)
+    for oid in object_ids:
+        pipe.hmget(track_key(oid), "json", "confidence")
+    return filter_raw(await pipe.execute(), min_conf)
+
+
+def filter_raw(rows: Iterable[list], min_conf: float) -> list[bytes]:
+    results = []
+    for raw, conf in rows:
+        if not raw:
+            continue
+        if conf is None:
+            # Written before the confidence field existed
+            conf = orjson.loads(raw).get("confidence", 0.0)
+        if float(conf) >= min_conf:
+            results.append(raw)
+    return results
+
+
+def in_shard(object_id: str, shard: int, shards: int) -> bool:
+    """Stable hash partition of the catalogue, so clients can fetch disjoint pages in parallel."""
+    return zlib.crc32(object_id.encode()) % shards == shard
+
+
+def splice_list(fragments: list[bytes], total: int) -> bytes:
+    return b'{"count":%d,"total":%d,"tracks":[%s]}' % (len(fragments), total, b",".join(fragments))
 
 
 app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
+
+
+@app.on_event("startup")
+def startup():
+    # Mapping the file is O(1), so it is ready before the first request
+    current_snapshot()
 
 
 @app.get("/health")
 def health():
-    try:
-        r.ping()
-        redis_ok = True
-    except Exception:
-        redis_ok = False
-    return {"status": "ok" if redis_ok else "degraded", "service": APP_NAME, "redis": redis_ok, "ts": int(time.time())}
+    extra = {"snapshot_age_s": int(_snapshot.age_s)} if _snapshot is not None else {}
+    return health_body(APP_NAME, redis_ping(r), **extra)
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+def check_shard(shard: int, shards: int) -> None:
+    if shards < 1 or not 0 <= shard < shards:
+        raise HTTPException(status_code=400, detail="shard must be in [0, shards)")
 
 
-@app.get("/tracks")
-def list_tracks(authorization: Optional[str] = Header(default=None), min_conf: float = 0.0, limit: int = 50):
+def queue_index_counts(pipe) -> None:
+    pipe.scard(idx_key())
+    for b in range(SHARD_BUCKETS):
+        pipe.scard(idx_bucket_key(b))
+
+
+def shard_buckets(counts: list[int], shard: int, shards: int) -> Optional[list[str]]:
+    """
+    The index buckets that make up a shard, or None when the shard has to be filtered
+    out of the whole index: `shards` does not divide SHARD_BUCKETS, or the buckets do not
+    add up to the index yet (fusion-engine backfills them at start).
+    """
+    total, *sizes = counts
+    if SHARD_BUCKETS % shards or sum(sizes) != total:
+        return None
+    return [idx_bucket_key(b) for b in range(shard, SHARD_BUCKETS, shards)]
+
+
+def page_ids(limit: int, shard: int, shards: int) -> tuple[list[str], int]:
+    """Up to `limit` ids from the shard (the whole index when shards is 1) and the catalogue size."""
+    limit = max(1, limit)
+    if shards == 1:
+        ids: dict = {}
+        cursor = 0
+        while True:
+            cursor, batch = r.sscan(idx_key(), cursor=cursor, count=limit)
+            ids.update(dict.fromkeys(batch))
+            if cursor == 0 or len(ids) >= limit:
+                return list(ids)[:limit], r.scard(idx_key())
+    pipe = r.pipeline(transaction=False)
+    queue_index_counts(pipe)
+    counts = pipe.execute()
+    buckets = shard_buckets(counts, shard, shards)
+    if buckets is None:
+        return [oid for oid in r.smembers(idx_key()) if in_shard(oid, shard, shards)][:limit], counts[0]
+    return list(r.sunion(buckets))[:limit], counts[0]
+
+
+async def page_ids_async(limit: int, shard: int, shards: int) -> tuple[list[str], int]:
+    limit = max(1, limit)
+    if shards == 1:
+        ids: dict = {}
+        cursor = 0
+        while True:
+            cursor, batch = await ar.sscan(idx_key(), cursor=cursor, count=limit)
+            ids.update(dict.fromkeys(batch))
+            if cursor == 0 or len(ids) >= limit:
+                return list(ids)[:limit], await ar.scard(idx_key())
+    pipe = ar.pipeline(transaction=False)
+    queue_index_counts(pipe)
+    counts = await pipe.execute()
+    buckets = shard_buckets(counts, shard, shards)
+    if buckets is None:
+        return [oid for oid in await ar.smembers(idx_key()) if in_shard(oid, shard, shards)][:limit], counts[0]
+    return list(await ar.sunion(buckets))[:limit], counts[0]
+
+
+def list_response(fragments: list[bytes], total: int, accept: Optional[str], accept_encoding: Optional[str]):
+    if not PASSTHROUGH:
+        results = [orjson.loads(raw) for raw in fragments]
+        return encode_response({"count": len(results), "total": total, "tracks": results}, accept, accept_encoding)
+    return encode_response(None, accept, accept_encoding, splice_list(fragments, total))
+
+
+def snapshot_list(snap: TrackSnapshot, min_conf: float, limit: int, shard: int, shards: int, accept: Optional[str], accept_encoding: Optional[str]) -> Response:
+    fragments = []
+    for rec, raw in snap.iter_raw():
+        if len(fragments) >= max(1, limit):
+            break
+        if rec.confidence >= min_conf and (shards == 1 or in_shard(rec.object_id, shard, shards)):
+            fragments.append(raw)
+    return encode_response(None, accept, accept_encoding, splice_list(fragments, len(snap)), headers=snapshot_headers(snap))
+
+
+def list_tracks(
+    authorization: Optional[str] = Header(default=None),
+    min_conf: float = 0.0,
+    limit: int = 50,
+    shard: int = 0,
+    shards: int = 1,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
     verify_bearer(authorization)
+    check_shard(shard, shards)
     track_queries.labels(APP_NAME).inc()
 
-    object_ids = list(r.smembers(idx_key()))
-    results = []
-    for oid in object_ids[: max(1, limit)]:
-        raw = r.hget(track_key(oid), "json")
-        if not raw:
-            continue
-        t = json.loads(raw)
-        if float(t.get("confidence", 0.0)) >= float(min_conf):
-            results.append(t)
-
-    return {"count": len(results), "tracks": results}
+    try:
+        object_ids, total = page_ids(limit, shard, shards)
+        fragments = fetch_raw_tracks(object_ids, float(min_conf))
+    except Exception as e:
+        return snapshot_list(from_snapshot(e), float(min_conf), limit, shard, shards, accept, accept_encoding)
+    return list_response(fragments, total, accept, accept_encoding)
 
 
-@app.get("/tracks/{object_id}")
-def get_track(object_id: str, authorization: Optional[str] = Header(default=None)):
+async def list_tracks_async(
+    authorization: Optional[str] = Header(default=None),
+    min_conf: float = 0.0,
+    limit: int = 50,
+    shard: int = 0,
+    shards: int = 1,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
     verify_bearer(authorization)
+    check_shard(shard, shards)
     track_queries.labels(APP_NAME).inc()
 
-    raw = r.hget(track_key(object_id), "json")
+    try:
+        object_ids, total = await page_ids_async(limit, shard, shards)
+        fragments = await fetch_raw_tracks_async(object_ids, float(min_conf))
+    except Exception as e:
+        return snapshot_list(from_snapshot(e), float(min_conf), limit, shard, shards, accept, accept_encoding)
+    return list_response(fragments, total, accept, accept_encoding)
+
+
+app.get("/tracks")(list_tracks_async if REDIS_ASYNC else list_tracks)
+
+
+@app.get("/tracks/export")
+def export_tracks(
+    authorization: Optional[str] = Header(default=None),
+    format: str = "ndjson",
+    compression: str = "none",
+    min_conf: float = 0.0,
+    batch_size: int = EXPORT_BATCH_SIZE,
+):
+    verify_bearer(authorization)
+    try:
+        check_options(format, compression)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    track_exports.labels(APP_NAME, format).inc()
+
+    batches = iter_track_batches(r, idx_key(), lambda ids: fetch_raw_tracks(ids, float(min_conf)), max(1, min(batch_size, 10000)))
+    body = encode_arrow(batches) if format == "arrow" else encode_ndjson(batches)
+
+    headers = {"Content-Disposition": f'attachment; filename="tracks.{"arrows" if format == "arrow" else "ndjson"}"'}
+    if compression != "none":
+        headers["Content-Encoding"] = compression
+    return StreamingResponse(compress(body, compression), media_type=FORMATS[format], headers=headers)
+
+
+def track_response(raw: Optional[bytes], accept: Optional[str], accept_encoding: Optional[str]):
     if not raw:
         raise HTTPException(status_code=404, detail="Track not found")
-    return json.loads(raw)
+    if not PASSTHROUGH:
+        return encode_response(orjson.loads(raw), accept, accept_encoding)
+    return encode_response(None, accept, accept_encoding, raw)
+
+
+def snapshot_track(snap: TrackSnapshot, object_id: str, accept: Optional[str], accept_encoding: Optional[str]) -> Response:
+    i = snap.find(object_id)
+    if i is None:
+        raise HTTPException(status_code=404, detail="Track not found")
+    return encode_response(None, accept, accept_encoding, snap.raw_json(i), headers=snapshot_headers(snap))
+
+
+def get_track(
+    object_id: str,
+    authorization: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    verify_bearer(authorization)
+    track_queries.labels(APP_NAME).inc()
+    try:
+        raw = r_raw.hget(track_key(object_id), "json")
+    except Exception as e:
+        return snapshot_track(from_snapshot(e), object_id, accept, accept_encoding)
+    return track_response(raw, accept, accept_encoding)
+
+
+async def get_track_async(
+    object_id: str,
+    authorization: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    verify_bearer(authorization)
+    track_queries.labels(APP_NAME).inc()
+    try:
+        raw = await ar_raw.hget(track_key(object_id), "json")
+    except Exception as e:
+        return snapshot_track(from_snapshot(e), object_id, accept, accept_encoding)
+    return track_response(raw, accept, accept_encoding)
+
+
+# After /tracks/export, so "export" is not taken for an object id
+app.get("/tracks/{object_id}")(get_track_async if REDIS_ASYNC else get_track)
+
+
+def match_conjunctions(pair_ids: list[str], object_id: Optional[str]) -> list[str]:
+    if not object_id:
+        return pair_ids
+    return [pair for pair in pair_ids if object_id in pair.split("|")]
+
+
+def conjunctions_response(
+    rows: Iterable[Optional[bytes]], screened_at: Optional[bytes], max_miss_km: Optional[float], limit: int, accept: Optional[str], accept_encoding: Optional[str]
+):
+    """The stored conjunction JSON spliced into one body, soonest TCA first."""
+    fragments = [raw for raw in rows if raw and (max_miss_km is None or orjson.loads(raw)["miss_km"] <= max_miss_km)]
+    page = fragments[: max(1, limit)]
+    body = b'{"count":%d,"total":%d,"screened_at":%s,"conjunctions":[%s]}' % (
+        len(page),
+        len(fragments),
+        orjson.dumps(screened_at.decode() if screened_at else None),
+        b",".join(page),
+    )
+    return encode_response(None, accept, accept_encoding, body)
+
+
+def list_conjunctions(
+    authorization: Optional[str] = Header(default=None),
+    object_id: Optional[str] = None,
+    max_miss_km: Optional[float] = None,
+    limit: int = 100,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    verify_bearer(authorization)
+    conjunction_queries.labels(APP_NAME).inc()
+    pair_ids = match_conjunctions(r.zrangebyscore(conjunction_tca_key(), time.time(), "+inf"), object_id)
+    rows = r_raw.hmget(conjunctions_key(), pair_ids) if pair_ids else []
+    return conjunctions_response(rows, r_raw.hget(conjunction_meta_key(), "screened_at"), max_miss_km, limit, accept, accept_encoding)
+
+
+async def list_conjunctions_async(
+    authorization: Optional[str] = Header(default=None),
+    object_id: Optional[str] = None,
+    max_miss_km: Optional[float] = None,
+    limit: int = 100,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    verify_bearer(authorization)
+    conjunction_queries.labels(APP_NAME).inc()
+    pair_ids = match_conjunctions(await ar.zrangebyscore(conjunction_tca_key(), time.time(), "+inf"), object_id)
+    rows = await ar_raw.hmget(conjunctions_key(), pair_ids) if pair_ids else []
+    return conjunctions_response(rows, await ar_raw.hget(conjunction_meta_key(), "screened_at"), max_miss_km, limit, accept, accept_encoding)
+
+
+# Published by conjunction-screener
+app.get("/conjunctions")(list_conjunctions_async if REDIS_ASYNC else list_conjunctions)
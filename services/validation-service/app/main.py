@@ -1,20 +1,27 @@
 import os
 import time
-from typing import Optional
+from typing import Annotated, Optional
 
 import httpx
-import jwt
-from fastapi import FastAPI, Header, HTTPException
-from pydantic import BaseModel, Field
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from fastapi import Depends, FastAPI, Header, HTTPException
+from prometheus_client import Counter, Histogram
 from fastapi.responses import Response
 
+from sentinel_common.auth import verify_bearer
+from sentinel_common.codec import encode_body, observation_body, relay_response
+from sentinel_common.models import ObservationEvent
+from sentinel_common.profiling import debug_router
+from sentinel_common.service import add_metrics_route, health_body
+from sentinel_common.tracing import child_traceparent, parse_server_timing, server_timing
+
 
 APP_NAME = os.getenv("SERVICE_NAME", "validation-service")
-JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
-JWT_ISSUER = os.getenv("JWT_ISSUER", "sentinel-sda")
 FUSION_URL = os.getenv("FUSION_URL", "http://fusion-engine:8000/fuse")
 REQ_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "3.0"))
+FORWARD_MAX_CONNECTIONS = int(os.getenv("FORWARD_MAX_CONNECTIONS", "100"))
+# Body format (json | msgpack) and compression (identity | gzip | zstd) of the forward hop
+FORWARD_FORMAT = os.getenv("FORWARD_FORMAT", "json")
+FORWARD_ENCODING = os.getenv("FORWARD_ENCODING", "identity")
 
 valid_total = Counter("sda_valid_total", "Validated observations total", ["service"])
 invalid_total = Counter("sda_invalid_total", "Invalid observations total", ["service"])
@@ -22,30 +29,6 @@ forward_fail = Counter("sda_valid_forward_fail_total", "Forward failures", ["ser
 handler_latency = Histogram("sda_validation_latency_seconds", "Validation handler latency", ["service"])
 
 
-class ObservationEvent(BaseModel):
-    event_id: str
-    sensor_id: str
-    sensor_type: str
-    timestamp: str
-    object_id: str
-    measurement: dict = Field(default_factory=dict)
-    quality: dict = Field(default_factory=dict)
-    integrity: Optional[dict] = None
-
-
-def verify_bearer(auth: Optional[str]) -> dict:
-    if not auth or not auth.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    token = auth.split(" ", 1)[1].strip()
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], issuer=JWT_ISSUER)
-        if payload.get("svc") is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return payload
-    except jwt.PyJWTError as e:
-        raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
-
-
 def sanity_check(evt: ObservationEvent) -> list[str]:
     flags = []
     m = evt.measurement or {}
@@ -72,22 +55,36 @@ def sanity_check(evt: ObservationEvent) -> list[str]:
 
 
 app = FastAPI(title=APP_NAME)
+app.include_router(debug_router(verify_bearer))
+add_metrics_route(app)
+# One pooled client for all forwards instead of a new connection per request
+client = httpx.AsyncClient(
+    timeout=REQ_TIMEOUT,
+    limits=httpx.Limits(max_connections=FORWARD_MAX_CONNECTIONS, max_keepalive_connections=FORWARD_MAX_CONNECTIONS),
+)
 
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "service": APP_NAME, "ts": int(time.time())}
+@app.on_event("shutdown")
+async def shutdown():
+    await client.aclose()
 
 
-@app.get("/metrics")
-def metrics():
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+@app.get("/health")
+def health():
+    return health_body(APP_NAME)
 
 
 @app.post("/validate")
-async def validate(evt: ObservationEvent, authorization: Optional[str] = Header(default=None)):
+async def validate(
+    evt: Annotated[ObservationEvent, Depends(observation_body)],
+    response: Response,
+    authorization: Optional[str] = Header(default=None),
+    traceparent: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
     start = time.time()
-    verify_bearer(authorization)
+    t0 = time.perf_counter()
 
     flags = sanity_check(evt)
     if flags:
@@ -96,13 +93,28 @@ async def validate(evt: ObservationEvent, authorization: Optional[str] = Header(
 
     valid_total.labels(APP_NAME).inc()
 
-    headers = {"Authorization": authorization}
+    tp = child_traceparent(traceparent)
+    content, headers = encode_body(evt.model_dump(), FORWARD_FORMAT, FORWARD_ENCODING)
+    headers.update({"Authorization": authorization, "traceparent": tp})
+    forward_s = 0.0
+    downstream: dict = {}
     try:
-        async with httpx.AsyncClient(timeout=REQ_TIMEOUT) as client:
-            resp = await client.post(FUSION_URL, json=evt.model_dump(), headers=headers)
-            if resp.status_code != 200:
-                forward_fail.labels(APP_NAME).inc()
-                raise HTTPException(status_code=502, detail=f"Fusion forward failed: {resp.text}")
-            return resp.json()
+        f0 = time.perf_counter()
+        resp = await client.post(FUSION_URL, content=content, headers=headers)
+        forward_s = time.perf_counter() - f0
+        downstream = parse_server_timing(resp.headers.get("server-timing", ""))
+        if resp.status_code != 200:
+            forward_fail.labels(APP_NAME).inc()
+            raise HTTPException(status_code=502, detail=f"Fusion forward failed: {resp.text}")
     finally:
         handler_latency.labels(APP_NAME).observe(time.time() - start)
+        # Exclusive stages for the gateway's trace; fusion's own entries are passed through
+        total = time.perf_counter() - t0
+        stages = {"validation_app": total - forward_s}
+        if forward_s:
+            stages["validation_to_fusion_net"] = max(0.0, forward_s - downstream.get("fusion_total", forward_s))
+        stages.update(downstream)
+        stages["validation_total"] = total
+        response.headers["server-timing"] = server_timing(stages)
+        response.headers["traceparent"] = tp
+    return relay_response(resp, accept, accept_encoding, response.headers)